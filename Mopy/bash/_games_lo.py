@@ -65,7 +65,7 @@ def asterisk(active_set=frozenset(active)):
                                  u'included in plugins.txt')
 
 _re_plugins_txt_comment = re.compile(u'^#.*', re.U)
-def _parse_plugins_txt_(path, mod_infos, _star):
+def _parse_plugins_txt_(path, mod_infos, _star, lines_cache=None):
     """Parse loadorder.txt and plugins.txt files with or without stars.
 
     Return two lists which are identical except when _star is True, whereupon
@@ -76,8 +76,14 @@ def _parse_plugins_txt_(path, mod_infos, _star):
     :type path: bolt.Path
     :type mod_infos: bosh.ModInfos
     :type _star: bool
+    :param lines_cache: if given, maps the raw plugin names of the previous
+        parse of this file to the paths they were decoded to, so unchanged
+        lines naming existing mods need not be decoded again - it's updated to
+        hold the lines of this parse
+    :type lines_cache: dict[str, bolt.Path]
     :rtype: (list[bolt.Path], list[bolt.Path])
     """
+    parsed_lines = {}
     with path.open('r') as ins:
         #--Load Files
         active, modnames = [], []
@@ -89,6 +95,14 @@ def _parse_plugins_txt_(path, mod_infos, _star):
             # use raw strings below
             is_active_ = not _star or modname.startswith('*')
             if _star and is_active_: modname = modname[1:]
+            if lines_cache is not None:
+                raw_name = modname
+                cached_path = lines_cache.get(raw_name)
+                if cached_path is not None and cached_path in mod_infos:
+                    parsed_lines[raw_name] = cached_path
+                    modnames.append(cached_path)
+                    if is_active_: active.append(cached_path)
+                    continue
             try:
                 test = bolt.decode(modname, encoding='cp1252')
             except UnicodeError:
@@ -111,8 +125,12 @@ def _parse_plugins_txt_(path, mod_infos, _star):
                     modname = bolt.GPath(test)
             else:
                 modname = bolt.GPath(test)
+            if lines_cache is not None: parsed_lines[raw_name] = modname
             modnames.append(modname)
             if is_active_: active.append(modname)
+    if lines_cache is not None:
+        lines_cache.clear()
+        lines_cache.update(parsed_lines)
     return active, modnames
 
 class FixInfo(object):
@@ -207,6 +225,8 @@ def __init__(self, mod_infos, plugins_txt_path):
         self.master_path = mod_infos.masterName # type: bolt.Path
         self.mtime_plugins_txt = 0
         self.size_plugins_txt = 0
+        # the decoded plugin names of the lines of each parsed modfile
+        self._parsed_lines = defaultdict(dict)
 
     def _plugins_txt_modified(self):
         exists = self.plugins_txt_path.exists()
@@ -374,7 +394,8 @@ def _parse_modfile(self, path):
         """:rtype: (list[bolt.Path], list[bolt.Path])"""
         if not path.exists(): return [], []
         #--Read file
-        acti, _lo = _parse_plugins_txt_(path, self.mod_infos, _star=self._star)
+        acti, _lo = _parse_plugins_txt_(path, self.mod_infos, _star=self._star,
+                                        lines_cache=self._parsed_lines[path])
         return acti, _lo
 
     def _write_modfile(self, path, lord, active):
@@ -437,15 +458,22 @@ def _fix_load_order(self, lord, fix_lo):
         # present in text file, we are supposed to take care of that
         fix_lo.lo_added |= mods_set - loadorder_set
         # Remove non existent plugins from load order
-        lord[:] = [x for x in lord if x not in fix_lo.lo_removed]
+        if fix_lo.lo_removed:
+            lord[:] = [x for x in lord if x not in fix_lo.lo_removed]
         # See if any esm files are loaded below an esp and reorder as necessary
-        ol = lord[:]
-        lord.sort(key=lambda m: not self.in_master_block(self.mod_infos[m]))
-        lo_order_changed |= ol != lord
+        # - check each mod once, the sort is a noop for a valid load order
+        in_block = {m: self.in_master_block(self.mod_infos[m]) for m in
+                    mods_set}
+        index_first_esp = 0
+        while index_first_esp < len(lord) and in_block[lord[index_first_esp]]:
+            index_first_esp += 1
+        if any(in_block[m] for m in lord[index_first_esp:]):
+            lord.sort(key=lambda m: not in_block[m])
+            lo_order_changed = True
+            index_first_esp = sum(in_block[m] for m in lord)
         # Append new plugins to load order
-        index_first_esp = self._index_of_first_esp(lord)
         for mod in fix_lo.lo_added:
-            if self.in_master_block(self.mod_infos[mod]):
+            if in_block[mod]:
                 if not mod == master_name:
                     lord.insert(index_first_esp, mod)
                 else:
@@ -915,7 +943,8 @@ def _fetch_load_order(self, cached_load_order, cached_active):
         # handle desync with plugins txt
         if cached_active is not None:
             cached_active_copy = cached_active[:]
-            active_in_lo = [x for x in lo if x in set(cached_active)]
+            cached_active_set = set(cached_active)
+            active_in_lo = [x for x in lo if x in cached_active_set]
             w = dict((x, i) for i, x in enumerate(lo))
             while active_in_lo:
                 for i, (ordered, current) in enumerate(
@@ -24,9 +24,12 @@
 import os
 import re
 import subprocess
+import tempfile
+import zipfile
+from binascii import crc32
 
 from . import bass
-from .bolt import startupinfo, GPath, deprint, walkdir
+from .bolt import startupinfo, GPath, deprint, walkdir, Progress
 from .exception import StateError
 
 exe7z = u'7z.exe' if os.name == u'nt' else u'7z'
@@ -57,19 +60,27 @@ def compress7z(command, outDir, destArchive, srcDir, progress=None):
                             startupinfo=startupinfo)
     #--Error checking and progress feedback
     index, errorLine = 0, u''
-    with proc.stdout as out:
-        for line in iter(out.readline, b''):
-            line = unicode(line, 'utf8') # utf-8 is ok see bosh.compressCommand
-            if regErrMatch(line):
-                errorLine = line + u''.join(out)
-                break
-            if progress is None: continue
-            maCompressing = regCompressMatch(line)
-            if maCompressing:
-                progress(index, destArchive.s + u'\n' + _(
-                    u'Compressing files...') + u'\n' + maCompressing.group(
-                    1).strip())
-                index += 1
+    try:
+        with proc.stdout as out:
+            for line in iter(out.readline, b''):
+                # utf-8 is ok see bosh.compressCommand
+                line = unicode(line, 'utf8')
+                if regErrMatch(line):
+                    errorLine = line + u''.join(out)
+                    break
+                if progress is None: continue
+                maCompressing = regCompressMatch(line)
+                if maCompressing:
+                    progress(index, destArchive.s + u'\n' + _(
+                        u'Compressing files...') + u'\n' +
+                        maCompressing.group(1).strip())
+                    index += 1
+    except:
+        # e.g. CancelError from progress - don't leave 7z running
+        proc.kill()
+        proc.wait()
+        outFile.temp.remove()
+        raise
     returncode = proc.wait()
     if returncode or errorLine:
         outFile.temp.remove()
@@ -108,6 +119,137 @@ def extract7z(src_archive, extract_dir, progress=None, readExtensions=None,
                          % (source_archive, str(returncode), errorLine))
     return subArchives
 
+def stream_extract(src_archive, entries, progress=None):
+    """Extract the specified files of src_archive directly to their final
+    destinations, without going through a temp directory. Zip archives are
+    read in process, everything else is streamed through 7z's stdout, so
+    entries must have a known crc, which is used to verify we stayed in sync
+    with the stream. Safe to call concurrently for different archives and
+    destinations.
+
+    :param entries: list of (archive_path, size, crc, dest_path) tuples -
+        dest_path is an absolute Path
+    :param progress: will be set to the total size of the entries and
+        advanced per byte written"""
+    progress = progress or Progress()
+    progress.setFull(max(sum(e[1] for e in entries), 1))
+    if src_archive.cext == u'.zip':
+        try:
+            _stream_zip(src_archive, entries, progress)
+            return
+        except (NotImplementedError, zipfile.BadZipfile, KeyError,
+                RuntimeError, UnicodeError):
+            # e.g. lzma compressed, non standard names or encrypted (that's
+            # the RuntimeError) - let 7z have a go
+            deprint(u'%s: could not read zip in process' % src_archive,
+                    traceback=True)
+    # 7z writes the files to the stream in the order they are stored in the
+    # archive - for solid archives that's not the order of their paths
+    entries = _in_archive_order(src_archive, entries)
+    # Dump the file list - not to Installer.tempList, we may run in parallel
+    list_fd, filelist_to_extract = tempfile.mkstemp(suffix=u'.txt')
+    try:
+        with os.fdopen(list_fd, 'wb') as out:
+            out.write(u'\n'.join(e[0] for e in entries).encode(u'utf8'))
+        _stream_7z(src_archive, entries, filelist_to_extract, progress)
+    finally:
+        os.remove(filelist_to_extract)
+
+def _in_archive_order(src_archive, entries):
+    """Return entries sorted in the order 7z stores them in src_archive, as
+    listed by 7z l - raise a StateError if any of them is not listed."""
+    archive_order = {}
+    def _parse_archive_line(key, value):
+        if key == u'Path':
+            archive_order.setdefault(value.decode(u'utf8').lower(),
+                                     len(archive_order))
+    list_archive(src_archive, _parse_archive_line)
+    try:
+        return sorted(entries, key=lambda e: archive_order[e[0].lower()])
+    except KeyError as e:
+        raise StateError(u'%s: %s is not listed in the archive' % (
+            src_archive.tail, e.args[0]))
+
+def _stream_zip(src_archive, entries, progress):
+    source_archive = src_archive.tail.s
+    with zipfile.ZipFile(src_archive.s) as zip_file:
+        infos = {}
+        for info in zip_file.infolist():
+            name = info.filename
+            if not isinstance(name, unicode): # PY3: zipfile does it
+                # names without the utf8 flag (0x800) are in cp437
+                name = name.decode(u'utf8' if info.flag_bits & 0x800 else
+                                   u'cp437')
+            infos[name.replace(u'/', os.sep).lower()] = info
+        done = 0
+        for arch_path, size, crc, dest in entries:
+            with zip_file.open(infos[arch_path.lower()]) as ins:
+                _stream_file(ins.read, size, crc, dest, progress, done,
+                             source_archive, arch_path)
+            done += size
+
+def _stream_7z(src_archive, entries, filelist_to_extract, progress):
+    source_archive = src_archive.tail.s
+    command = u'"%s" x "%s" -so -y -bd -scsUTF-8 -sccUTF-8 @"%s"' % (
+        exe7z, src_archive.s, filelist_to_extract)
+    # stderr must not block 7z while we consume stdout
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=err,
+                                stdin=subprocess.PIPE, bufsize=-1,
+                                startupinfo=startupinfo)
+        try:
+            done = 0
+            with proc.stdout as ins:
+                for arch_path, size, crc, dest in entries:
+                    _stream_file(ins.read, size, crc, dest, progress, done,
+                                 source_archive, arch_path)
+                    done += size
+                if ins.read(1):
+                    raise StateError(u'%s: Extraction failed:\nUnexpected '
+                                     u'data at end of stream' % source_archive)
+        except:
+            proc.kill()
+            proc.wait()
+            raise
+        returncode = proc.wait()
+        if returncode:
+            err.seek(0)
+            raise StateError(
+                u'%s: Extraction failed:\n7z.exe return value: %s\n%s' % (
+                    source_archive, str(returncode),
+                    unicode(err.read(), u'utf8', u'replace')))
+
+def _stream_file(ins_read, size, crc, dest, progress, done, source_archive,
+                 arch_path, __block_size=1048576):
+    """Write size bytes from ins_read to dest through a sibling temp file,
+    checking their crc."""
+    temp_dest = dest.s + u'.tmp'
+    dest.head.makedirs()
+    progress(done, source_archive + u'\n' + _(u'Extracting files...') +
+             u'\n' + arch_path)
+    file_crc, remaining = 0, size
+    try:
+        with open(temp_dest, u'wb') as out:
+            while remaining:
+                block = ins_read(min(remaining, __block_size))
+                if not block:
+                    raise StateError(u'%s: Extraction failed:\n%s is '
+                        u'truncated' % (source_archive, arch_path))
+                file_crc = crc32(block, file_crc)
+                out.write(block)
+                remaining -= len(block)
+                progress(done + size - remaining)
+        if file_crc & 0xFFFFFFFF != crc:
+            raise StateError(u'%s: Extraction failed:\nCRC mismatch for '
+                             u'%s' % (source_archive, arch_path))
+        dest.remove()
+        os.rename(temp_dest, dest.s)
+    except:
+        try:
+            os.remove(temp_dest)
+        except OSError: pass
+        raise
+
 def wrapPopenOut(command, wrapper, errorMsg):
     proc = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=-1,
                             stdin=subprocess.PIPE, startupinfo=startupinfo)
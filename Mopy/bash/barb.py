@@ -74,7 +74,7 @@ def _init_settings_files(fsName_, mods_folder):
            u'Table.dat', },
         (dirs['bainData'],
          jo(fsName_ + u' Mods', u'Bash Installers', u'Bash')): {
-           u'Converters.dat', u'Installers.dat', },
+           u'Converters.dat', u'Installers.dat', u'Installers.log', },
         (dirs['saveBase'], jo(u'My Games', fsName_)): {
             u'BashProfiles.dat', u'BashSettings.dat', u'BashLoadOrders.dat',
             u'People.dat', },
@@ -90,7 +90,7 @@ def _init_settings_files(fsName_, mods_folder):
     }
     for setting_files in settings_info.itervalues():
         for settings_file in set(setting_files):
-            if settings_file.endswith(u'.dat'): # add corresponding bak file
+            if settings_file.endswith((u'.dat', u'.log')): # add the bak file
                 setting_files.add(settings_file + u'.bak')
     return settings_info
 
@@ -275,6 +275,16 @@ def _restore_file(dest_dir_, back_path_, *end_path):
             for fname in full_back_path.list():
                 if full_back_path.join(fname).isfile():
                     _restore_file(dest_dir, GPath(back_path), fname)
+        # backups made before the installers store was introduced only have
+        # Installers.dat - drop the current store, else it would be loaded
+        # instead of the restored Installers.dat
+        if not self._extract_dir.join(fsName + u' Mods', u'Bash Installers',
+                                      u'Bash', u'Installers.log').exists():
+            installers_log = dirs['bainData'].join(u'Installers.log')
+            for stale in (installers_log, installers_log.backup):
+                if stale.exists():
+                    deprint(u'Removing stale %s' % stale)
+                    stale.remove()
         # restore savegame profile settings
         back_path = GPath(u'My Games').join(fsName, u'Saves')
         saves_dir = dirs['saveBase'].join(u'Saves')
@@ -130,6 +130,12 @@ def arg(group, dashed, descr, dest, action='store', default=None):
     parser.add_argument('--genHtml',
                         default=None,
                         help=argparse.SUPPRESS)
+    parser.add_argument('--trace-startup',
+                        action='store_true',
+                        default=False,
+                        dest='trace_startup',
+                        help='Time the imports and phases of starting Wrye '
+                             'Bash and write them to BashStartup.log.')
     parser.add_argument('-L', '--Language',
                         action='store',
                         default='',
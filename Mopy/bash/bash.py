@@ -194,8 +194,11 @@ def main(opts):
     :type opts: Namespace"""
     # Change working dir and logging
     _early_setup(opts.debug)
+    if opts.trace_startup: # after _early_setup, so the report goes to Mopy
+        bolt.startup_trace.start()
     # wx is needed to initialize locale, so that's first
-    _import_wx()
+    with bolt.startup_trace.phase(u'import wx'):
+        _import_wx()
     # Next, proceed to initialize the locale using wx
     wx_locale = localize.setup_locale(opts.language, _wx)
     try:
@@ -264,7 +267,10 @@ def _main(opts, wx_locale):
             restore_ = None
     # The rest of backup/restore functionality depends on setting the game
     try:
-        bashIni, bush_game, game_ini_path = _detect_game(opts, bash_ini_path)
+        # imports the record definitions of the game, builds its MelSets
+        with bolt.startup_trace.phase(u'detect game'):
+            bashIni, bush_game, game_ini_path = _detect_game(opts,
+                                                             bash_ini_path)
         if not bush_game: return
         if restore_:
             try:
@@ -283,7 +289,8 @@ def _main(opts, wx_locale):
         bosh.initBosh(bashIni, game_ini_path)
         env.isUAC = env.testUAC(bush_game.gamePath.join(bush_game.mods_dir))
         global basher, balt
-        from . import basher, balt, gui
+        with bolt.startup_trace.phase(u'import basher'):
+            from . import basher, balt, gui
     except (exception.BoltError, ImportError, OSError, IOError):
         msg = u'\n'.join([_(u'Error! Unable to start Wrye Bash.'), u'\n', _(
             u'Please ensure Wrye Bash is correctly installed.'), u'\n',
@@ -362,9 +369,11 @@ def _main(opts, wx_locale):
                     _(u'Do you want to quit Wrye Bash now?')]),
                                  title=_(u'Unable to create backup!')):
                     return  # Quit
-    frame = app.Init() # Link.Frame is set here !
+    with bolt.startup_trace.phase(u'BashApp.Init'):
+        frame = app.Init() # Link.Frame is set here !
     frame.ensureDisplayed()
     frame.bind_refresh()
+    bolt.startup_trace.finish()
     app.MainLoop()
 
 def _detect_game(opts, backup_bash_ini):
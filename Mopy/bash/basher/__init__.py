@@ -4080,6 +4080,10 @@ def SaveSettings(self, destroy=False):
             except:
                 deprint(u'An error occurred while saving settings of '
                         u'the %s panel:' % tab_name, traceback=True)
+        # the BSAs tab may be hidden but the Mods and Installers tabs use the
+        # bsa assets too
+        bosh.bsaInfos.save_assets_cache()
+        bosh.modInfos.save_headers_cache()
         settings.save()
 
     @staticmethod
@@ -4229,7 +4233,6 @@ def InitVersion():
         settings['bash.CBashEnabled'] = CBashApi.Enabled
 
 # Initialization --------------------------------------------------------------
-from .gui_patchers import initPatchers
 def InitSettings(): # this must run first !
     """Initializes settings dictionary for bosh and basher."""
     bosh.initSettings()
@@ -4247,7 +4250,6 @@ def InitSettings(): # this must run first !
     settings['balt.WryeLog.cssDir'] = bass.dirs['mopy'].join(u'Docs')
     #--StandAlone version?
     settings['bash.standalone'] = hasattr(sys,'frozen')
-    initPatchers()
 
 def InitImages():
     """Initialize color and image collections."""
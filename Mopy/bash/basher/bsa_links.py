@@ -24,11 +24,11 @@
 """Menu items for the _item_ menu of the BSAs tab - their window attribute
 points to BashFrame.bsaList singleton."""
 
-from .. import archives, bass, balt
+from .. import archives, bass, balt, bosh
 from ..balt import ItemLink, Progress
 from ..bolt import GPath, SubProgress
 
-__all__ = ['BSA_ExtractToProject', 'BSA_ListContents']
+__all__ = ['BSA_ExtractToProject', 'BSA_ListContents', 'BSA_Verify']
 
 class BSA_ExtractToProject(ItemLink):
     """Extracts one or more BSAs into projects."""
@@ -103,3 +103,24 @@ def Execute(self):
         full_text += u'\n[/xml][/spoiler]'
         balt.copyToClipboard(full_text)
         self._showLog(full_text, _(u'BSA Contents'))
+
+class BSA_Verify(ItemLink):
+    """Verifies the integrity of one or more BSAs."""
+    _text = _(u'Verify Integrity...')
+    _help = _(u'Decompresses every file of the selected BSA(s) and reports '
+              u'any corrupt data or names.')
+
+    def _bsas_to_verify(self): return list(self.iselected_infos())
+
+    @balt.conversation
+    def Execute(self):
+        with Progress(_(u'Verifying BSAs...')) as prog:
+            results = bosh.bsaInfos.verify_bsas(self._bsas_to_verify(), prog)
+        message = u'== %s\n\n' % _(u'BSA Integrity')
+        corrupt = [(k, v) for k, v in results.iteritems() if v]
+        for bsa_name, problems in corrupt:
+            message += u'=== %s\n' % bsa_name
+            message += u'\n'.join(u'* %s' % p for p in problems) + u'\n\n'
+        message += _(u'%d of %d BSAs verified without problems.') % (
+            len(results) - len(corrupt), len(results))
+        self._showWryeLog(message, title=self._text)
@@ -288,6 +288,7 @@
     'bash.installers.autoRefreshBethsoft': False,
     'bash.installers.autoRefreshProjects': True,
     'bash.installers.removeEmptyDirs':True,
+    'bash.installers.linkProjects': False,
     'bash.installers.skipScreenshots':False,
     'bash.installers.skipScriptSources':False,
     'bash.installers.skipImages':False,
@@ -1348,6 +1348,7 @@ class CBash_ContentsChecker(_AContentsChecker):
 #------------------------------------------------------------------------------
 from .patcher_dialog import PBash_gui_patchers, CBash_gui_patchers, \
     otherPatcherDict
+bush.game.init_patchers()
 # Dynamically create game specific UI patcher classes and add them to module's
 # scope
 # Patchers with no options
@@ -36,6 +36,7 @@
 import re
 import webbrowser
 from collections import defaultdict
+from itertools import islice
 
 from . import Installers_Link, BashFrame, INIList
 from .frames import InstallerProject_OmodConfigDialog
@@ -59,6 +60,7 @@
            'InstallerConverter_Create', 'InstallerConverter_ConvertMenu',
            'InstallerProject_Pack', 'InstallerArchive_Unpack',
            'InstallerProject_ReleasePack', 'InstallerProject_Sync',
+           'InstallerProject_StripMips',
            'Installer_CopyConflicts', 'InstallerProject_OmodConfig',
            'Installer_ListStructure', 'Installer_Espm_SelectAll',
            'Installer_Espm_DeselectAll', 'Installer_Espm_List',
@@ -75,6 +77,13 @@
 class _InstallerLink(Installers_Link, EnabledLink):
     """Common functions for installer links..."""
 
+    def _append_if_all(self, window, is_type):
+        """For AppendableLink._append - True if is_type is true for all the
+        installers selected in window."""
+        self.selected = window.GetSelected() # append runs before _initData
+        self.window = window # and the idata access is via self.window
+        return all(map(is_type, self.iselected_infos()))
+
     def isSingleArchive(self):
         """Indicates whether or not is single archive."""
         if len(self.selected) != 1: return False
@@ -87,31 +96,38 @@ def _promptSolidBlockSize(self, title, value=0):
                 u"Enter '0' to use 7z's default size."), prompt=u'MB',
             title=title, value=value, min=0, max=102400)
 
-    def _pack(self, archive_path, installer, project, release=False):
+    def _pack(self, pack_targets, release=False):
+        """Pack the projects to their archives - several projects are packed
+        concurrently.
+
+        :param pack_targets: list of (project, archive_path) tuples"""
         #--Archive configuration options
-        blockSize = None
-        if archive_path.cext in archives.noSolidExts:
-            isSolid = False
-        else:
-            if not u'-ms=' in bass.inisettings['7zExtraCompressionArguments']:
-                isSolid = self._askYes(_(u'Use solid compression for %s?')
-                                       % archive_path.s, default=False)
-                if isSolid:
-                    blockSize = self._promptSolidBlockSize(title=self._text)
-            else:
+        pack_jobs = []
+        solid_options = None # ask once for all the archives
+        for project, archive_path in pack_targets:
+            blockSize = None
+            if archive_path.cext in archives.noSolidExts:
+                isSolid = False
+            elif u'-ms=' in bass.inisettings['7zExtraCompressionArguments']:
                 isSolid = True
+            else:
+                if solid_options is None:
+                    isSolid = self._askYes(_(u'Use solid compression for %s?')
+                        % u', '.join(a.s for _p, a in pack_targets),
+                        default=False)
+                    if isSolid:
+                        blockSize = self._promptSolidBlockSize(
+                            title=self._text)
+                    solid_options = isSolid, blockSize
+                isSolid, blockSize = solid_options
+            pack_jobs.append((project, archive_path, isSolid, blockSize))
         with balt.Progress(_(u'Packing to Archive...'),
                            u'\n' + u' ' * 60) as progress:
-            #--Pack
-            installer.packToArchive(project, archive_path, isSolid, blockSize,
-                                    SubProgress(progress, 0, 0.8),
-                                    release=release)
-            #--Add the new archive to Bash
-            iArchive = self.idata.refresh_installer(archive_path,
-                is_project=False, progress=progress,
-                install_order=installer.order + 1, do_refresh=True)
-            iArchive.blockSize = blockSize
-        self.window.RefreshUI(detail_item=archive_path)
+            #--Pack and add the new archives to Bash
+            self.idata.pack_projects(pack_jobs, progress, release=release)
+        self.window.RefreshUI(detail_item=pack_jobs[-1][1])
+        if len(pack_jobs) > 1:
+            self.window.SelectItemsNoCallback([j[1] for j in pack_jobs])
 
     def _askFilename(self, message, filename):
         """:rtype: bolt.Path"""
@@ -1010,9 +1026,7 @@ class InstallerArchive_Unpack(AppendableLink, _InstallerLink):
     _help = _(u'Unpack installer package(s) to Project(s)')
 
     def _append(self, window):
-        self.selected = window.GetSelected() # append runs before _initData
-        self.window = window # and the idata access is via self.window
-        return all(map(lambda inf: inf.is_archive(), self.iselected_infos()))
+        return self._append_if_all(window, lambda inf: inf.is_archive())
 
     @balt.conversation
     def Execute(self):
@@ -1096,32 +1110,119 @@ def Execute(self):
             self.window.RefreshUI()
 
 #------------------------------------------------------------------------------
-class InstallerProject_Pack(_SingleProject):
-    """Pack project to an archive."""
+class InstallerProject_Pack(AppendableLink, _InstallerLink):
+    """Pack project(s) to archive(s)."""
     _text = dialogTitle = _(u'Pack to Archive...')
-    _help = _(u'Pack project to an archive')
+    _help = _(u'Pack project(s) to archive(s)')
     release = False
 
+    def _append(self, window):
+        return self._append_if_all(window, lambda inf: inf.is_project())
+
     @balt.conversation
     def Execute(self):
-        #--Generate default filename from the project name and the default extension
-        archive = GPath(self._selected_item.s + archives.defaultExt)
-        #--Confirm operation
-        archive = self._askFilename(
-            message=_(u'Pack %s to Archive:') % self._selected_item.s,
-            filename=archive.s)
-        if not archive: return
-        self._pack(archive, self._selected_info, self._selected_item,
-                   release=self.__class__.release)
+        pack_targets = []
+        for project, _inst in self.idata.sorted_pairs(self.selected):
+            #--Generate default filename from the project name and the
+            # default extension
+            archive = GPath(project.s + archives.defaultExt)
+            if len(self.selected) == 1:
+                #--Confirm operation
+                archive = self._askFilename(
+                    message=_(u'Pack %s to Archive:') % project.s,
+                    filename=archive.s)
+                if not archive: return
+            elif archive in self.idata and not self._askYes(
+                    _(u'%s already exists. Overwrite it?') % archive.s,
+                    title=self.dialogTitle, default=False):
+                continue
+            pack_targets.append((project, archive))
+        if not pack_targets: return
+        self._pack(pack_targets, release=self.__class__.release)
 
 #------------------------------------------------------------------------------
 class InstallerProject_ReleasePack(InstallerProject_Pack):
-    """Pack project to an archive for release. Ignores dev files/folders."""
+    """Pack project(s) to archive(s) for release. Ignores dev files/folders."""
     _text = _(u'Package for Release...')
     _help = _(
-        u'Pack project to an archive for release. Ignores dev files/folders')
+        u'Pack project(s) to archive(s) for release. Ignores dev '
+        u'files/folders')
     release = True
 
+#------------------------------------------------------------------------------
+class InstallerProject_StripMips(AppendableLink, _InstallerLink):
+    """Drop the largest mip levels of the textures in project(s)."""
+    _text = _(u'Strip Top Mips...')
+    _help = _(u'Drops the largest mip levels of the textures in the selected '
+              u'project(s), reducing their resolution without re-encoding')
+
+    def _append(self, window):
+        return self._append_if_all(window, lambda inf: inf.is_project())
+
+    def _project_textures(self):
+        """Returns a list of the selected projects and their DDS files."""
+        return [(project, [bass.dirs['installers'].join(project, f) for
+                           f, _s, _c in inst.fileSizeCrcs if
+                           f.lower().endswith(u'.dds')])
+                for project, inst in self.idata.sorted_pairs(self.selected)]
+
+    def _strip(self, project_textures, num_mips, dry_run, progress):
+        """Runs bosh.dds_files.strip_top_mips over all the textures at once,
+        returning per project the total savings and any errors."""
+        results = iter(bosh.dds_files.strip_top_mips(
+            [t for _p, textures in project_textures for t in textures],
+            num_mips, dry_run=dry_run, progress=progress))
+        project_results = []
+        for project, textures in project_textures:
+            saved_total, errors = 0, []
+            for dds_path, saved_bytes, error in islice(results,
+                                                       len(textures)):
+                saved_total += saved_bytes
+                if error: errors.append(u'%s: %s' % (dds_path.tail, error))
+            project_results.append((project, len(textures), saved_total,
+                                    errors))
+        return project_results
+
+    @balt.conversation
+    def Execute(self):
+        num_mips = self._askNumber(
+            _(u'Number of mip levels to drop - each level halves the width '
+              u'and height of the textures:'), prompt=_(u'Mips'),
+            title=self._text, value=1, min=1, max=8)
+        if not num_mips: return
+        project_textures = self._project_textures()
+        with balt.Progress(self._text, u'\n' + u' ' * 60) as progress:
+            dry_run = self._strip(project_textures, num_mips, True, progress)
+        message = [u'%s: %s (%d)' % (project.s, round_size(saved_total),
+                                     num_textures) for
+                   project, num_textures, saved_total, _e in dry_run]
+        total = sum(r[2] for r in dry_run)
+        if not total:
+            self._showInfo(_(u'None of the textures in the selected '
+                             u'project(s) has mip levels that can be '
+                             u'dropped.'), title=self._text)
+            return
+        message.append(_(u'Total savings: %s') % round_size(total))
+        if not self._askYes(u'\n'.join(message) + u'\n\n' + _(
+                u'This will overwrite the textures in the selected project(s)'
+                u' and cannot be undone. Continue?'), title=self._text,
+                default=False): return
+        with balt.Progress(self._text, u'\n' + u' ' * 60) as progress:
+            stripped = self._strip(project_textures, num_mips, False,
+                                   SubProgress(progress, 0, 0.8))
+            progress(0.8, _(u'Refreshing projects...'))
+            for project, _n, saved_total, _e in stripped:
+                if saved_total:
+                    self.idata[project].refreshBasic(
+                        SubProgress(progress, 0.8, 0.99))
+            self.idata.irefresh(what='NS')
+        log = u'== %s\n\n' % self._text
+        for project, _n, saved_total, errors in stripped:
+            log += u'=== %s: %s\n' % (project.s, round_size(saved_total))
+            log += u''.join(u'* %s\n' % e for e in errors) + u'\n'
+        self._showWryeLog(log, title=self._text)
+        self.window.RefreshUI()
+
 #------------------------------------------------------------------------------
 class _InstallerConverter_Link(_InstallerLink):
 
@@ -30,16 +30,19 @@
 from .. import bass, bosh, balt, bush, load_order
 from ..balt import BoolLink, AppendableLink, ItemLink, ListBoxes, \
     EnabledLink
+from ..bolt import round_size
+from ..exception import DDSError
 
 __all__ = ['Installers_SortActive', 'Installers_SortProjects',
            'Installers_Refresh', 'Installers_AddMarker',
            'Installers_CreateNewProject', 'Installers_MonitorInstall',
-           'Installers_ListPackages', 'Installers_AnnealAll',
+           'Installers_ListPackages', 'Installers_AuditTextures',
+           'Installers_AnnealAll',
            'Installers_UninstallAllPackages',
            'Installers_UninstallAllUnknownFiles', 'Installers_AvoidOnStart',
            'Installers_Enabled', 'Installers_AutoAnneal',
            'Installers_AutoWizard', 'Installers_AutoRefreshProjects',
-           'Installers_AutoRefreshBethsoft',
+           'Installers_LinkProjects', 'Installers_AutoRefreshBethsoft',
            'Installers_AutoApplyEmbeddedBCFs', 'Installers_BsaRedirection',
            'Installers_RemoveEmptyDirs',
            'Installers_ConflictsReportShowsInactive',
@@ -180,6 +183,55 @@ def Execute(self):
         balt.copyToClipboard(package_list)
         self._showLog(package_list, title=_(u'BAIN Packages'), fixedFont=False)
 
+class Installers_AuditTextures(Installers_Link):
+    """Report the resolution, format and estimated VRAM of all textures."""
+    _text = _(u'Audit Textures...')
+    _help = _(u'Reads the headers of all textures in Data, in uninstalled '
+              u'projects and in active BSAs and reports their resolution, '
+              u'format, mip count and estimated VRAM usage.')
+    _top_textures = 10 # number of largest textures listed for each source
+
+    def _report_section(self, title, sources):
+        """Format the textures of each source, largest sources first."""
+        section = [u'== %s' % title]
+        totals = []
+        for source, textures in sources.iteritems():
+            infos = []
+            for asset, dds_file in textures:
+                try:
+                    if isinstance(dds_file, unicode): raise DDSError(dds_file)
+                    infos.append((dds_file.image_size(), asset, dds_file))
+                except DDSError as e:
+                    infos.append((0, asset, u'%s' % e))
+            totals.append((sum(i[0] for i in infos), source, infos))
+        for total, source, infos in sorted(totals, key=lambda t: -t[0]):
+            section.append(u'=== %s: %s (%d)' % (
+                source or _(u'Unmanaged'), round_size(total), len(infos)))
+            infos.sort(key=lambda i: -i[0])
+            for size, asset, dds_file in infos[:self._top_textures]:
+                if not size: continue
+                header = dds_file.dds_header
+                section.append(u'* %s: %ux%u %s, %u mips, %s' % (
+                    asset, header.dw_width, header.dw_height,
+                    dds_file.format_name, header.dw_mip_map_count,
+                    round_size(size)))
+            section.extend(u'* %s: %s' % (asset, error) for
+                           _s, asset, error in infos if
+                           isinstance(error, unicode))
+        return u'\n'.join(section) + u'\n\n'
+
+    @balt.conversation
+    def Execute(self):
+        bosh.bsaInfos.refresh()
+        with balt.Progress(_(u'Auditing Textures...'),
+                           u'\n' + u' ' * 60) as progress:
+            loose, projects, bsas = self.idata.audit_textures(bosh.modInfos,
+                                                              progress)
+        log = self._report_section(_(u'Data Directory'), loose)
+        log += self._report_section(_(u'Uninstalled Projects'), projects)
+        log += self._report_section(_(u'Active BSAs'), bsas)
+        self._showWryeLog(log, title=self._text)
+
 class Installers_AnnealAll(Installers_Link):
     """Anneal all packages."""
     _text = _(u'Anneal All')
@@ -293,6 +345,16 @@ class Installers_AutoRefreshProjects(BoolLink):
     _help = _(u'Toggles whether or not Wrye Bash will automatically detect '
               u'changes to projects in the installers directory.')
 
+class Installers_LinkProjects(BoolLink):
+    """Toggle linkProjects setting."""
+    _text = _(u'Link Project Files')
+    key = 'bash.installers.linkProjects'
+    _help = _(u'Toggles whether or not Wrye Bash will install projects by '
+              u'cloning or hard linking their files into the Data folder '
+              u'instead of copying them. Hard linked files share their '
+              u'contents with the project - edits in Data will show up in '
+              u'the project.')
+
 class Installers_AutoApplyEmbeddedBCFs(ItemLink):
     """Automatically apply Embedded BCFs to archives that have one."""
     _text = _(u'Auto-Apply Embedded BCFs')
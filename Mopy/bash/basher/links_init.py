@@ -236,6 +236,7 @@ def InitInstallerLinks():
     InstallersList.mainMenu.append(Installers_MonitorInstall())
     InstallersList.mainMenu.append(SeparatorLink())
     InstallersList.mainMenu.append(Installers_ListPackages())
+    InstallersList.mainMenu.append(Installers_AuditTextures())
     InstallersList.mainMenu.append(SeparatorLink())
     InstallersList.mainMenu.append(Installers_AnnealAll())
     InstallersList.mainMenu.append(SeparatorLink())
@@ -251,6 +252,7 @@ def InitInstallerLinks():
     if bEnableWizard:
         InstallersList.mainMenu.append(Installers_AutoWizard())
     InstallersList.mainMenu.append(Installers_AutoRefreshProjects())
+    InstallersList.mainMenu.append(Installers_LinkProjects())
     InstallersList.mainMenu.append(Installers_AutoRefreshBethsoft())
     InstallersList.mainMenu.append(Installers_BsaRedirection())
     InstallersList.mainMenu.append(Installers_RemoveEmptyDirs())
@@ -310,6 +312,7 @@ def InitInstallerLinks():
         packageMenu.links.append(SeparatorLink())
         packageMenu.links.append(Installer_ListStructure())
         packageMenu.links.append(InstallerProject_Sync())
+        packageMenu.links.append(InstallerProject_StripMips())
         packageMenu.links.append(InstallerArchive_Unpack())
         packageMenu.links.append(Installer_CopyConflicts())
         InstallersList.itemMenu.append(packageMenu)
@@ -413,6 +416,7 @@ def InitModLinks():
     ModList.mainMenu.append(Mods_ScanDirty())
     ModList.mainMenu.append(SeparatorLink())
     ModList.mainMenu.append(Mods_CrcRefresh())
+    ModList.mainMenu.append(Mods_VerifyBSAs())
     #--ModList: Item Links
     if bass.inisettings['ShowDevTools'] and bush.game.Esp.canBash:
         ModList.itemMenu.append(Mod_FullLoad())
@@ -666,6 +670,7 @@ def InitBSALinks():
     BSAList.itemMenu.append(file_menu)
     BSAList.itemMenu.append(BSA_ExtractToProject())
     BSAList.itemMenu.append(BSA_ListContents())
+    BSAList.itemMenu.append(BSA_Verify())
 
 #------------------------------------------------------------------------------
 def InitScreenLinks():
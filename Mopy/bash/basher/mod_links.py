@@ -34,7 +34,7 @@
 from .constants import settingDefaults
 from .files_links import File_Redate
 from .frames import DocBrowser
-from .patcher_dialog import PatchDialog, CBash_gui_patchers, PBash_gui_patchers
+from .patcher_dialog import PatchDialog, all_gui_patchers
 from .. import bass, bosh, bolt, balt, bush, mod_files, load_order
 from ..balt import ItemLink, Link, CheckLink, EnabledLink, AppendableLink,\
     TransLink, RadioLink, SeparatorLink, ChoiceLink, OneItemLink, ListBoxes
@@ -1142,8 +1142,7 @@ def Execute(self):
                                              'bash.patch.configs', {})
         # Detect CBash/Python mode patch
         doCBash = configIsCBash(config)
-        _gui_patchers = [copy.deepcopy(x) for x in
-                    (CBash_gui_patchers if doCBash else PBash_gui_patchers)]
+        _gui_patchers = [copy.deepcopy(x) for x in all_gui_patchers(doCBash)]
         _gui_patchers.sort(key=lambda a: a.__class__.patcher_name)
         _gui_patchers.sort(key=lambda a: groupOrder[a.patcher_type.group])
         #--Log & Clipboard text
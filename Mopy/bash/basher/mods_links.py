@@ -31,13 +31,14 @@
 from ..balt import ItemLink, CheckLink, BoolLink, EnabledLink, ChoiceLink, \
     SeparatorLink, Link
 from ..bolt import GPath
-from ..gui import BusyCursor
+from .bsa_links import BSA_Verify
 
 __all__ = ['Mods_EsmsFirst', 'Mods_LoadList', 'Mods_SelectedFirst',
            'Mods_OblivionVersion', 'Mods_CreateBlankBashedPatch',
            'Mods_CreateBlank', 'Mods_ListMods', 'Mods_ListBashTags',
            'Mods_CleanDummyMasters', 'Mods_AutoGhost', 'Mods_LockLoadOrder',
-           'Mods_ScanDirty', 'Mods_CrcRefresh', 'Mods_AutoESLFlagBP']
+           'Mods_ScanDirty', 'Mods_CrcRefresh', 'Mods_AutoESLFlagBP',
+           'Mods_VerifyBSAs']
 
 # "Load" submenu --------------------------------------------------------------
 class _Mods_LoadListData(balt.ListEditorData):
@@ -350,7 +351,8 @@ class Mods_CrcRefresh(ItemLink):
     @balt.conversation
     def Execute(self):
         message = u'== %s' % _(u'Mismatched CRCs') + u'\n\n'
-        with BusyCursor(): pairs = bosh.modInfos.refresh_crcs()
+        with balt.Progress(self._text, u'\n' + u' ' * 60) as progress:
+            pairs = bosh.modInfos.refresh_crcs(progress=progress)
         mismatched = dict((k, v) for k, v in pairs.iteritems() if v[0] != v[1])
         if mismatched:
             message += u'  * ' + u'\n  * '.join(
@@ -359,3 +361,14 @@ def Execute(self):
             self.window.RefreshUI(redraw=mismatched.keys(), refreshSaves=False)
         else: message += _(u'No stale cached CRC values detected')
         self._showWryeLog(message)
+
+#------------------------------------------------------------------------------
+class Mods_VerifyBSAs(BSA_Verify):
+    """Verify the integrity of all active BSAs."""
+    _text = _(u'Verify Active BSAs...')
+    _help = _(u'Decompresses every file of the BSAs loaded by the active '
+              u'plugins and reports any corrupt data or names.')
+
+    def _bsas_to_verify(self):
+        bosh.bsaInfos.refresh()
+        return list(bosh.modInfos.get_active_bsas())
@@ -46,6 +46,18 @@
 # gui_patchers.InitPatchers() based on game. These must be copied as needed.
 PBash_gui_patchers = [] #--All gui patchers classes for this game
 CBash_gui_patchers = [] #--All gui patchers classes for this game (CBash mode)
+_gui_patchers_initialized = False
+
+def all_gui_patchers(doCBash):
+    """Return the list of gui patchers of this game - initialized on first
+    use, as importing the patchers is only needed to configure or build a
+    Bashed Patch and slows down booting considerably."""
+    global _gui_patchers_initialized
+    if not _gui_patchers_initialized:
+        from .gui_patchers import initPatchers
+        initPatchers()
+        _gui_patchers_initialized = True
+    return CBash_gui_patchers if doCBash else PBash_gui_patchers
 
 class PatchDialog(DialogWindow):
     """Bash Patch update dialog.
@@ -69,6 +81,7 @@ def __init__(self, parent, patchInfo, doCBash, importConfig,
         self.set_min_size(400, 300)
         #--Data
         list_patches_dir() # refresh cached dir
+        all_gui_patchers(doCBash) # before ConvertConfig, fills otherPatcherDict
         groupOrder = dict([(group,index) for index,group in
             enumerate((_(u'General'),_(u'Importers'),_(u'Tweakers'),_(u'Special')))])
         patchConfigs = bosh.modInfos.table.getItem(patchInfo.name,'bash.patch.configs',{})
@@ -81,8 +94,8 @@ def __init__(self, parent, patchInfo, doCBash, importConfig,
                 patchConfigs = {}
         isFirstLoad = 0 == len(patchConfigs)
         self.patchInfo = patchInfo
-        self._gui_patchers = [copy.deepcopy(p) for p in (
-            CBash_gui_patchers if doCBash else PBash_gui_patchers)]
+        self._gui_patchers = [copy.deepcopy(p) for p in
+                              all_gui_patchers(doCBash)]
         self._gui_patchers.sort(key=lambda a: a.__class__.patcher_name)
         self._gui_patchers.sort(key=lambda a: groupOrder[a.patcher_type.group]) ##: what does this ordering do??
         for patcher in self._gui_patchers:
@@ -44,10 +44,15 @@
 import sys
 import tempfile
 import textwrap
+import thread
+import time
 import traceback
 from binascii import crc32
-from functools import partial
+from functools import partial, wraps
 from itertools import chain
+import multiprocessing
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 # Internal
 from . import exception
 
@@ -1455,6 +1460,120 @@ def save(self):
         self.path.untemp(doBackup=True)
         return True
 
+#------------------------------------------------------------------------------
+class PickleLog(object):
+    """Store of pickled byte strings, saved as an append only log of
+    (key, value) records, so that saving a few changed values does not
+    rewrite the whole store. Later records override earlier ones with the
+    same key, a None value deletes the key. Values are byte strings, pickled
+    (and unpickled) by the client, so it can compare them with what's
+    stored and only unpickle what it needs. Call compact() instead of
+    append() when needs_compaction() - that also creates the log."""
+    _header = 'WBLOG1'
+
+    def __init__(self, path):
+        self.path = path
+        self.backup = path.backup
+        self._live = {} # key -> size of its current record
+        self._file_size = 0
+
+    def exists(self):
+        return self.path.exists()
+
+    def load(self):
+        """Read the log and return a dict of keys to (byte string) values.
+        A truncated or corrupted tail (from a crash while appending) is
+        dropped. If the log is unreadable the backup (the log as of the
+        previous compaction) is read instead."""
+        values, good_pos, file_size = self._load_file(self.path)
+        if not good_pos:
+            if file_size: self.path.remove()
+            if self.backup.exists():
+                values = self._load_file(self.backup)[0]
+            # there is no log to append to - reset what _load_file set for
+            # the backup, so that needs_compaction makes the next save
+            # rewrite the whole log
+            self._file_size = 0
+            self._live.clear()
+        elif file_size != good_pos:
+            # Appending after a broken record would make the rest unreadable
+            with self.path.open('r+b') as out:
+                out.truncate(good_pos)
+            self._file_size = good_pos
+        return values
+
+    def _load_file(self, path):
+        self._live.clear()
+        self._file_size = 0
+        values = {}
+        good_pos = file_size = 0
+        try:
+            ins = path.open('rb')
+        except (IOError, OSError):
+            return values, good_pos, file_size
+        with ins:
+            try:
+                if pickle.load(ins) != self._header:
+                    raise ValueError(u'Bad header')
+                good_pos = ins.tell()
+                while True:
+                    try:
+                        key, value = pickle.load(ins)
+                    except EOFError:
+                        if ins.tell() != good_pos: raise # truncated record
+                        break
+                    record_size = ins.tell() - good_pos
+                    good_pos = ins.tell()
+                    if value is None:
+                        values.pop(key, None)
+                        self._live.pop(key, None)
+                    else:
+                        values[key] = value
+                        self._live[key] = record_size
+            except Exception:
+                deprint(u'%s: dropping corrupted records after byte %d' % (
+                    path, good_pos), traceback=True)
+                if not good_pos: values.clear()
+            ins.seek(0, os.SEEK_END)
+            file_size = self._file_size = ins.tell()
+        return values, good_pos, file_size
+
+    def append(self, records):
+        """Append the (key, value) pairs in records to the log. A new (or
+        unreadable) log must be written with compact instead."""
+        if not records: return
+        if not self._file_size:
+            raise exception.StateError(u'%s: must be compacted' % self.path)
+        with self.path.open('ab') as out:
+            out.seek(0, os.SEEK_END) # tell() may return 0 on windows else
+            self._dump(records, out)
+
+    def compact(self, records):
+        """Rewrite the log with just the (key, value) pairs in records, which
+        must be the full contents of the store."""
+        self._live.clear()
+        with self.path.temp.open('wb') as out:
+            pickle.dump(self._header, out, -1)
+            self._dump(records, out)
+        self.path.untemp(doBackup=True)
+
+    def _dump(self, records, out):
+        for key, value in records:
+            pos = out.tell()
+            pickle.dump((key, value), out, -1)
+            if value is None:
+                self._live.pop(key, None)
+            else:
+                self._live[key] = out.tell() - pos
+        self._file_size = out.tell()
+
+    def needs_compaction(self, min_size=1048576):
+        """True if the log must be written from scratch or most of it is
+        taken up by overridden records."""
+        if not self._file_size: return True
+        dead = self._file_size - sum(self._live.itervalues())
+        return dead > min_size and dead > self._file_size // 2
+
 #------------------------------------------------------------------------------
 class Settings(DataDict):
     """Settings/configuration dictionary with persistent storage.
@@ -1975,6 +2094,230 @@ def __call__(self,state,message=u''):
         self.parent(self.baseFrom+self.scale*state/self.full,message)
         self.state = state
 
+#------------------------------------------------------------------------------
+def max_workers():
+    """Return the number of worker threads to use for parallel jobs."""
+    try:
+        return cpu_count()
+    except NotImplementedError:
+        return 1
+
+class _JobProgress(Progress):
+    """Progress of a job running in a worker thread - just records how far
+    along the job is, for the calling thread to report. Raises CancelError
+    once the caller cancels, so the job stops at its next progress call.
+    Jobs must setFull before reporting progress - done is state / full."""
+    def __init__(self):
+        super(_JobProgress, self).__init__()
+        self.done = 0.0
+        self.cancelled = False
+
+    def _do_progress(self, state, message):
+        if self.cancelled: raise exception.CancelError
+        self.done = max(0.0, min(state, 1.0)) # state is already / full
+
+def parallel_map(func, items, progress=None, workers=None,
+                 job_progress=False, job_weights=None):
+    """Apply func to each of items on a pool of worker threads and return
+    the list of results, in the order of items. Only worth it for functions
+    that release the GIL (file I/O, zlib, lz4, subprocesses). Exceptions
+    raised by func are reraised here, dropping any jobs not yet started.
+
+    :param progress: if given it's set to len(items) and called from the
+        calling thread as jobs progress - so it is safe to pass in GUI
+        progress dialogs, and a CancelError they raise stops the pool
+    :param workers: maximum number of threads, defaults to max_workers()
+    :param job_progress: if True func is called as func(item, job_progress)
+        where job_progress is a Progress the job should update - progress
+        will then report the combined progress of the running jobs. Calling
+        job_progress raises CancelError once the caller cancels
+    :param job_weights: if given, a positive weight per item (for instance
+        the number of bytes the job will process) - progress is then set to
+        the sum of the weights instead of len(items)"""
+    items = list(items)
+    weights = [1] * len(items) if job_weights is None else list(job_weights)
+    if progress is not None: progress.setFull(max(sum(weights), 1))
+    workers = min(workers or max_workers(), len(items))
+    if workers <= 1:
+        results = []
+        done = 0
+        for item, weight in zip(items, weights):
+            if job_progress:
+                sub = Progress() if progress is None else SubProgress(
+                    progress, done, done + weight)
+                results.append(func(item, sub))
+            else:
+                results.append(func(item))
+            done += weight
+            if progress is not None: progress(done)
+        return results
+    jobs = [_JobProgress() for _item in items] if job_progress else []
+    if job_progress:
+        run_job = lambda i: func(items[i], jobs[i])
+    else:
+        run_job = lambda i: func(items[i])
+    pool = ThreadPool(workers)
+    try:
+        results = []
+        results_iter = pool.imap(run_job, xrange(len(items)))
+        while len(results) < len(items):
+            try:
+                results.append(results_iter.next(0.2))
+            except multiprocessing.TimeoutError:
+                pass
+            if progress is not None:
+                # results come in order - later jobs may be done already
+                finished = len(results)
+                progress(sum(weights[:finished]) + sum(
+                    w * j.done for w, j in zip(weights[finished:],
+                                               jobs[finished:])))
+        return results
+    finally:
+        for j in jobs: j.cancelled = True
+        pool.terminate()
+        pool.join()
+
+def _file_crc(path_size, job_progress):
+    """Return the CRC of the file at path_size[0], or None if it could not be
+    read - a job for calculate_crcs."""
+    file_path, file_size = path_size
+    job_progress.setFull(file_size + 1)
+    crc = 0
+    try:
+        with open(file_path, u'rb') as ins:
+            insTell = ins.tell
+            for block in iter(partial(ins.read, 2097152), ''):
+                crc = crc32(block, crc) # 2MB at a time, probably ok
+                job_progress(insTell())
+    except IOError:
+        deprint(u'Failed to calculate crc for %s - please report this, and '
+                u'the following traceback:' % file_path, traceback=True)
+        return None
+    return crc & 0xFFFFFFFF
+
+def calculate_crcs(paths_sizes, progress=None, workers=None):
+    """Return the CRCs of the files in paths_sizes, a list of (path, size)
+    tuples, in the same order - None for files that could not be read. Files
+    are read on worker threads, so that waiting on the disk for one file
+    overlaps with hashing the others - crc32 itself holds the GIL, so the
+    hashing is not parallel. Progress is reported in bytes, size + 1 per
+    file so empty files still count.
+
+    :param paths_sizes: list of (unicode path, size in bytes) tuples"""
+    paths_sizes = list(paths_sizes)
+    return parallel_map(_file_crc, paths_sizes, progress=progress,
+                        workers=workers, job_progress=True,
+                        job_weights=[s + 1 for _p, s in paths_sizes])
+
+#------------------------------------------------------------------------------
+class _StartupTrace(object):
+    """Records how long importing each module and each phase of booting
+    takes, when Bash is started with --trace-startup. Only imports done by
+    the main thread are timed - the report is written by finish(), once the
+    main window is up."""
+    report_name = u'BashStartup.log'
+
+    def __init__(self):
+        self.enabled = False
+        self._start = 0
+        self._main_thread = None
+        self._import = None
+        self._import_stack = [] # time spent in nested imports, per level
+        self._import_times = [] # (module names, self time, total time)
+        self._phase_times = [] # (phase, time)
+
+    def start(self):
+        """Start timing imports and boot phases."""
+        import __builtin__
+        if self.enabled: return
+        self.enabled = True
+        self._start = time.time()
+        self._main_thread = thread.get_ident()
+        self._import = __builtin__.__import__
+        __builtin__.__import__ = self._timed_import
+
+    def _timed_import(self, name, globals_=None, locals_=None, fromlist=(),
+                      level=-1):
+        if thread.get_ident() != self._main_thread:
+            return self._import(name, globals_, locals_, fromlist, level)
+        known = len(sys.modules)
+        self._import_stack.append(0.0)
+        start = time.time()
+        try:
+            return self._import(name, globals_, locals_, fromlist, level)
+        finally:
+            total = time.time() - start
+            nested = self._import_stack.pop()
+            if self._import_stack: self._import_stack[-1] += total
+            if len(sys.modules) > known: # not just a lookup
+                if not name: # from . import x - name the importing module
+                    name = (globals_ or {}).get('__name__')
+                if fromlist:
+                    name = u'%s: %s' % (name, u', '.join(fromlist))
+                self._import_times.append((name, total - nested, total))
+
+    def phase(self, phase_name):
+        """Return a context manager timing a phase of booting."""
+        return _StartupPhase(self, phase_name)
+
+    def add_phase(self, phase_name, phase_time):
+        self._phase_times.append((phase_name, phase_time))
+
+    def finish(self):
+        """Stop timing and write the report to report_name, in the current
+        directory."""
+        import __builtin__
+        if not self.enabled: return
+        self.enabled = False
+        __builtin__.__import__ = self._import
+        lines = [u'Wrye Bash started in %.3fs' % (time.time() - self._start),
+                 u'', u'Boot phases (s):']
+        lines.extend(u'  %8.3f  %s' % (phase_time, phase_name)
+                     for phase_name, phase_time in self._phase_times)
+        lines.extend([u'', u'Imports taking 1ms or more, slowest first '
+                           u'(self / total s):'])
+        lines.extend(u'  %8.3f / %8.3f  %s' % (self_time, total, name)
+                     for name, self_time, total in sorted(
+                self._import_times, key=lambda t: t[1], reverse=True)
+                     if total >= 0.001)
+        try:
+            with open(self.report_name, u'w') as out:
+                out.write(u'\n'.join(lines).encode(u'utf-8') + b'\n')
+            deprint(u'Startup trace written to %s' % self.report_name)
+        except (OSError, IOError):
+            deprint(u'Failed to write the startup trace', traceback=True)
+        del self._import_times[:], self._phase_times[:]
+
+class _StartupPhase(object):
+    __slots__ = (u'_trace', u'_phase_name', u'_start')
+
+    def __init__(self, trace, phase_name):
+        self._trace = trace
+        self._phase_name = phase_name
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if self._trace.enabled:
+            self._trace.add_phase(self._phase_name, time.time() - self._start)
+
+startup_trace = _StartupTrace()
+
+def startup_phase(phase_name):
+    """Decorator timing each call of the decorated function as a phase of
+    booting, if the startup trace is running."""
+    def _decorator(func):
+        @wraps(func)
+        def _traced(*args, **kwargs):
+            if not startup_trace.enabled:
+                return func(*args, **kwargs)
+            with startup_trace.phase(phase_name):
+                return func(*args, **kwargs)
+        return _traced
+    return _decorator
+
 #------------------------------------------------------------------------------
 def readCString(ins, file_path):
     """Read null terminated string, dropping the final null byte."""
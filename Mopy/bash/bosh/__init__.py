@@ -37,12 +37,14 @@
 import struct
 import sys
 import time
-import traceback
 from collections import OrderedDict, Iterable
 from functools import wraps, partial
 from itertools import imap
+from zlib import crc32
 #--Local
-from ._mergeability import isPBashMergeable, isCBashMergeable, is_esl_capable
+from ._mergeability import isPBashMergeable, isCBashMergeable, \
+    is_esl_capable, esl_load_reasons, pbash_load_reasons, pbash_needs_load
+from .loot_conditions import EvaluationPass
 from .mods_metadata import ConfigHelpers
 from .. import bass, bolt, balt, bush, env, load_order, archives, \
     initialization
@@ -415,6 +417,8 @@ def setType(self, esm_or_esp):
             modFile.seek(8)
             modFile.write(struct_pack('=I', int(flags1)))
         self.header.flags1 = flags1
+        # size and mtime stay the same, so the cached header must go
+        modInfos.drop_cached_header(self.name)
         self.setmtime(crc_changed=True)
 
     def calculate_crc(self, recalculate=False):
@@ -425,14 +429,22 @@ def calculate_crc(self, recalculate=False):
             recalculate = cached_crc is None \
                           or self._file_mod_time != cached_mtime \
                           or self._file_size != cached_size
-        path_crc = cached_crc
         if recalculate:
-            path_crc = self.abs_path.crc
-            if path_crc != cached_crc:
-                modInfos.table.setItem(self.name,'crc',path_crc)
-                modInfos.table.setItem(self.name,'ignoreDirty',False)
-            modInfos.table.setItem(self.name, 'crc_mtime', self._file_mod_time)
-            modInfos.table.setItem(self.name, 'crc_size', self._file_size)
+            path_crc = modInfos.read_ahead(self)[1] if \
+                self._in_data() else None
+            return self.cache_crc(self.abs_path.crc if path_crc is None
+                                  else path_crc)
+        return cached_crc, cached_crc
+
+    def cache_crc(self, path_crc):
+        """Store path_crc, freshly calculated from our file, in the modInfos
+        table and return it along with the previously cached crc."""
+        cached_crc = modInfos.table.getItem(self.name, 'crc')
+        if path_crc != cached_crc:
+            modInfos.table.setItem(self.name,'crc',path_crc)
+            modInfos.table.setItem(self.name,'ignoreDirty',False)
+        modInfos.table.setItem(self.name, 'crc_mtime', self._file_mod_time)
+        modInfos.table.setItem(self.name, 'crc_size', self._file_size)
         return path_crc, cached_crc
 
     def cached_mod_crc(self): # be sure it's valid before using it!
@@ -546,8 +558,23 @@ def getBashTagsDesc(self, filter_unknown=True):
             if filter_unknown: tags_set &= bush.game.allTags - removed_tags
             return tags_set
 
-    def reloadBashTags(self):
+    def bash_tags_key(self, tag_files_stats=None):
+        """Returns a key identifying all the inputs of reloadBashTags for this
+        mod: its description, its LOOT entry, the stat of its Data/BashTags
+        file and the tags known to the game. If it did not change, neither
+        did the automatic tags.
+
+        :param tag_files_stats: Optional, see ConfigHelpers.tag_files_stats"""
+        description = self.header.description or u''
+        return (crc32(description.encode(u'utf-8')),
+                configHelpers.get_tags_key(self.name),
+                configHelpers.tag_file_stat(self.name, tag_files_stats),
+                modInfos.all_tags_crc)
+
+    def reloadBashTags(self, _tags_key=None):
         """Reloads bash tags from mod description, LOOT and Data/BashTags."""
+        # compute the key first, so that we don't store it for newer inputs
+        tags_key = _tags_key or self.bash_tags_key()
         tags = set()
         tags |= self.getBashTagsDesc()
         # Tags from LOOT take precendence over the description
@@ -562,25 +589,58 @@ def reloadBashTags(self):
         # Filter out unknown tags and store the result
         tags &= bush.game.allTags
         self.setBashTags(tags)
+        modInfos.table.setItem(self.name, 'bashTags_key', tags_key)
 
     #--Header Editing ---------------------------------------------------------
     def _read_tes4_record(self, ins):
+        return self._read_tes4_header(self.name, ins)
+
+    @staticmethod
+    def _read_tes4_header(mod_name, ins):
         tes4_rec_header = ins.unpackRecHeader()
         if tes4_rec_header.recType != bush.game.Esp.plugin_header_sig:
-            raise ModError(self.name, u'Expected %s, but got %s' % (
+            raise ModError(mod_name, u'Expected %s, but got %s' % (
                 unicode(bush.game.Esp.plugin_header_sig, encoding=u'ascii'),
                 unicode(tes4_rec_header.recType, encoding=u'ascii')))
         return tes4_rec_header
 
+    @staticmethod
+    def _read_tes4_data(mod_name, mod_path):
+        """Return the raw header record of the plugin at mod_path."""
+        with mod_path.open('rb') as ins:
+            try:
+                tes4_rec_header = ModInfo._read_tes4_header(
+                    mod_name, ModReader(mod_name, ins))
+            except struct.error as rex:
+                raise ModError(mod_name, u'Struct.error: %s' % rex)
+            rec_header_size = ins.tell()
+            ins.seek(0)
+            return ins.read(rec_header_size + tes4_rec_header.size)
+
+    def _in_data(self):
+        """True if this is a plugin in Data, rather than a file ModInfos
+        wraps elsewhere - the caches of modInfos are keyed by name."""
+        return modInfos is not None and self.dir == modInfos.store_dir
+
     def readHeader(self):
-        """Read header from file and set self.header attribute."""
-        with ModReader(self.name,self.getPath().open('rb')) as ins:
+        """Read header from file and set self.header attribute. The raw
+        header record is cached, so that plugins that did not change since
+        the last run are not opened at all - only for plugins in Data."""
+        use_cache = self._in_data()
+        tes4_data = modInfos.cached_header(self) if use_cache else None
+        cache_header = use_cache and tes4_data is None
+        if cache_header: # the refresh may have read it already
+            tes4_data = modInfos.read_ahead(self)[0]
+        if tes4_data is None:
+            tes4_data = self._read_tes4_data(self.name, self.getPath())
+        with ModReader(self.name, sio(tes4_data)) as ins:
             try:
                 tes4_rec_header = self._read_tes4_record(ins)
                 self.header = bush.game.plugin_header_class(tes4_rec_header,
                                                             ins, True)
             except struct.error as rex:
                 raise ModError(self.name,u'Struct.error: %s' % rex)
+        if cache_header: modInfos.cache_header(self, tes4_data)
         if bush.game.fsName in (u'Skyrim Special Edition', u'Skyrim VR'):
             if tes4_rec_header.form_version != \
                     RecordHeader.plugin_form_version:
@@ -608,11 +668,16 @@ def writeHeader(self):
                     raise ModError(self.name,u'Struct.error: %s' % rex)
         #--Remove original and replace with temp
         filePath.untemp()
+        modInfos.drop_cached_header(self.name)
         self.setmtime(crc_changed=True)
-        #--Merge info
-        size,canMerge = modInfos.table.getItem(self.name,'mergeInfo',(None,None))
-        if size is not None:
-            modInfos.table.setItem(self.name,'mergeInfo',(filePath.size,canMerge))
+        #--Merge info - still valid if the masters did not change
+        merge_info = modInfos.table.getItem(self.name, 'mergeInfo')
+        merge_key = modInfos.merge_key(self)
+        try:
+            if merge_info[0][1] == merge_key[1]:
+                modInfos.table.setItem(self.name, 'mergeInfo',
+                                       (merge_key,) + merge_info[1:])
+        except TypeError: pass # not scanned yet or scanned by an older Bash
 
     def writeDescription(self,description):
         """Sets description to specified text and then writes hedr."""
@@ -665,7 +730,7 @@ def mod_bsas(self, bsa_infos=None):
 
     def hasBsa(self):
         """Returns True if plugin has an associated BSA."""
-        return bool(self.mod_bsas())
+        return bool(_DataSnapshot.current().mod_bsas(self))
 
     def getIniPath(self):
         """Returns path to plugin's INI, if it were to exists."""
@@ -742,63 +807,54 @@ def _extra_bsas(self):
             string_bsas = bush.game.Bsa.vanilla_string_bsas[self.name.cs]
             bsa_infos = [bsaInfos[b] for b in (GPath(s) for s in string_bsas) if b in bsaInfos]
         else:
-            bsa_infos = self.mod_bsas() # first check bsa with same name
-            for iniFile in modInfos.ini_files():
-                for key in bush.game.Ini.resource_archives_keys:
-                    extraBsas = (
-                        GPath(x.strip())
-                        for x in iniFile.getSetting(u'Archive', key, u'').split(u',')
-                    )
-                    bsa_infos.extend(
-                        bsaInfos[bsa] for bsa in extraBsas if bsa in bsaInfos)
+            snapshot = _DataSnapshot.current()
+            # first check bsa with same name
+            bsa_infos = snapshot.mod_bsas(self) + snapshot.ini_bsas()
         return bsa_infos
 
-    def isMissingStrings(self, __debug=0):
+    @staticmethod
+    def _ini_bsas():
+        """Return a list of the bsas the game INIs load for all plugins.
+        :rtype: list[BSAInfo]
+        """
+        bsa_infos = []
+        for iniFile in modInfos.ini_files():
+            for key in bush.game.Ini.resource_archives_keys:
+                extraBsas = (
+                    GPath(x.strip())
+                    for x in iniFile.getSetting(u'Archive', key, u'').split(u',')
+                )
+                bsa_infos.extend(
+                    bsaInfos[bsa] for bsa in extraBsas if bsa in bsaInfos)
+        return bsa_infos
+
+    def isMissingStrings(self):
         """True if the mod says it has .STRINGS files, but the files are
         missing."""
         if not self.header.flags1.hasStrings: return False
-        lang = oblivionIni.get_ini_language()
-        bsa_infos = self._extra_bsas()
-        for assetPath in self._string_files_paths(lang):
-            # Check loose files first
-            if self.dir.join(assetPath).exists():
-                continue
-            # Check in BSA's next
-            if __debug == 1:
-                deprint(u'Scanning BSAs for string files for %s' % self.name)
-                __debug = 2
-            for bsa_info in bsa_infos:
-                try:
-                    if bsa_info.has_assets({assetPath}):
-                        break # found
-                except (BSAError, OverflowError):
-                    print(u'Failed to parse %s:\n%s' % (
-                        bsa_info.name, traceback.format_exc()))
-                    continue
-                if __debug == 2:
-                    deprint(u'Asset %s not in %s' % (assetPath, bsa_info.name))
-            else: # not found
-                return True
-        return False
+        return bool(_DataSnapshot.current().missing_strings(self))
 
     def hasResources(self):
         """Returns (hasBsa, has_blocking_resources) booleans according to
         presence of corresponding resources (a BSA with a matching name and one
         or more plugin-name-specific folder, respectively)."""
-        return (self.hasBsa(), any(self._check_resources(pnd) for pnd
-                                   in bush.game.plugin_name_specific_dirs))
+        snapshot = _DataSnapshot.current()
+        return (bool(snapshot.mod_bsas(self)),
+                any(self._check_resources(pnd, snapshot) for pnd
+                    in bush.game.plugin_name_specific_dirs))
 
-    def _check_resources(self, resource_path):
+    def _check_resources(self, resource_path, snapshot):
         """Returns True if the directory created by joining self.dir, the
         specified path and self.name exists. Used to check for the existence
         of plugin-name-specific directories, which prevent merging.
 
         :param resource_path: The path to the plugin-name-specific directory,
-        as a list of path components."""
+        as a list of path components.
+        :type snapshot: _DataSnapshot"""
         # If resource_path is empty, then we would effectively query
         # self.dir.join(self.name), which always exists - that's the mod file!
-        return resource_path and self.dir.join(*resource_path).join(
-            self.name).exists()
+        return resource_path and snapshot.exists(
+            empty_path.join(*resource_path).join(self.name))
 
     def has_master_size_mismatch(self):
         """Checks if this plugin has at least one stored master size that does
@@ -995,6 +1051,17 @@ def readHeader(self):
             raise SaveFileError, (self.name, e.message), sys.exc_info()[2]
         self._reset_masters()
 
+    def needs_update(self):
+        # The save changed if any of its cosaves were added, deleted or changed
+        if super(SaveInfo, self).needs_update(): return True
+        for co_type in SaveInfo.cosave_types:
+            co_path = co_type.get_cosave_path(self.abs_path)
+            if co_path.isfile() != (co_type in self._co_saves) or (
+                    co_type in self._co_saves and
+                    self._co_saves[co_type].needs_update()):
+                return True
+        return False
+
     def do_update(self):
         # Check for new and deleted cosaves and do_update old, surviving ones
         cosaves_changed = False
@@ -1337,6 +1404,7 @@ class FileInfos(TableFileInfos):
     def _initDB(self, dir_):
         super(FileInfos, self)._initDB(dir_)
         self.corrupted = {} #--errorMessage = corrupted[fileName]
+        self._read_ahead_data = {} # see _read_ahead
 
     #--Refresh File
     def new_info(self, fileName, _in_refresh=False, owner=None,
@@ -1353,28 +1421,55 @@ def new_info(self, fileName, _in_refresh=False, owner=None,
             raise
 
     #--Refresh
+    _reads_ahead = False # True if _read_ahead is worth a thread pool
+
+    def _read_ahead(self, fileName):
+        """Read from disk what loading the info of fileName needs, so that
+        loading it does not block on the file - run from the refresh worker
+        threads, so it must not modify any shared state. The result is kept
+        in self._read_ahead_data while the infos are loaded."""
+        return None
+
+    @staticmethod
+    def _info_changed(fileInfo):
+        try:
+            return fileInfo.needs_update()
+        except OSError: # deleted or (un)ghosted - let do_update handle it
+            return True
+
     def refresh(self, refresh_infos=True, booting=False):
-        """Refresh from file directory."""
+        """Refresh from file directory. If the infos read ahead, the files of
+        new and changed infos are read on a pool of worker threads first,
+        the infos are then loaded in order of file name."""
         oldNames = set(self.data) | set(self.corrupted)
         _added = set()
         _updated = set()
         newNames = self._names()
-        for new in newNames: #--Might have '.ghost' lopped off.
-            oldInfo = self.get(new) # None if new was in corrupted or new one
-            try:
-                if oldInfo is not None:
-                    if oldInfo.do_update(): # will reread the header
-                        _updated.add(new)
-                else: # added or known corrupted, get a new info
-                    self.new_info(new, _in_refresh=True,
-                                  notify_bain=not booting)
-                    _added.add(new)
-            except FileError as e: # old still corrupted, or new(ly) corrupted
-                if not new in self.corrupted \
-                        or self.corrupted[new] != e.message:
-                    deprint(u'Failed to load %s: %s' % (new, e.message)) #, traceback=True)
-                    self.corrupted[new] = e.message
-                self.pop(new, None)
+        to_load = [new for new in sorted(newNames) #--Might have '.ghost'
+                   if new not in self.data or # lopped off
+                   self._info_changed(self.data[new])]
+        if self._reads_ahead and to_load:
+            self._read_ahead_data = dict(zip(to_load, bolt.parallel_map(
+                self._read_ahead, to_load)))
+        try:
+            for new in to_load:
+                oldInfo = self.get(new) # None if new was in corrupted or new
+                try:
+                    if oldInfo is not None:
+                        if oldInfo.do_update(): # will reread the header
+                            _updated.add(new)
+                    else: # added or known corrupted, get a new info
+                        self.new_info(new, _in_refresh=True,
+                                      notify_bain=not booting)
+                        _added.add(new)
+                except FileError as e: # old still corrupted, or new(ly) corrupted
+                    if not new in self.corrupted \
+                            or self.corrupted[new] != e.message:
+                        deprint(u'Failed to load %s: %s' % (new, e.message)) #, traceback=True)
+                        self.corrupted[new] = e.message
+                    self.pop(new, None)
+        finally:
+            self._read_ahead_data = {}
         _deleted = oldNames - newNames
         self.delete_refresh(_deleted, None, check_existence=False,
                             _in_refresh=True)
@@ -1729,6 +1824,133 @@ def _modinfos_cache_wrapper(self, *args, **kwargs):
                 load_order.cached_lord.activeOrdered)
     return _modinfos_cache_wrapper
 
+#------------------------------------------------------------------------------
+_data_snapshot = None # the _DataSnapshot shared by a batch of checks, if any
+_bsa_suffix = re.compile(u'(.+) - \\w+$', re.U)
+
+class _DataSnapshot(object):
+    """Case-folded snapshot of the parts of the Data folder the missing
+    strings and resource checks of plugins depend on. Context manager for
+    running such checks on many plugins: while it is entered they all share
+    it, so each directory is listed once and each BSA is searched once for
+    the strings files of all plugins, instead of checking the files of each
+    plugin one by one. Single checks use a snapshot of their own. The bsas
+    are searched through the AssetResolver of the installers, so the ones
+    it has indexed are not read again - it can't stand in for the listings
+    though, as BAIN's table of the loose files skips the game's own files and
+    is only there once the Data folder has been scanned."""
+    __slots__ = (u'_outer_snapshot', u'_listings', u'_bsas_by_mod',
+                 u'_ini_bsa_infos', u'_strings_lang', u'_bsa_strings',
+                 u'_strings_scanned')
+
+    def __init__(self):
+        self._outer_snapshot = None
+        self._listings = {}
+        self._bsas_by_mod = None
+        self._ini_bsa_infos = None
+        self._strings_lang = None
+        self._bsa_strings = set()
+        self._strings_scanned = set()
+
+    def __enter__(self):
+        global _data_snapshot
+        self._outer_snapshot = _data_snapshot
+        if _data_snapshot is None:
+            _data_snapshot = self
+        return _data_snapshot
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        global _data_snapshot
+        _data_snapshot = self._outer_snapshot
+
+    @staticmethod
+    def current():
+        """Return the snapshot of the running batch of checks, or a new one
+        if there is none."""
+        return _data_snapshot or _DataSnapshot()
+
+    def exists(self, rel_path):
+        """Return True if rel_path, relative to the Data folder, exists.
+
+        :type rel_path: Path"""
+        parent = rel_path.head
+        try:
+            listing = self._listings[parent.cs]
+        except KeyError:
+            try:
+                listing = frozenset(imap(os.path.normcase, os.listdir(
+                    dirs['mods'].join(parent).s)))
+            except OSError: # missing or not a directory
+                listing = frozenset()
+            self._listings[parent.cs] = listing
+        return rel_path.tail.cs in listing
+
+    def mod_bsas(self, mod_info):
+        """Return the bsas matching the name of mod_info - same as
+        ModInfo.mod_bsas, but a dict lookup.
+        :rtype: list[BSAInfo]
+        """
+        if self._bsas_by_mod is None:
+            bsa_ext = bush.game.Bsa.bsa_extension.lower()
+            # games other than skyrim accept more general bsa names
+            suffixed = bush.game.fsName not in (u'Enderal', u'Skyrim')
+            self._bsas_by_mod = collections.defaultdict(list)
+            for bsa, bsa_info in bsaInfos.iteritems():
+                bsa_root = bsa.s.lower()
+                if not bsa_root.endswith(bsa_ext): continue
+                bsa_root = bsa_root[:-len(bsa_ext)]
+                self._bsas_by_mod[bsa_root].append(bsa_info)
+                ma_suffix = suffixed and _bsa_suffix.match(bsa_root)
+                if ma_suffix:
+                    self._bsas_by_mod[ma_suffix.group(1)].append(bsa_info)
+        return self._bsas_by_mod.get(mod_info._modname.lower(), [])[:]
+
+    def ini_bsas(self):
+        """Return the bsas the game INIs load for all plugins.
+        :rtype: list[BSAInfo]
+        """
+        if self._ini_bsa_infos is None:
+            self._ini_bsa_infos = ModInfo._ini_bsas()
+        return self._ini_bsa_infos[:]
+
+    def _missing_loose_strings(self, mod_info):
+        if self._strings_lang is None:
+            self._strings_lang = oblivionIni.get_ini_language()
+        return [asset for asset in mod_info._string_files_paths(
+            self._strings_lang) if not self.exists(asset)]
+
+    def scan_strings(self, mod_infos):
+        """Search the bsas for the strings files of mod_infos that are not
+        loose files - each bsa is searched once, for the files of all the
+        localized plugins that may load strings from it."""
+        from .bain import InstallersData
+        resolver = InstallersData.get_asset_resolver()
+        bsa_assets = OrderedDict()
+        for mod_info in mod_infos:
+            if mod_info.name in self._strings_scanned or not \
+                    mod_info.header.flags1.hasStrings: continue
+            self._strings_scanned.add(mod_info.name)
+            missing = self._missing_loose_strings(mod_info)
+            if not missing: continue
+            for bsa_info in mod_info._extra_bsas():
+                bsa_assets.setdefault(bsa_info, set()).update(missing)
+        for bsa_info, assets in bsa_assets.iteritems():
+            try:
+                self._bsa_strings.update(resolver.has_assets(bsa_info,
+                                                             assets))
+            except (BSAError, OverflowError):
+                deprint(u'Failed to parse %s' % bsa_info.name,
+                        traceback=True)
+
+    def missing_strings(self, mod_info):
+        """Return the strings files of mod_info that are neither loose files
+        nor in any of the bsas it may load them from.
+        :rtype: list[Path]
+        """
+        self.scan_strings([mod_info])
+        return [asset for asset in self._missing_loose_strings(mod_info) if
+                asset.cs not in self._bsa_strings]
+
 #------------------------------------------------------------------------------
 class ModInfos(FileInfos):
     """Collection of modinfos. Represents mods in the Oblivion\Data directory."""
@@ -1738,6 +1960,16 @@ def __init__(self):
             map(re.escape, bush.game.espm_extensions)) + u'' r')(\.ghost)?$',
                                                  re.I | re.U)
         FileInfos.__init__(self, dirs['mods'], factory=ModInfo)
+        # the raw plugin header records, so we don't have to open unchanged
+        # plugins on each boot - maps mod names to ((size, mtime), record)
+        self._headers_cache = bolt.PickleDict(
+            self.bash_dir.join(u'Headers.dat'))
+        self._headers_cache.load()
+        self._headers_cache_changed = False
+        # part of ModInfo.bash_tags_key, so that automatic tags get reloaded
+        # if an update adds support for tags they already had
+        self.all_tags_crc = crc32(u','.join(sorted(bush.game.allTags)).encode(
+            u'utf-8'))
         #--Info lists/sets
         self.mergeScanned = [] #--Files that have been scanned for mergeability.
         for fname in bush.game.masterFiles:
@@ -1807,6 +2039,73 @@ def bashed_patches(self):
                 mname for mname, modinf in self.iteritems() if modinf.isBP())
         return self._bashed_patches
 
+    # Reading ahead on refresh
+    _reads_ahead = True
+
+    def _read_ahead(self, fileName):
+        """Read the raw header record of fileName unless it is cached, and
+        its crc if the cached one is stale. Return them with the size and
+        mtime they were read at - None if reading failed, loading the info
+        will then fail the usual way."""
+        mod_path = self.store_dir.join(fileName)
+        try:
+            if not mod_path.exists(): mod_path += u'.ghost'
+            size_mtime = mod_path.size_mtime()
+            cached = self._headers_cache.data.get(fileName)
+            tes4_data = None
+            if cached is None or cached[0] != size_mtime:
+                tes4_data = ModInfo._read_tes4_data(fileName, mod_path)
+            path_crc = None
+            if self.table.getItem(fileName, 'crc') is None or size_mtime != (
+                    self.table.getItem(fileName, 'crc_size'),
+                    self.table.getItem(fileName, 'crc_mtime')):
+                path_crc = mod_path.crc
+            return size_mtime, tes4_data, path_crc
+        except (OSError, IOError, FileError):
+            return None
+
+    def read_ahead(self, mod_info):
+        """Return the (raw header record, crc) the running refresh read ahead
+        for mod_info - None for either if not read or mod_info changed."""
+        read = self._read_ahead_data.get(mod_info.name)
+        if read is None or read[0] != (mod_info._file_size,
+                                       mod_info._file_mod_time):
+            return None, None
+        return read[1:]
+
+    # Plugin headers cache
+    def cached_header(self, mod_info):
+        """Return the cached raw header record of mod_info or None if it was
+        not cached or the plugin changed since."""
+        cached = self._headers_cache.data.get(mod_info.name)
+        if cached is None or cached[0] != (mod_info._file_size,
+                                           mod_info._file_mod_time):
+            return None
+        return cached[1]
+
+    def cache_header(self, mod_info, tes4_data):
+        self._headers_cache.data[mod_info.name] = (
+            (mod_info._file_size, mod_info._file_mod_time), tes4_data)
+        self._headers_cache_changed = True
+
+    def drop_cached_header(self, mod_name):
+        """Forget the cached header of mod_name - must be called when the
+        header is edited in place, as that may keep the size and mtime."""
+        if self._headers_cache.data.pop(mod_name, None) is not None:
+            self._headers_cache_changed = True
+
+    def save_headers_cache(self):
+        for deleted in set(self._headers_cache.data) - set(self.keys()):
+            del self._headers_cache.data[deleted]
+            self._headers_cache_changed = True
+        if self._headers_cache_changed:
+            self._headers_cache.save()
+            self._headers_cache_changed = False
+
+    def save(self):
+        super(ModInfos, self).save()
+        self.save_headers_cache()
+
     # Load order API for the rest of Bash to use - if the load order or
     # active plugins changed, those methods run a refresh on modInfos data
     @_lo_cache
@@ -1946,6 +2245,7 @@ def _names(self):
             else: unghosted_names.add(mname)
         return unghosted_names
 
+    @bolt.startup_phase(u'ModInfos.refresh')
     def refresh(self, refresh_infos=True, booting=False, _modTimesChange=False):
         """Update file data for additions, removals and date changes.
 
@@ -2027,8 +2327,10 @@ def _refreshMissingStrings(self):
         """Refreshes which mods are supposed to have strings files, but are
         missing them (=CTD). For Skyrim you need to have a valid load order."""
         oldBad = self.missing_strings
-        self.missing_strings = set(
-            k for k, v in self.iteritems() if v.isMissingStrings())
+        with _DataSnapshot() as snapshot:
+            snapshot.scan_strings(self.itervalues())
+            self.missing_strings = set(
+                k for k, v in self.iteritems() if v.isMissingStrings())
         self.new_missing_strings = self.missing_strings - oldBad
         return bool(self.new_missing_strings)
 
@@ -2057,25 +2359,35 @@ def autoGhost(self,force=False):
                     changed.append(mod)
         return changed
 
+    @staticmethod
+    def merge_key(mod_info):
+        """Return the key the mergeability of mod_info is cached by - its CRC
+        and a hash of its masters list."""
+        return mod_info.cached_mod_crc(), crc32(u'\x00'.join(
+            m.s.lower() for m in mod_info.get_masters()).encode(u'utf-8'))
+
     def _refreshMergeable(self):
         """Refreshes set of mergeable mods."""
         #--Mods that need to be rescanned - call rescanMergeable !
         newMods = []
         self.mergeable.clear()
+        # maps mod names to (merge key, canMerge, load reasons) - the reasons
+        # found by loading the mod are None if it was not loaded
         name_mergeInfo = self.table.getColumn('mergeInfo')
         #--Add known/unchanged and esms - we need to scan dependent mods
         # first to account for mergeability of their masters
         for mpath, modInfo in sorted(self.items(),
                 key=lambda tup: load_order.cached_lo_index(tup[0]),
                                      reverse=True):
-            size, canMerge = name_mergeInfo.get(mpath, (None, None))
+            merge_info = name_mergeInfo.get(mpath, (None, None, None))
+            merge_key = self.merge_key(modInfo)
             # if esm/esl bit was flipped size won't change, so check this first
             if modInfo.is_esl() or modInfo.has_esm_flag():
                 # esl don't mark as esl capable - modInfo must have its header set
-                name_mergeInfo[mpath] = (modInfo.size, False)
+                name_mergeInfo[mpath] = (merge_key, False, None)
                 self.mergeable.discard(mpath)
-            elif size == modInfo.size:
-                if canMerge: self.mergeable.add(mpath)
+            elif merge_info[0] == merge_key:
+                if merge_info[1]: self.mergeable.add(mpath)
             else:
                 newMods.append(mpath)
         return newMods
@@ -2086,7 +2398,8 @@ def rescanMergeable(self, names, prog=None, doCBash=None,
         return_results is set to True."""
         messagetext = _(u'Check ESL Qualifications') if bush.game.check_esl \
             else _(u"Mark Mergeable")
-        with prog or balt.Progress(_(messagetext) + u' ' * 30) as prog:
+        with prog or balt.Progress(_(messagetext) + u' ' * 30) as prog, \
+                _DataSnapshot(): # list the resources of all mods only once
             return self._rescanMergeable(names, prog, doCBash, return_results)
 
     def _rescanMergeable(self, names, progress, doCBash, return_results):
@@ -2095,18 +2408,46 @@ def _rescanMergeable(self, names, progress, doCBash, return_results):
             doCBash = CBashApi.Enabled
         elif doCBash and not CBashApi.Enabled:
             doCBash = False
+        # load_check returns the reasons found by loading the mod, these only
+        # depend on its contents so they are cached by merge_key
         if bush.game.check_esl:
             is_mergeable = is_esl_capable
+            load_check, needs_load = esl_load_reasons, None
         elif doCBash:
             is_mergeable = isCBashMergeable
+            load_check = needs_load = None
         else:
             is_mergeable = isPBashMergeable
+            load_check, needs_load = pbash_load_reasons, pbash_needs_load
         mod_mergeInfo = self.table.getColumn('mergeInfo')
-        progress.setFull(max(len(names),1))
+        name_load_reasons = {}
+        to_load = []
+        if load_check is not None and bush.game.Esp.canBash:
+            for fileName in names:
+                fileInfo = self[fileName]
+                if fileName.cs in bush.game.bethDataFiles or \
+                        fileInfo.is_esl():
+                    continue
+                merge_info = mod_mergeInfo.get(fileName, (None, None, None))
+                if merge_info[0] == self.merge_key(fileInfo) and \
+                        merge_info[2] is not None:
+                    name_load_reasons[fileName] = merge_info[2]
+                elif return_results or needs_load is None or needs_load(
+                        fileInfo):
+                    to_load.append(fileName)
+        progress.setFull(max(len(to_load) + len(names), 1))
+        if to_load:
+            # the mods are independent of each other here, so load them on
+            # worker threads
+            progress(0, _(u'Scanning %u plugins...') % len(to_load))
+            name_load_reasons.update(zip(to_load, bolt.parallel_map(
+                lambda n: load_check(self[n]), to_load,
+                progress=bolt.SubProgress(progress, 0, len(to_load)))))
         result, tagged_no_merge = OrderedDict(), set()
         for i,fileName in enumerate(names):
-            progress(i,fileName.s)
+            progress(len(to_load) + i, fileName.s)
             fileInfo = self[fileName]
+            load_reasons = name_load_reasons.get(fileName)
             cs_name = fileName.cs
             if cs_name in bush.game.bethDataFiles:
                 if return_results: reasons.append(_(u'Is Bethesda Plugin.'))
@@ -2119,46 +2460,69 @@ def _rescanMergeable(self, names, progress, doCBash, return_results):
                 canMerge = False
             else:
                 try:
-                    canMerge = is_mergeable(fileInfo, self, reasons)
+                    canMerge = is_mergeable(fileInfo, self, reasons,
+                                            load_reasons)
                 except Exception as e:
                     # deprint (_(u"Error scanning mod %s (%s)") % (fileName, e))
                     # canMerge = False #presume non-mergeable.
                     raise
             result[fileName] = reasons is not None and (
                     u'\n.    ' + u'\n.    '.join(reasons))
+            mod_mergeInfo[fileName] = (self.merge_key(fileInfo),
+                                       bool(canMerge), load_reasons)
             if canMerge:
                 self.mergeable.add(fileName)
-                mod_mergeInfo[fileName] = (fileInfo.size,True)
             else:
-                mod_mergeInfo[fileName] = (fileInfo.size,False)
                 self.mergeable.discard(fileName)
             if fileName in self.mergeable and u'NoMerge' in fileInfo.getBashTags():
                 tagged_no_merge.add(fileName)
             reasons = reasons if reasons is None else []
         return result, tagged_no_merge
 
-    def reloadBashTags(self):
-        """Reloads bash tags for all mods set to receive automatic bash tags."""
-        for modName, mod in self.iteritems():
-            autoTag = self.table.getItem(modName, 'autoBashTags')
-            if autoTag is None and self.table.getItem(
-                    modName, 'bashTags') is None:
-                # A new mod, set autoBashTags to True (default)
-                self.table.setItem(modName, 'autoBashTags', True)
-                autoTag = True
-            elif autoTag is None:
-                # An old mod that had manual bash tags added, disable autoBashTags
-                self.table.setItem(modName, 'autoBashTags', False)
-            if autoTag:
-                mod.reloadBashTags()
-
-    def refresh_crcs(self, mods=None): #TODO(ut) progress !
-        if mods is None: mods = self.keys()
-        pairs = {}
-        for mod in mods:
-            inf = self[mod]
-            pairs[inf.name] = inf.calculate_crc(recalculate=True)
-        return pairs
+    def reloadBashTags(self, mods=None):
+        """Reloads bash tags for all mods (or the specified ones) set to
+        receive automatic bash tags, in a single pass. Mods whose
+        bash_tags_key did not change since their tags were last reloaded are
+        skipped. Returns the names of the mods whose tags changed."""
+        tag_files_stats = configHelpers.tag_files_stats()
+        tags_changed = set()
+        with EvaluationPass(): # check the LOOT condition inputs once
+            for modName in (self.keys() if mods is None else mods):
+                mod = self[modName]
+                autoTag = self.table.getItem(modName, 'autoBashTags')
+                if autoTag is None and self.table.getItem(
+                        modName, 'bashTags') is None:
+                    # A new mod, set autoBashTags to True (default)
+                    self.table.setItem(modName, 'autoBashTags', True)
+                    autoTag = True
+                elif autoTag is None:
+                    # An old mod that had manual bash tags added, disable
+                    # autoBashTags
+                    self.table.setItem(modName, 'autoBashTags', False)
+                if autoTag:
+                    tags_key = mod.bash_tags_key(tag_files_stats)
+                    if tags_key == self.table.getItem(modName,
+                                                      'bashTags_key'):
+                        continue
+                    old_tags = self.table.getItem(modName, 'bashTags')
+                    mod.reloadBashTags(_tags_key=tags_key)
+                    if self.table.getItem(modName, 'bashTags') != old_tags:
+                        tags_changed.add(modName)
+        return tags_changed
+
+    def refresh_crcs(self, mods=None, progress=None):
+        """Recalculate the crcs of mods (all mods by default) and return a
+        dict mapping their names to (new crc, previously cached crc) tuples.
+        The files are read concurrently, with progress reported in bytes,
+        and the table is only updated once all of them have been read. Mods
+        that could not be read are logged and left out of the result."""
+        mod_infos = [self[mod] for mod in (self.keys() if mods is None
+                                           else mods)]
+        crcs = bolt.calculate_crcs(
+            [(inf.abs_path.s, inf._file_size) for inf in mod_infos],
+            progress=progress)
+        return {inf.name: inf.cache_crc(path_crc) for inf, path_crc in
+                zip(mod_infos, crcs) if path_crc is not None}
 
     #--Refresh File
     def new_info(self, fileName, _in_refresh=False, owner=None,
@@ -2946,6 +3310,17 @@ def do_update(self):
 
             def readHeader(self):  # just reset the cache
                 self._assets = self.__class__._assets
+                self._hash_index = None
+
+            @property
+            def assets(self):
+                if self._assets is self.__class__._assets:
+                    cached = bsaInfos.cached_assets(self)
+                    if cached is None:
+                        cached = super(BSAInfo, self).assets
+                        bsaInfos.cache_assets(self, cached)
+                    self._assets = cached
+                return self._assets
 
             def _reset_bsa_mtime(self):
                 if bush.game.Bsa.allow_reset_timestamps and inisettings[
@@ -2954,6 +3329,70 @@ def _reset_bsa_mtime(self):
                         self.setmtime(self._default_mtime)
 
         super(BSAInfos, self).__init__(dirs['mods'], factory=BSAInfo)
+        # the lowercase asset paths of the bsas, so we don't have to parse
+        # them on each boot - maps bsa names to ((size, mtime), string table)
+        self._assets_cache = bolt.PickleDict(
+            self.bash_dir.join(u'Assets.dat'))
+        self._assets_cache.load()
+        self._assets_cache_changed = False
+
+    def cached_assets(self, bsa_info):
+        """Return the cached assets of bsa_info or None if they were not
+        cached or the bsa changed since."""
+        cached = self._assets_cache.data.get(bsa_info.name)
+        if cached is None or cached[0] != (bsa_info._file_size,
+                                           bsa_info._file_mod_time):
+            return None
+        return frozenset(cached[1].split(u'\x00')) if cached[1] else \
+            frozenset()
+
+    def cache_assets(self, bsa_info, assets):
+        self._assets_cache.data[bsa_info.name] = (
+            (bsa_info._file_size, bsa_info._file_mod_time),
+            u'\x00'.join(sorted(assets)))
+        self._assets_cache_changed = True
+
+    def save_assets_cache(self):
+        for deleted in set(self._assets_cache.data) - set(self.keys()):
+            del self._assets_cache.data[deleted]
+            self._assets_cache_changed = True
+        if self._assets_cache_changed:
+            self._assets_cache.save()
+            self._assets_cache_changed = False
+
+    def save(self):
+        super(BSAInfos, self).save()
+        self.save_assets_cache()
+
+    def verify_bsas(self, bsa_infos, progress):
+        """Verify the integrity of the specified bsas - only the ones that
+        are new or changed since they were last verified are read again.
+
+        :return: an OrderedDict mapping the names of the bsas to the lists
+            of problems found, empty for bsas that are fine"""
+        verified = bolt.PickleDict(self.bash_dir.join(u'Verified.dat'))
+        verified.load()
+        bsa_infos = list(bsa_infos)
+        to_verify = [b for b in bsa_infos if verified.data.get(b.name, (
+            None,))[0] != (b._file_size, b._file_mod_time)]
+        progress.setFull(max(len(to_verify), 1))
+        try:
+            for i, bsa_info in enumerate(to_verify):
+                try:
+                    problems = bsa_info.verify(
+                        bolt.SubProgress(progress, i, i + 1))
+                except (BSAError, OverflowError) as e:
+                    deprint(u'Failed to verify %s' % bsa_info.name,
+                            traceback=True)
+                    problems = [u'%s' % e]
+                verified.data[bsa_info.name] = (
+                    (bsa_info._file_size, bsa_info._file_mod_time), problems)
+        finally: # keep what was verified, even if canceled
+            for deleted in set(verified.data) - set(self.keys()):
+                del verified.data[deleted]
+            verified.save()
+        return OrderedDict(
+            (b.name, verified.data[b.name][1]) for b in bsa_infos)
 
     def new_info(self, fileName, _in_refresh=False, owner=None,
                  notify_bain=False):
@@ -3226,6 +3665,7 @@ def initDefaultSettings():
     inisettings['PromptActivateBashedPatch'] = True
     inisettings['WarnTooManyFiles'] = True
     inisettings['SkippedBashInstallersDirs'] = u''
+    inisettings['BsaExtractionBufferKB'] = 4096
 
 def initOptions(bashIni):
     initDefaultTools()
@@ -3273,6 +3713,7 @@ def initOptions(bashIni):
     tooldirs['Tes4ViewPath'] = tooldirs['Tes4EditPath'].head.join(u'TES4View.exe')
     tooldirs['Tes4TransPath'] = tooldirs['Tes4EditPath'].head.join(u'TES4Trans.exe')
 
+@bolt.startup_phase(u'initBosh')
 def initBosh(bashIni, game_ini_path):
     # Setup loot_parser, needs to be done after the dirs are initialized
     if not initialization.bash_dirs_initialized:
@@ -3290,10 +3731,13 @@ def initBosh(bashIni, game_ini_path):
     initOptions(bashIni)
     from .bain import Installer
     Installer.init_bain_dirs()
+    bsa_files.extraction_buffer_size = max(
+        inisettings['BsaExtractionBufferKB'], 64) * 1024
     if os.name == u'nt': # don't add local directory to binaries on linux
         archives.exe7z = dirs['compiled'].join(archives.exe7z).s
         archives.pngcrush = dirs['compiled'].join(archives.pngcrush).s
 
+@bolt.startup_phase(u'initSettings')
 def initSettings(readOnly=False, _dat=u'BashSettings.dat',
                  _bak=u'BashSettings.dat.bak'):
     """Init user settings from files and load the defaults (also in basher)."""
@@ -78,26 +78,29 @@ def _pbash_mergeable_no_load(modInfo, reasons):
             modInfo.name.sbody, oblivionIni.get_ini_language()))
     return False if reasons else True
 
-def isPBashMergeable(modInfo, minfos, reasons):
-    """Returns True or error message indicating whether specified mod is mergeable."""
-    verbose = reasons is not None
-    if not  _pbash_mergeable_no_load(modInfo, reasons) and not verbose:
-        return False  # non verbose mode
+def pbash_needs_load(modInfo):
+    """Returns False if modInfo fails the checks that do not need loading it,
+    so there is no need to load it if only the verdict is of interest."""
+    return _pbash_mergeable_no_load(modInfo, None)
+
+def pbash_load_reasons(modInfo):
+    """Loads the specified mod and returns the reasons it is not mergeable
+    that were found while loading it. These only depend on the contents of
+    the mod, so they can be cached by its CRC. Safe to call from a worker
+    thread."""
+    reasons = []
     #--Load test
     mergeTypes = set(recClass.classType for recClass in bush.game.mergeClasses)
     modFile = ModFile(modInfo, LoadFactory(False, *mergeTypes))
     try:
         modFile.load(True,loadStrings=False)
     except ModError as error:
-        if not verbose: return False
         reasons.append(u'%s.' % error)
     #--Skipped over types?
     if modFile.topsSkipped:
-        if not verbose: return False
         reasons.append(_(u'Unsupported types: ')+u', '.join(sorted(modFile.topsSkipped))+u'.')
     #--Empty mod
     elif not modFile.tops:
-        if not verbose: return False
         reasons.append(_(u'Empty mod.'))
     #--New record
     lenMasters = len(modFile.tes4.masters)
@@ -106,10 +109,23 @@ def isPBashMergeable(modInfo, minfos, reasons):
         for record in block.getActiveRecords():
             if record.fid >> 24 >= lenMasters:
                 if record.flags1.deleted: continue #if new records exist but are deleted just skip em.
-                if not verbose: return False
                 newblocks.append(top_type)
                 break
     if newblocks: reasons.append(_(u'New record(s) in block(s): ')+u', '.join(sorted(newblocks))+u'.')
+    return reasons
+
+def isPBashMergeable(modInfo, minfos, reasons, load_reasons=None):
+    """Returns True or error message indicating whether specified mod is
+    mergeable. If load_reasons is None, the mod is loaded to compute them,
+    otherwise they must come from pbash_load_reasons."""
+    verbose = reasons is not None
+    if not  _pbash_mergeable_no_load(modInfo, reasons) and not verbose:
+        return False  # non verbose mode
+    if load_reasons is None:
+        load_reasons = pbash_load_reasons(modInfo)
+    if load_reasons:
+        if not verbose: return False
+        reasons.extend(load_reasons)
     dependent = _dependent(modInfo, minfos)
     if dependent:
         if not verbose: return False
@@ -124,7 +140,25 @@ def _dependent(modInfo, minfos):
                  mname not in minfos.mergeable]
     return dependent
 
-def is_esl_capable(modInfo, _minfos, reasons):
+def esl_load_reasons(modInfo):
+    """Scans the record headers of the specified mod and returns the reasons
+    it can't be converted to a light plugin - only the headers are read and
+    the scan stops at the first new FormID outside the ESL range. Safe to
+    call from a worker thread."""
+    reasons = []
+    # Check for new FormIDs greater then 0xFFF
+    num_masters = len(modInfo.header.masters)
+    try:
+        for header in ModHeaderReader.iter_mod_headers(modInfo):
+            if header.fid >> 24 >= num_masters and (
+                    header.fid & 0xFFFFFF) > 0xFFF:
+                reasons.append(_(u'New FormIDs greater than 0xFFF.'))
+                break
+    except ModError as e:
+        return [u'%s.' % e]
+    return reasons
+
+def is_esl_capable(modInfo, _minfos, reasons, load_reasons=None):
     """Determines whether or not the specified mod can be converted to a light
     plugin. Optionally also returns the reasons it can't be converted.
 
@@ -134,27 +168,15 @@ def is_esl_capable(modInfo, _minfos, reasons):
     :param reasons: A list of strings that should be filled with the reasons
                     why this mod can't be ESL flagged, or None if only the
                     return value of this method is of interest.
+    :param load_reasons: The result of esl_load_reasons for this mod, or None
+                         to scan it now.
     :return: True if the specified mod could be flagged as ESL."""
     verbose = reasons is not None
-    record_headers = {}
-    try:
-        record_headers = ModHeaderReader.read_mod_headers(modInfo)
-    except ModError as e:
+    if load_reasons is None:
+        load_reasons = esl_load_reasons(modInfo)
+    if load_reasons:
         if not verbose: return False
-        reasons.append(u'%s.' % e)
-    # Check for new FormIDs greater then 0xFFF
-    num_masters = len(modInfo.header.masters)
-    has_new_recs = False
-    for _rec_type, rec_headers in record_headers.iteritems():
-        for header in rec_headers:
-            if header.fid >> 24 >= num_masters:
-                if (header.fid & 0xFFFFFF) > 0xFFF:
-                    has_new_recs = True
-                    break
-        if has_new_recs:
-            if not verbose: return False
-            reasons.append(_(u'New FormIDs greater than 0xFFF.'))
-            break
+        reasons.extend(load_reasons)
     return False if reasons else True
 
 def _modIsMergeableLoad(modInfo, minfos, reasons):
@@ -205,8 +227,10 @@ def _modIsMergeableLoad(modInfo, minfos, reasons):
             reasons.append(_(u'Is a master of non-mergeable mod(s): %s.') % u', '.join(sorted(dependent)))
     return False if reasons else True
 
-def isCBashMergeable(modInfo, minfos, reasons):
-    """Returns True or error message indicating whether specified mod is mergeable."""
+def isCBashMergeable(modInfo, minfos, reasons, _load_reasons=None):
+    """Returns True or error message indicating whether specified mod is
+    mergeable. CBash loads the mod along with its masters, so there are no
+    load reasons to reuse - _load_reasons is ignored."""
     verbose = reasons is not None
     if modInfo.name.s == u"Oscuro's_Oblivion_Overhaul.esp":
         if verbose: return [u'\n.    ' +
@@ -24,6 +24,7 @@
 """BAIN backbone classes."""
 
 from __future__ import print_function
+import cPickle
 import collections
 import copy
 import errno
@@ -37,8 +38,9 @@
 from operator import itemgetter, attrgetter
 
 from . import imageExts, DataStore, BestIniFile, InstallerConverter, ModInfos
+from .dds_files import read_dds_headers
 from .. import balt, gui # YAK!
-from .. import bush, bass, bolt, env, archives
+from .. import bush, bass, bolt, env, archives, load_order
 from ..archives import readExts, defaultExt, list_archive, compress7z, \
     extract7z, compressionSettings
 from ..bolt import Path, deprint, round_size, GPath, sio, SubProgress, CIstr, \
@@ -93,6 +95,10 @@ class Installer(object):
         bush.game.Bsa.bsa_extension, u'.ini', u'.modgroups', u'.bsl', u'.ckm'}
     _re_top_extensions = re.compile(u'(?:' + u'|'.join(
         re.escape(ext) for ext in _top_files_extensions) + u')$', re.I)
+    # Files that are edited in place (plugins, bsas, inis...) or whose mtime
+    # we set - linked project installs will copy (or clone) them instead
+    _no_hardlink_exts = bush.game.espm_extensions | commonlyEditedExts | {
+        bush.game.Bsa.bsa_extension}
 
     @classmethod
     def is_archive(cls): return False
@@ -144,31 +150,17 @@ def final_update(new_sizeCrcDate, old_sizeCrcDate, pending, pending_size,
     @staticmethod
     def calc_crcs(pending, pending_size, rootName, new_sizeCrcDate, progress):
         if not pending: return
-        done = 0
         progress_msg= rootName + u'\n' + _(u'Calculating CRCs...') + u'\n'
         progress(0, progress_msg)
-        # each mod increments the progress bar by at least one, even if it
-        # is size 0 - add len(pending) to the progress bar max to ensure we
-        # don't hit 100% and cause the progress bar to prematurely disappear
-        progress.setFull(pending_size + len(pending))
-        for rpFile, (size, _crc, date, asFile) in iter(sorted(pending.items())):
-            progress(done, progress_msg + rpFile)
-            sub = bolt.SubProgress(progress, done, done + size + 1)
-            sub.setFull(size + 1)
-            crc = 0
-            try:
-                with open(asFile, u'rb') as ins:
-                    insTell = ins.tell
-                    for block in iter(partial(ins.read, 2097152), ''):
-                        crc = crc32(block, crc) # 2MB at a time, probably ok
-                        sub(insTell())
-            except IOError:
-                deprint(_(u'Failed to calculate crc for %s - please report '
-                          u'this, and the following traceback:') % asFile,
-                        traceback=True)
-                continue
-            crc &= 0xFFFFFFFF
-            done += size + 1
+        # files are read concurrently - progress is reported in bytes, see
+        # bolt.calculate_crcs, which will set it to pending_size + len(pending)
+        pending_files = sorted(pending.items())
+        crcs = bolt.calculate_crcs(
+            [(asFile, size) for _rp, (size, _crc, _date, asFile)
+             in pending_files], progress=progress)
+        for (rpFile, (size, _crc, date, asFile)), crc in zip(pending_files,
+                                                             crcs):
+            if crc is None: continue # could not read it, logged
             new_sizeCrcDate[rpFile] = (size, crc, date, asFile)
 
     #--Initialization, etc ----------------------------------------------------
@@ -294,6 +286,40 @@ def __getstate__(self):
         getter = object.__getattribute__
         return tuple(getter(self,x) for x in self.persistent)
 
+    # persistent attributes holding the per file tables - stored separately
+    # in the installers store, as they are big and only change on refresh
+    _file_tables = ('fileSizeCrcs', 'src_sizeCrcDate')
+
+    def store_state(self):
+        """Return a dict with the persistent attributes of self minus the
+        file tables, for saving to the installers store."""
+        getter = object.__getattribute__
+        return dict((attr, getter(self, attr)) for attr in self.persistent
+                    if attr not in self._file_tables)
+
+    def store_file_tables(self):
+        """Return the file tables of self, for saving to the installers
+        store, prefixed by a key that changes when they do."""
+        # the modified time of a project does not change with the dates of
+        # all of its files, so digest those too - order independently
+        dates_digest = 0
+        for x, (_size, _crc, date) in self.src_sizeCrcDate.iteritems():
+            dates_digest ^= crc32((u'%s|%r' % (x, date)).encode(u'utf-8'))
+        files_key = (self.size, self.modified, self.crc,
+                     len(self.fileSizeCrcs), len(self.src_sizeCrcDate),
+                     dates_digest & 0xFFFFFFFF)
+        return files_key, self.fileSizeCrcs, dict(
+            (u'%s' % x, y) for x, y in self.src_sizeCrcDate.iteritems())
+
+    def load_store_state(self, state, file_tables):
+        """Recreate self from the output of store_state and the file tables
+        of store_file_tables. Attributes missing from state (added in later
+        versions) keep their default values."""
+        state.update(zip(self._file_tables, file_tables))
+        getter = object.__getattribute__
+        self.__setstate__(tuple(state.get(attr, getter(self, attr)) for attr
+                                in self.persistent))
+
     def _fixme_drop__for_loading_in_previous_versions(self):
         self.src_sizeCrcDate = dict( # FIXME: backwards compat !
             (GPath(x), y) for x, y in self.src_sizeCrcDate.iteritems())
@@ -1023,32 +1049,46 @@ def _refreshSource(self, progress, recalculate_project_crc):
 
     def install(self, destFiles, progress=None):
         """Install specified files to Game\Data directory."""
+        dest_src = self.dest_src_for(destFiles)
+        if not dest_src: return bolt.LowerDict(), set(), set(), set()
+        progress = progress if progress else bolt.Progress()
+        return self._install(dest_src, progress)
+
+    def dest_src_for(self, destFiles):
+        """Return the dest_src map for installing destFiles."""
         destFiles = set(destFiles)
         dest_src = self.refreshDataSizeCrc(True)
         for k in dest_src.keys():
             if k not in destFiles: del dest_src[k]
-        if not dest_src: return bolt.LowerDict(), set(), set(), set()
-        progress = progress if progress else bolt.Progress()
-        return self._install(dest_src, progress)
+        return dest_src
 
     def _install(self, dest_src, progress):
         raise AbstractError
 
-    def _fs_install(self, dest_src, srcDirJoin, progress,
-                    subprogressPlus, unpackDir):
-        """Filesystem install, if unpackDir is not None we are installing
-         an archive."""
+    def parallel_install(self, dest_src):
+        """Install dest_src without using the GUI or the shared temp dir, so
+        that this can run in a worker thread concurrently with the install
+        of other packages (to disjoint destinations). Return the same as
+        install or None if not supported or failed - _install must then be
+        used."""
+        return None
+
+    def _install_targets(self, dest_src, subprogressPlus):
+        """Classify the files in dest_src and compute the absolute paths they
+        will be installed to. Return the data_sizeCrcDate update (with -1
+        dates), the installed mods, ini tweaks and bsas and the list of
+        destination paths, in dest_src order."""
         norm_ghostGet = Installer.getGhosted().get
         data_sizeCrcDate_update = bolt.LowerDict()
         data_sizeCrc = self.ci_dest_sizeCrc
         mods, inis, bsas = set(), set(), set()
-        source_paths, dests = [], []
-        add_source, add_dest = source_paths.append, dests.append
+        dests = []
+        add_dest = dests.append
         installer_plugins = self.espms
         is_ini_tweak = InstallersData._is_ini_tweak
         join_data_dir = bass.dirs['mods'].join
         bsa_ext = bush.game.Bsa.bsa_extension
-        for dest, src in dest_src.iteritems():
+        for dest in dest_src:
             size,crc = data_sizeCrc[dest]
             # Work with ghosts lopped off internally and check the destination,
             # since plugins may have been renamed
@@ -1060,22 +1100,52 @@ def _fs_install(self, dest_src, srcDirJoin, progress,
             elif dest_path.cext == bsa_ext:
                 bsas.add(dest_path)
             data_sizeCrcDate_update[dest] = (size, crc, -1) ##: HACK we must try avoid stat'ing the mtime
-            add_source(srcDirJoin(src))
             # Append the ghost extension JIT since the FS operation below will
             # need the exact path to copy to
             add_dest(join_data_dir(norm_ghostGet(dest, dest)))
             subprogressPlus()
+        return data_sizeCrcDate_update, mods, inis, bsas, dests
+
+    def _fs_install(self, dest_src, srcDirJoin, progress,
+                    subprogressPlus, unpackDir, link_files=False):
+        """Filesystem install, if unpackDir is not None we are installing
+         an archive. If link_files is True (only for projects) the files are
+         cloned or hard linked instead of copied where possible."""
+        data_sizeCrcDate_update, mods, inis, bsas, dests = \
+            self._install_targets(dest_src, subprogressPlus)
+        source_paths = [srcDirJoin(src) for src in dest_src.itervalues()]
         #--Now Move
         try:
             if data_sizeCrcDate_update:
-                fs_operation = env.shellMove if unpackDir else env.shellCopy
-                fs_operation(source_paths, dests, progress.getParent())
+                # Never write through a hard link into another package's files
+                env.break_hardlinks(dests)
+                if link_files:
+                    linked = env.shellLink(source_paths, dests,
+                        progress.getParent(), self._can_hardlink)
+                    self._update_linked_dates(dest_src, dests, linked,
+                                              data_sizeCrcDate_update)
+                else:
+                    fs_operation = env.shellMove if unpackDir else \
+                        env.shellCopy
+                    fs_operation(source_paths, dests, progress.getParent())
         finally:
             #--Clean up unpack dir if we're an archive
             if unpackDir: bass.rmTempDir()
         #--Update Installers data
         return data_sizeCrcDate_update, mods, inis, bsas
 
+    @staticmethod
+    def _can_hardlink(src_path):
+        """Hard linked files share their data with the project, so don't
+        link files that we or the user may edit in place or touch."""
+        return src_path.cext not in Installer._no_hardlink_exts
+
+    def _update_linked_dates(self, dest_src, dests, linked,
+                             data_sizeCrcDate_update):
+        """Linked files keep the modification time of their source, so we can
+        use the cached project date instead of rescanning them."""
+        raise AbstractError
+
     def listSource(self):
         """Return package structure as text."""
         with sio() as out:
@@ -1224,7 +1294,15 @@ def unpackToTemp(self, fileNames, progress=None, recurse=False):
         #--Done -> don't clean out temp dir, it's going to be used soon
         return unpack_dir
 
-    def _install(self, dest_src, progress):
+    def _install(self, dest_src, progress, _try_streaming=True):
+        if _try_streaming:
+            try:
+                return self._stream_install(dest_src, progress)
+            except (StateError, OSError, IOError):
+                # e.g. missing crcs, UAC protected Data folder, broken archive
+                # - fall back to extracting to temp dir and moving the files
+                deprint(u'%s: Direct extraction failed, extracting to temp '
+                        u'dir' % self.archive, traceback=True)
         #--Extract
         progress(0, self.archive + u'\n' + _(u'Extracting files...'))
         unpackDir = self.unpackToTemp(dest_src.values(),
@@ -1238,6 +1316,33 @@ def _install(self, dest_src, progress):
         return self._fs_install(dest_src, srcDirJoin, progress,
                                 subprogressPlus, unpackDir)
 
+    def _stream_install(self, dest_src, progress):
+        """Extract the files in dest_src straight to their final paths in the
+        Data directory, updating their dates as they land."""
+        data_sizeCrcDate_update, mods, inis, bsas, dests = \
+            self._install_targets(dest_src, lambda: None)
+        entries = []
+        for (dest, src), dest_path in zip(dest_src.iteritems(), dests):
+            size, crc, _date = data_sizeCrcDate_update[dest]
+            if size and not crc:
+                raise StateError(u'%s: no crc for %s' % (self.archive, src))
+            entries.append((src, size, crc, dest_path, dest))
+        env.break_hardlinks(dests)
+        apath = bass.dirs['installers'].join(self.archive)
+        with apath.unicodeSafe() as arch: # sorts entries in archive order
+            archives.stream_extract(arch, [e[:4] for e in entries], progress)
+        for _src, size, crc, dest_path, dest in entries:
+            data_sizeCrcDate_update[dest] = (size, crc, dest_path.mtime)
+        return data_sizeCrcDate_update, mods, inis, bsas
+
+    def parallel_install(self, dest_src):
+        try:
+            return self._stream_install(dest_src, bolt.Progress())
+        except (StateError, OSError, IOError):
+            deprint(u'%s: Direct extraction failed' % self.archive,
+                    traceback=True)
+            return None
+
     def unpackToProject(self, project, progress=None):
         """Unpacks archive to build directory."""
         progress = progress or bolt.Progress()
@@ -1470,7 +1575,16 @@ def _install(self, dest_src, progress):
         srcDir = bass.dirs['installers'].join(self.archive)
         srcDirJoin = srcDir.join
         return self._fs_install(dest_src, srcDirJoin, progress, progressPlus,
-                                None)
+            None, link_files=bass.settings['bash.installers.linkProjects'])
+
+    def _update_linked_dates(self, dest_src, dests, linked,
+                             data_sizeCrcDate_update):
+        src_sizeCrcDate = self.src_sizeCrcDate
+        for (dest, src), dest_path in zip(dest_src.iteritems(), dests):
+            if dest_path in linked:
+                size, crc, _date = data_sizeCrcDate_update[dest]
+                data_sizeCrcDate_update[dest] = (
+                    size, crc, src_sizeCrcDate[src][2])
 
     def syncToData(self, projFiles):
         """Copies specified projFiles from Oblivion\Data to project
@@ -1492,29 +1606,39 @@ def syncToData(self, projFiles):
                 projFull.remove()
                 removed += 1
             else:
+                # the project file may be linked to the Data one - unlink it
+                projFull.remove()
                 srcFull.copyTo(projFull)
                 updated += 1
         self.removeEmpties(self.archive)
         return updated,removed
 
-    def packToArchive(self,project,archive,isSolid,blockSize,progress=None,release=False):
+    def packToArchive(self,project,archive,isSolid,blockSize,progress=None,release=False,
+                      threads=0):
         """Packs project to build directory. Release filters out development
-        material from the archive"""
+        material from the archive. Several projects may be packed to
+        different archives concurrently - threads is then used to split the
+        cpu between the 7z processes (0 means let 7z decide)."""
         length = len(self.fileSizeCrcs)
         if not length: return
         archive, archiveType, solid = compressionSettings(archive, blockSize,
                                                           isSolid)
+        if threads: solid += u' -mmt=%d' % threads
         outDir = bass.dirs['installers']
         realOutFile = outDir.join(archive)
-        outFile = outDir.join(u'bash_temp_nonunicode_name.tmp')
+        # temp names must be unique per destination archive, we may be
+        # packing other projects in parallel
+        job_id = u'_%08X' % (crc32(archive.s.encode(u'utf8')) & 0xFFFFFFFF)
+        outFile = outDir.join(u'bash_temp_nonunicode_name%s.tmp' % job_id)
         num = 0
         while outFile.exists():
             outFile += unicode(num)
             num += 1
+        tempList = self.tempList.root + job_id + self.tempList.ext
         project = outDir.join(project)
         with project.unicodeSafe() as projectDir:
             #--Dump file list
-            with self.tempList.open('w',encoding='utf-8-sig') as out:
+            with tempList.open('w',encoding='utf-8-sig') as out:
                 if release:
                     out.write(u'*thumbs.db\n')
                     out.write(u'*desktop.ini\n')
@@ -1522,11 +1646,11 @@ def packToArchive(self,project,archive,isSolid,blockSize,progress=None,release=F
                     out.write(u'--*\\')
             #--Compress
             command = u'"%s" a "%s" -t"%s" %s -y -r -o"%s" -i!"%s\\*" -x@%s -scsUTF-8 -sccUTF-8' % (
-                archives.exe7z, outFile.temp.s, archiveType, solid, outDir.s, projectDir.s, self.tempList.s)
+                archives.exe7z, outFile.temp.s, archiveType, solid, outDir.s, projectDir.s, tempList.s)
             try:
                 compress7z(command, outDir, outFile.tail, projectDir, progress)
             finally:
-                self.tempList.remove()
+                tempList.remove()
             outFile.moveTo(realOutFile)
 
     @staticmethod
@@ -1573,6 +1697,120 @@ def _projects_walk_cache_wrapper(self, *args, **kwargs):
                     project._dir_dirs_files = None
     return _projects_walk_cache_wrapper
 
+#------------------------------------------------------------------------------
+class AssetResolver(object):
+    """Resolves which of the loose files in Data and the active BSAs provide
+    each asset and which one wins. Asset paths are normalized like the BSA
+    assets (os.path.normcase). Providers are given in load order, as BSA
+    names, followed by None if a loose file provides the asset - loose files
+    override all BSAs. Kept up to date incrementally by update()."""
+
+    def __init__(self):
+        self._providers = collections.defaultdict(list)
+        self._loose = set()
+        self._bsa_rank = {} # bsa name -> load order position
+        self._bsa_keys = {} # bsa name -> (size, mtime) when indexed
+        self._bsa_assets = {} # bsa name -> the assets it provides
+
+    def update(self, data_sizeCrcDate=None, active_bsas=None):
+        """Sync with the loose files and/or active bsas, if given - only the
+        bsas that were (de)activated, reordered or changed on disk are
+        processed.
+
+        :param data_sizeCrcDate: InstallersData.data_sizeCrcDate
+        :param active_bsas: ModInfos.get_active_bsas()"""
+        if data_sizeCrcDate is not None:
+            loose = set(imap(os.path.normcase, imap(unicode,
+                                                    data_sizeCrcDate)))
+            self.update_loose(changed=loose - self._loose,
+                              deleted=self._loose - loose)
+        if active_bsas is not None:
+            self.update_bsas(active_bsas)
+
+    def update_loose(self, changed=(), deleted=()):
+        """Add or remove loose files, given as normalized asset paths."""
+        self._loose.difference_update(deleted)
+        self._loose.update(changed)
+
+    def update_bsas(self, active_bsas):
+        """Sync with the active bsas - an OrderedDict of BSAInfo to the
+        position of their activating plugin."""
+        new_rank = {b.name: i for i, b in enumerate(active_bsas)}
+        new_keys = {b.name: (b._file_size, b._file_mod_time) for b in
+                    active_bsas}
+        for bsa_name, bsa_key in self._bsa_keys.items():
+            if new_keys.get(bsa_name) != bsa_key: # deactivated or changed
+                for asset in self._bsa_assets.pop(bsa_name):
+                    providers = self._providers[asset]
+                    providers.remove(bsa_name)
+                    if not providers: del self._providers[asset]
+                del self._bsa_keys[bsa_name]
+        resort = new_rank != self._bsa_rank
+        self._bsa_rank = new_rank
+        for bsa_info in active_bsas:
+            if bsa_info.name in self._bsa_keys: continue
+            resort = True
+            try:
+                assets = bsa_info.assets
+            except BSAError:
+                deprint(u'Error parsing %s' % bsa_info.name, traceback=True)
+                assets = frozenset()
+            self._bsa_assets[bsa_info.name] = assets
+            self._bsa_keys[bsa_info.name] = new_keys[bsa_info.name]
+            for asset in assets:
+                self._providers[asset].append(bsa_info.name)
+        if resort: # (re)added bsas were appended, sort them in too
+            rank = new_rank.__getitem__
+            for providers in self._providers.itervalues():
+                if len(providers) > 1: providers.sort(key=rank)
+
+    def bsa_assets(self, bsa_names):
+        """Return the set of the assets the specified (indexed) bsas
+        provide."""
+        return set().union(*(self._bsa_assets.get(b, ()) for b in bsa_names))
+
+    def has_assets(self, bsa_info, asset_paths):
+        """Return the set of asset_paths in bsa_info - looked up in the index
+        if bsa_info is indexed and did not change on disk since, else
+        searched for in the bsa itself.
+
+        :type asset_paths: collections.Iterable[Path]"""
+        if self._bsa_keys.get(bsa_info.name) != (bsa_info._file_size,
+                                                 bsa_info._file_mod_time):
+            return bsa_info.has_assets(asset_paths)
+        return set(a.cs for a in asset_paths) & self._bsa_assets[
+            bsa_info.name]
+
+    # Batch lookups - asset paths must be normalized
+    def providers(self, asset_paths):
+        """Return a dict mapping each of asset_paths that is provided by
+        something to the tuple of its providers, in load order."""
+        result = {}
+        for asset in asset_paths:
+            providers = tuple(self._providers.get(asset, ()))
+            if asset in self._loose: providers += (None,)
+            if providers: result[asset] = providers
+        return result
+
+    def winners(self, asset_paths):
+        """Return a dict mapping each of asset_paths that is provided by
+        something to the name of the winning bsa - or None for loose files."""
+        return {a: p[-1] for a, p in self.providers(asset_paths).iteritems()}
+
+    def missing(self, asset_paths):
+        """Return the set of asset_paths that nothing provides."""
+        return {a for a in asset_paths if
+                a not in self._loose and a not in self._providers}
+
+    def conflicts(self, asset_paths=None):
+        """Return a dict mapping the assets (of asset_paths, or all of
+        them) provided by more than one bsa or loose file to their
+        providers."""
+        if asset_paths is None:
+            asset_paths = self._providers
+        return {a: p for a, p in self.providers(asset_paths).iteritems() if
+                len(p) > 1}
+
 #------------------------------------------------------------------------------
 class InstallersData(DataStore):
     """Installers tank data. This is the data source for the InstallersList."""
@@ -1592,12 +1830,21 @@ class InstallersData(DataStore):
     overridden_skips = set() # populate with CIstr !
     __clean_overridden_after_load = True
     installers_dir_skips = set()
+    # the AssetResolver for the Data folder, shared with the plugin checks
+    _asset_resolver = AssetResolver()
 
     def __init__(self):
         self.store_dir = bass.dirs['installers']
         self.bash_dir.makedirs()
         #--Persistent data
+        # Installers.dat is only read to convert it to the installers store
         self.dictFile = bolt.PickleDict(self.bash_dir.join(u'Installers.dat'))
+        self._store = bolt.PickleLog(self.bash_dir.join(u'Installers.log'))
+        # what's in the store - to only append changes to it
+        self._stored_states = {}
+        self._stored_files_keys = {}
+        self._stored_sizeCrcDate = bolt.LowerDict()
+        self._stored_deltas = 0
         self.data = {}
         self.data_sizeCrcDate = bolt.LowerDict()
         from . import converters
@@ -1633,6 +1880,7 @@ def setChanged(self,hasChanged=True):
 
     def refresh(self, *args, **kwargs): return self.irefresh(*args, **kwargs)
 
+    @bolt.startup_phase(u'InstallersData.irefresh')
     def irefresh(self, progress=None, what='DIONSC', fullRefresh=False,
                  refresh_info=None, deleted=None, pending=None, projects=None):
         progress = progress or bolt.Progress()
@@ -1646,7 +1894,8 @@ def irefresh(self, progress=None, what='DIONSC', fullRefresh=False,
         if self.lastKey not in self.data:
             self.data[self.lastKey] = InstallerMarker(self.lastKey)
         if fullRefresh: # BAIN uses modInfos crc cache
-            with gui.BusyCursor(): modInfos.refresh_crcs()
+            progress(0, _(u'Calculating CRCs...') + u'\n')
+            with gui.BusyCursor(): modInfos.refresh_crcs(progress=progress)
         #--Refresh Other - FIXME(ut): docs
         if 'D' in what:
             changed |= self._refresh_from_data_dir(progress, fullRefresh)
@@ -1663,13 +1912,24 @@ def irefresh(self, progress=None, what='DIONSC', fullRefresh=False,
 
     def __load(self, progress):
         progress(0, _(u"Loading Data..."))
-        self.dictFile.load()
         self.converters_data.load()
-        data = self.dictFile.data
-        self.data = data.get('installers', {})
-        pickle = data.get('sizeCrcDate', {})
-        self.data_sizeCrcDate = bolt.LowerDict(pickle) if not isinstance(
-            pickle, bolt.LowerDict) else pickle
+        dat_path, log_path = self.dictFile.path, self._store.path
+        if log_path.exists() and dat_path.exists() and \
+                dat_path.mtime > log_path.mtime:
+            # an older Bash saved Installers.dat after the store - convert
+            # it again, the outdated store is rewritten on next save
+            deprint(u'%s is newer than %s, converting it' % (dat_path,
+                                                             log_path))
+            loaded = False
+        else: loaded = self.__load_store()
+        if not loaded:
+            # first run after upgrading - the store is written on next save
+            self.dictFile.load()
+            data = self.dictFile.data
+            self.data = data.get('installers', {})
+            pickle = data.get('sizeCrcDate', {})
+            self.data_sizeCrcDate = bolt.LowerDict(pickle) if not isinstance(
+                pickle, bolt.LowerDict) else pickle
         # fixup: all markers had their archive attribute set to u'===='
         for key, value in self.iteritems():
             if value.is_marker():
@@ -1677,20 +1937,108 @@ def __load(self, progress):
         self.loaded = True
         return True
 
+    # The installers store is a PickleLog with the following records:
+    # (u'I', name): the pickled (type key, store_state()) of an installer
+    # (u'F', name): the pickled store_file_tables() of an installer
+    # (u'D', seq): the pickled (changed, removed) data_sizeCrcDate entries,
+    #  applied in seq order
+    _store_types = (u'A', u'P', u'M')
+
+    def __store_type(self, installer):
+        return u'A' if installer.is_archive() else u'P' if \
+            installer.is_project() else u'M'
+
+    def __load_store(self):
+        """Load the installers store, return False if it does not exist."""
+        records = self._store.load()
+        if not records: return False
+        from . import InstallerMarker
+        inst_types = dict(zip(self._store_types,
+                              self._inst_types + [InstallerMarker]))
+        self.data = {}
+        self._stored_states.clear()
+        self._stored_files_keys.clear()
+        deltas = []
+        no_tables = cPickle.dumps((None, [], {}), -1)
+        for (record_type, record_key), value in records.iteritems():
+            if record_type == u'D':
+                deltas.append((record_key, value))
+            elif record_type == u'I':
+                type_key, state = cPickle.loads(value)
+                files_key, fileSizeCrcs, src_sizeCrcDate = cPickle.loads(
+                    records.get((u'F', record_key), no_tables))
+                name = GPath(record_key)
+                installer = inst_types[type_key](name)
+                installer.load_store_state(state, (fileSizeCrcs,
+                                                   src_sizeCrcDate))
+                self.data[name] = installer
+                self._stored_states[record_key] = value
+                self._stored_files_keys[record_key] = files_key
+        data_sizeCrcDate = {}
+        for _seq, value in sorted(deltas, key=itemgetter(0)):
+            changed, removed = cPickle.loads(value)
+            for rpFile in removed: data_sizeCrcDate.pop(rpFile, None)
+            data_sizeCrcDate.update(changed)
+        self.data_sizeCrcDate = bolt.LowerDict(data_sizeCrcDate)
+        self._stored_sizeCrcDate = self.data_sizeCrcDate.copy()
+        self._stored_deltas = max([d[0] for d in deltas] or [-1]) + 1
+        return True
+
     def save(self):
-        """Saves to pickle file."""
+        """Saves the installers that changed since the last save to the
+        installers store, rewriting it only when it needs compaction. What
+        we know is stored is only updated once the write succeeded."""
         if self.hasChanged:
-            self.dictFile.data['installers'] = self.data
-            self.dictFile.data['sizeCrcDate'] = dict( # FIXME: backwards compat
-                (GPath(x), y) for x, y in self.data_sizeCrcDate.iteritems())
-            # for backwards compatibility, drop
-            self.dictFile.data['crc_installer'] = dict(
-                (x.crc, x) for x in self.itervalues() if x.is_archive())
-            self.dictFile.vdata['version'] = 1
-            self.dictFile.save()
+            dumps = cPickle.dumps
+            records, states, files_keys = [], {}, {}
+            for name, installer in self.iteritems():
+                key = name.s
+                state = states[key] = dumps((self.__store_type(installer),
+                                             installer.store_state()), -1)
+                if self._stored_states.get(key) != state:
+                    records.append(((u'I', key), state))
+                file_tables = installer.store_file_tables()
+                files_keys[key] = file_tables[0]
+                if self._stored_files_keys.get(key) != file_tables[0]:
+                    records.append(((u'F', key), dumps(file_tables, -1)))
+            for key in set(self._stored_states) - set(states):
+                records.append(((u'I', key), None))
+                records.append(((u'F', key), None))
+            old_sizeCrcDate = self._stored_sizeCrcDate
+            changed = dict((u'%s' % k, v) for k, v in
+                           self.data_sizeCrcDate.iteritems() if
+                           old_sizeCrcDate.get(k) != v)
+            removed = [u'%s' % k for k in old_sizeCrcDate if
+                       k not in self.data_sizeCrcDate]
+            stored_deltas = self._stored_deltas
+            if changed or removed:
+                records.append(((u'D', stored_deltas),
+                                dumps((changed, removed), -1)))
+                stored_deltas += 1
+            if self._store.needs_compaction() or stored_deltas > 64:
+                self.__compact_store(states)
+                stored_deltas = 1
+            else:
+                self._store.append(records)
+            self._stored_states = states
+            self._stored_files_keys = files_keys
+            self._stored_sizeCrcDate = self.data_sizeCrcDate.copy()
+            self._stored_deltas = stored_deltas
             self.converters_data.save()
             self.hasChanged = False
 
+    def __compact_store(self, states):
+        dumps = cPickle.dumps
+        def _records():
+            for key, state in states.iteritems():
+                yield (u'I', key), state
+                yield (u'F', key), dumps(
+                    self[GPath(key)].store_file_tables(), -1)
+            yield (u'D', 0), dumps((dict(
+                (u'%s' % k, v) for k, v in self.data_sizeCrcDate.iteritems()),
+                []), -1)
+        self._store.compact(_records())
+
     def _rename_operation(self, oldName, newName):
         return self[oldName].renameInstaller(newName, self)
 
@@ -1807,6 +2155,38 @@ def refresh_installer(self, package, is_project, progress,
             self.irefresh(what='NS')
         return installer
 
+    def pack_projects(self, pack_jobs, progress, release=False):
+        """Pack several projects to archives concurrently, then add the new
+        archives to Bash. Each 7z process gets a share of the cpu threads
+        instead of all of them competing for every core.
+
+        :param pack_jobs: list of (project, archive, isSolid, blockSize)
+        :return: the list of the refreshed archive installers"""
+        if not pack_jobs: return []
+        workers = min(len(pack_jobs), bolt.max_workers())
+        threads = max(1, bolt.max_workers() // workers) if workers > 1 else 0
+        # 7z reports progress per file - weigh the jobs accordingly
+        weights = [len(self[job[0]].fileSizeCrcs) + 1 for job in pack_jobs]
+        def _pack(pack_job, job_progress):
+            project, archive, isSolid, blockSize = pack_job
+            # compress7z sets the full again once it counted the files
+            job_progress.setFull(len(self[project].fileSizeCrcs) + 1)
+            self[project].packToArchive(project, archive, isSolid, blockSize,
+                job_progress, release=release, threads=threads)
+        bolt.parallel_map(_pack, pack_jobs, SubProgress(progress, 0, 0.8),
+                          workers=workers, job_progress=True,
+                          job_weights=weights)
+        refresh_progress = SubProgress(progress, 0.8, 0.99, len(pack_jobs))
+        archives_ = []
+        for i, (project, archive, _solid, blockSize) in enumerate(pack_jobs):
+            iArchive = self.refresh_installer(archive, is_project=False,
+                progress=refresh_progress, install_order=self[project].order
+                + 1, _index=i)
+            iArchive.blockSize = blockSize
+            archives_.append(iArchive)
+        self.irefresh(what='NS')
+        return archives_
+
     def applyEmbeddedBCFs(self, installers=None, destArchives=None,
                           progress=bolt.Progress()):
         if installers is None:
@@ -2303,35 +2683,88 @@ def _install(self, packages, refresh_ui, progress=None, last=False,
             self.moveArchives(packages, len(self))
         to_install = set(self[x] for x in packages)
         min_order = min(x.order for x in to_install)
-        #--Install packages in turn
-        progress.setFull(len(packages))
-        index = 0
+        #--Plan the install - each file is installed by its winning package
+        install_plan = []
         for installer in self.sorted_values(reverse=True):
             if installer in to_install:
-                progress(index,installer.archive)
                 destFiles = set(installer.ci_dest_sizeCrc) - mask
                 if not override:
                     destFiles &= installer.missingFiles
                 if destFiles:
                     self._createTweaks(destFiles, installer, tweaksCreated)
-                    self.__installer_install(installer, destFiles, index,
-                                             progress, refresh_ui)
-                index += 1 # increment after it's used in __installer_install
-                installer.is_active = True
+                    install_plan.append((installer, destFiles))
                 if installer.order == min_order:
                     break # we are done
             #prevent lower packages from installing any files of this installer
-            if installer.is_active: mask |= set(installer.ci_dest_sizeCrc)
+            if installer.is_active or installer in to_install:
+                mask |= set(installer.ci_dest_sizeCrc)
+        self._execute_install_plan(install_plan, progress, refresh_ui)
+        for installer in to_install: # including those with nothing to install
+            installer.is_active = True
         if tweaksCreated:
             self._editTweaks(tweaksCreated)
             refresh_ui[1] |= bool(tweaksCreated)
         return tweaksCreated
 
-    def __installer_install(self, installer, destFiles, index, progress,
-                            refresh_ui):
-        sub_progress = SubProgress(progress, index, index + 1)
-        data_sizeCrcDate_update, mods, inis, bsas = installer.install(
-            destFiles, sub_progress)
+    def _execute_install_plan(self, install_plan, progress, refresh_ui):
+        """Install each (installer, destFiles) pair in install_plan. The
+        destFiles of the pairs must be disjoint, so archives are extracted
+        concurrently, then projects and archives that could not be streamed
+        are installed in turn. Each result is applied as soon as it is
+        available, marking its installer active - if an install fails or is
+        cancelled the completed ones are still applied, as their files are
+        in Data already.
+
+        :type install_plan: list[(Installer, set[CIstr])]"""
+        if not install_plan: return
+        dest_srcs = [inst.dest_src_for(dest_files) for inst, dest_files in
+                     install_plan]
+        results = [None] * len(install_plan)
+        applied = set()
+        def _apply(i):
+            applied.add(i) # don't retry it in the finally block below
+            installer_ = install_plan[i][0]
+            self.__installer_install(installer_, results[i], refresh_ui)
+            installer_.is_active = True
+        def _parallel_install(i):
+            # store the result here, so that it's kept if another job fails
+            try:
+                results[i] = install_plan[i][0].parallel_install(dest_srcs[i])
+            except Exception: # it will be installed in turn below
+                deprint(u'%s: Direct extraction failed' % (
+                    install_plan[i][0].archive), traceback=True)
+        parallel = [i for i, (inst, _dest_files) in enumerate(install_plan)
+                    if inst.is_archive() and dest_srcs[i]]
+        if len(parallel) < 2: parallel = [] # no point in using the pool
+        progress.setFull(len(install_plan) + 1)
+        try:
+            if parallel:
+                progress(0, _(u'Extracting files...'))
+                bolt.parallel_map(_parallel_install, parallel,
+                                  SubProgress(progress, 0, 1))
+                for i in parallel:
+                    if results[i] is not None: _apply(i)
+            for index, (installer, _dest_files) in enumerate(install_plan):
+                if results[index] is not None: continue
+                progress(index + 1, installer.archive)
+                dest_src = dest_srcs[index]
+                if not dest_src:
+                    results[index] = bolt.LowerDict(), set(), set(), set()
+                elif index in parallel:
+                    # we already failed streaming it, go through the temp dir
+                    results[index] = installer._install(
+                        dest_src, SubProgress(progress, index + 1, index + 2),
+                        _try_streaming=False)
+                else:
+                    results[index] = installer._install(
+                        dest_src, SubProgress(progress, index + 1, index + 2))
+                _apply(index)
+        finally:
+            for i, result in enumerate(results):
+                if result is not None and i not in applied: _apply(i)
+
+    def __installer_install(self, installer, install_result, refresh_ui):
+        data_sizeCrcDate_update, mods, inis, bsas = install_result
         refresh_ui[0] |= bool(mods)
         refresh_ui[1] |= bool(inis)
         # refresh modInfos, iniInfos adding new/modified mods
@@ -2559,15 +2992,12 @@ def _restoreFiles(self, restores, refresh_ui, progress):
         for key, group in groupby(restores, key=itemgetter(1)):
             installer_destinations[key] = set(dest for dest, _key in group)
         if not installer_destinations: return
-        installer_destinations = sorted(installer_destinations.items(),
-            key=lambda item: self[item[0]].order)
-        progress.setFull(len(installer_destinations))
-        for index, (archive, destFiles) in enumerate(installer_destinations):
-            progress(index, archive.s)
-            if destFiles:
-                installer = self[archive]
-                self.__installer_install(installer, destFiles, index, progress,
-                                         refresh_ui)
+        # restores map each file to its winning package, so the destinations
+        # are disjoint
+        install_plan = [(self[archive], destFiles) for archive, destFiles in
+                        installer_destinations.iteritems() if destFiles]
+        install_plan.sort(key=lambda item: item[0].order)
+        self._execute_install_plan(install_plan, progress, refresh_ui)
 
     def bain_anneal(self, anPackages, refresh_ui, progress=None):
         """Anneal selected packages. If no packages are selected, anneal all.
@@ -2648,15 +3078,72 @@ def clean_data_dir(self, refresh_ui):
             self.irefresh(what='NS')
 
     #--Utils
+    @classmethod
+    def get_asset_resolver(cls, active_bsas=None, data_sizeCrcDate=None):
+        """Return the AssetResolver of the Data folder, updated incrementally
+        to the specified active bsas and loose files if given - pass None to
+        skip updating them.
+
+        :param active_bsas: bosh.modInfos.get_active_bsas()
+        :param data_sizeCrcDate: InstallersData.data_sizeCrcDate"""
+        cls._asset_resolver.update(data_sizeCrcDate, active_bsas)
+        return cls._asset_resolver
+
+    def audit_textures(self, modInfos, progress):
+        """Read the headers of the textures in the Data directory, in the
+        projects that are not installed and in the active BSAs, on a pool of
+        worker threads. Return three OrderedDicts, mapping the installer
+        responsible for each loose texture (u'' for unmanaged ones), each
+        project and the plugin activating each BSA respectively, to lists of
+        (asset path, DDSFile or error message) tuples.
+
+        :param modInfos: bosh.modInfos"""
+        is_dds = lambda f: f.lower().endswith(u'.dds')
+        loose_owner = {dest: u'' for dest in self.data_sizeCrcDate if
+                       is_dds(dest)}
+        for installer in self.sorted_values():
+            if not installer.is_active: continue
+            for dest in installer.ci_dest_sizeCrc:
+                if dest in loose_owner: # lower() keys in both
+                    loose_owner[dest] = installer.archive
+        to_read = [(u'', owner, dest, bass.dirs['mods'].join(dest)) for
+                   dest, owner in loose_owner.iteritems()]
+        for project, installer in self.sorted_pairs():
+            if not installer.is_project() or installer.is_active: continue
+            to_read.extend((project, project.s, f,
+                            bass.dirs['installers'].join(project, f)) for
+                           f, _s, _c in installer.fileSizeCrcs if is_dds(f))
+        loose, projects = collections.OrderedDict(), \
+                          collections.OrderedDict()
+        # sort the loose owners in install order, unmanaged textures first
+        order = {k.s: inst.order for k, inst in self.iteritems()}
+        results = read_dds_headers([t[3] for t in to_read],
+                                   SubProgress(progress, 0, 0.5))
+        for (project, group, asset, _path), (_p, dds_file) in sorted(
+                zip(to_read, results), key=lambda t: (
+                    order.get(t[0][1], -1), t[0][2])):
+            target = projects if project else loose
+            target.setdefault(group, []).append((asset, dds_file))
+        bsas = collections.OrderedDict()
+        active_bsas = modInfos.get_active_bsas()
+        active_plugins = load_order.cached_active_tuple()
+        progress = SubProgress(progress, 0.5, 1)
+        progress.setFull(max(len(active_bsas), 1))
+        for i, (bsa_info, lo_index) in enumerate(active_bsas.iteritems()):
+            progress(i, _(u'Reading %s...') % bsa_info.name)
+            try:
+                bsa_textures = bsa_info.read_dds_headers()
+            except BSAError as e:
+                bsa_textures = [(u'', u'%s' % e)]
+            bsas.setdefault(active_plugins[lo_index].s, []).extend(
+                (u'%s: %s' % (bsa_info.name, asset), dds_file) for
+                asset, dds_file in bsa_textures)
+        return loose, projects, bsas
+
     @staticmethod
     def _filter_installer_bsas(inst, active_bsas):
         return (k for k in active_bsas if k.name.s in inst.ci_dest_sizeCrc)
 
-    @staticmethod
-    def _parse_error(bs, inst):
-        deprint(u'Error parsing %s [%s]' % (bs.name, inst.archive),
-                traceback=True)
-
     def find_conflicts(self, src_installer, active_bsas=None,
                        conflicts_mode=True):
         """
@@ -2687,41 +3174,49 @@ def find_conflicts(self, src_installer, active_bsas=None,
         src_sizeCrc = src_installer.ci_dest_sizeCrc
         # Calculate bsa conflicts
         if showBSA:
-            lower_bsa, higher_bsa = [], []
-            # Calculate all conflicts and save them in lower_bsa and higher_bsa
-            asset_to_bsa, src_assets = self.find_src_assets(src_installer,
-                                                            active_bsas)
+            bsa_infos = {b.name: b for b in active_bsas}
+            src_bsas = set(b.name for b in self._filter_installer_bsas(
+                src_installer, active_bsas))
+            # the packages of the other installers owning each active bsa
+            bsa_packages = collections.defaultdict(list)
             for package, installer in self.sorted_pairs():
                 if installer.order == srcOrder or not (showInactive or
                                                        installer.is_active):
                     continue # check active installers different than src
                 for bsa_info in self._filter_installer_bsas(
                         installer, active_bsas):
-                    try: # conflicting assets from this installer active bsas
-                        curConflicts = bsa_info.assets & src_assets
-                    except BSAError:
-                        self._parse_error(bsa_info, installer)
-                        continue
-                    if curConflicts:
-                        lower_result, higher_result = set(), set()
-                        for conflict in curConflicts:
-                            orig_order = active_bsas[asset_to_bsa[conflict]]
-                            curr_order = active_bsas[bsa_info]
-                            if curr_order == orig_order: continue
-                            elif curr_order < orig_order:
-                                if showLower: lower_result.add(conflict)
-                            else:
-                                higher_result.add(conflict)
-                        if lower_result:
-                            lower_bsa.append((package, bsa_info,
-                                              bolt.sortFiles(lower_result)))
-                        if higher_result:
-                            higher_bsa.append((package, bsa_info,
-                                               bolt.sortFiles(higher_result)))
-            def _sort_bsa_conflicts(bsa_conflict):
-                return active_bsas[bsa_conflict[1]]
-            lower_bsa.sort(key=_sort_bsa_conflicts)
-            higher_bsa.sort(key=_sort_bsa_conflicts)
+                    bsa_packages[bsa_info.name].append(package)
+            # only index the bsas of the installers - not the vanilla ones
+            resolver = self.get_asset_resolver(collections.OrderedDict(
+                (b, o) for b, o in active_bsas.iteritems() if
+                b.name in src_bsas or b.name in bsa_packages)) if \
+                src_bsas else AssetResolver()
+            lower_result = collections.defaultdict(set)
+            higher_result = collections.defaultdict(set)
+            for asset, providers in resolver.conflicts(
+                    resolver.bsa_assets(src_bsas)).iteritems():
+                providers = [p for p in providers if p is not None]
+                # the asset comes from the highest loading src bsa
+                orig_order = active_bsas[bsa_infos[
+                    [p for p in providers if p in src_bsas][-1]]]
+                for bsa_name in providers:
+                    curr_order = active_bsas[bsa_infos[bsa_name]]
+                    if curr_order == orig_order: continue
+                    elif curr_order < orig_order:
+                        if not showLower: continue
+                        result = lower_result
+                    else:
+                        result = higher_result
+                    for package in bsa_packages.get(bsa_name, ()):
+                        result[(package, bsa_name)].add(asset)
+            def _bsa_conflicts(result):
+                return sorted(((package, bsa_infos[bsa_name],
+                                bolt.sortFiles(assets)) for
+                               (package, bsa_name), assets in
+                               result.iteritems()), key=lambda c: (
+                    active_bsas[c[1]], self[c[0]].order))
+            lower_bsa = _bsa_conflicts(lower_result)
+            higher_bsa = _bsa_conflicts(higher_result)
         else:
             lower_bsa, higher_bsa = None, None
         # Calculate loose conflicts
@@ -2741,31 +3236,6 @@ def _sort_bsa_conflicts(bsa_conflict):
                 conflict_type.append((installer, package.s, curConflicts))
         return lower_loose, higher_loose, lower_bsa, higher_bsa
 
-    def find_src_assets(self, src_installer, active_bsas):
-        """Map srcInstaller's active bsas' assets to those bsas, assigning
-        the assets to the highest loading bsa - there's generally only one BSA
-        for Skyrim and older, one or two for SSE and any number of BSAs for
-        FO4.
-
-        :param src_installer: The installer from which to retrieve BSA assets.
-        :param active_bsas: The set of active BSAs. Generally retrieved via
-                            bosh.modInfos.get_active_bsas().
-        :return: An OrderedDict containing a mapping from asset to BSA and the
-                 relevant assets from the installer's BSAs in a set."""
-        asset_to_bsa, src_assets = collections.OrderedDict(), set()
-        for b in reversed(list(self._filter_installer_bsas(
-                src_installer, active_bsas))):
-            try:
-                b_assets = b.assets - src_assets
-            except BSAError:
-                self._parse_error(b, src_installer)
-                continue
-            if b_assets:
-                for b_asset in b_assets:
-                    asset_to_bsa[b_asset] = b
-                src_assets |= b_assets
-        return asset_to_bsa, src_assets
-
     def getConflictReport(self, srcInstaller, mode, modInfos):
         """Returns report of overrides for specified package for display on
         conflicts tab.
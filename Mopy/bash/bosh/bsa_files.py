@@ -34,21 +34,32 @@
 import collections
 import errno
 import lz4.frame
+import mmap
 import os
 import struct
+import threading
 import zlib
+from binascii import crc32
+from bisect import bisect_left
 from functools import partial
 from itertools import groupby, imap
+from multiprocessing.pool import ThreadPool
 from operator import itemgetter
-from .dds_files import DDSFile, mk_dxgi_fmt
+from io import BytesIO
+from .dds_files import DDSFile, mk_dxgi_fmt, MAX_HEADERS_SIZE
 from ..bolt import deprint, Progress, struct_pack, struct_unpack, \
-    unpack_byte, unpack_string, unpack_int, Flags, AFile
+    unpack_byte, unpack_string, unpack_int, Flags, AFile, GPath, max_workers
 from ..exception import AbstractError, BSAError, BSADecodingError, \
     BSAFlagError, BSACompressionError, BSADecompressionError, \
-    BSADecompressionSizeError
+    BSADecompressionSizeError, DDSError
 
 _bsa_encoding = u'cp1252' #rumor has it that's the files/folders names encoding
 path_sep = u'\\'
+# The most data each worker holds in memory at once while streaming large
+# records out of an archive - set from bash.ini by bosh.initBosh
+extraction_buffer_size = 4 * 1024 * 1024
+# Fewer jobs than this are not worth a thread pool
+_min_pooled_jobs = 8
 
 # Utilities -------------------------------------------------------------------
 def _decode_path(string_path, bsa_name):
@@ -57,6 +68,44 @@ def _decode_path(string_path, bsa_name):
     except UnicodeDecodeError:
         raise BSADecodingError(bsa_name, string_path)
 
+def _encode_path(asset_path, bsa_name):
+    try:
+        return asset_path.encode(_bsa_encoding)
+    except UnicodeEncodeError:
+        raise BSAError(bsa_name, u'Can not encode %r to %s' % (asset_path,
+                                                               _bsa_encoding))
+
+# A dictionary mapping file extensions to hash components. Used by Oblivion
+# (and later games) when hashing file names for their BSAs.
+_bsa_ext_lookup = collections.defaultdict(int)
+for _ext, _hash_part in [(u'.kf', 0x80), (u'.nif', 0x8000),
+                         (u'.dds', 0x8080), (u'.wav', 0x80000000)]:
+    _bsa_ext_lookup[_ext] = _hash_part
+del _ext, _hash_part
+
+def _bsa_hash(root, ext=u''):
+    """Calculates the BSA hash of a lowercase file name root and extension -
+    folder names are hashed as a whole, with an empty extension."""
+    chars = map(ord, root)
+    hash_part_1 = chars[-1] | ((len(chars) > 2 and chars[-2]) or 0) << 8 \
+                  | len(chars) << 16 | chars[0] << 24
+    hash_part_1 |= _bsa_ext_lookup[ext]
+    uint_mask, hash_part_2, hash_part_3 = 0xFFFFFFFF, 0, 0
+    for char in chars[1:-2]:
+        hash_part_2 = ((hash_part_2 * 0x1003F) + char) & uint_mask
+    for char in map(ord, ext):
+        hash_part_3 = ((hash_part_3 * 0x1003F) + char) & uint_mask
+    hash_part_2 = (hash_part_2 + hash_part_3) & uint_mask
+    return (hash_part_2 << 32) + hash_part_1
+
+# Lowercase names of the folder holding the files in the root of a bsa
+_root_folder_names = (u'', u'.')
+
+def _ba2_hash(encoded_name):
+    """Calculates the BA2 hash of a lowercase encoded name - that's a crc32
+    without the initial and final inversions."""
+    return (crc32(encoded_name, 0xFFFFFFFF) & 0xFFFFFFFF) ^ 0xFFFFFFFF
+
 class _BsaCompressionType(object):
     """Abstractly represents a way of compressing and decompressing BSA
     records."""
@@ -75,6 +124,25 @@ def decompress_rec(compressed_data, decompressed_size, bsa_name):
         error. Returns the resulting decompressed data."""
         raise AbstractError()
 
+    @staticmethod
+    def decompress_head(read_data, compressed_size, head_size, bsa_name):
+        """Decompresses the first head_size bytes of a record (or less, if
+        the record is smaller), reading as little of the compressed data as
+        possible. Raises a BSAError if the underlying compression library
+        raises an error.
+
+        :param read_data: Called as read_data(size) to read the first size
+            bytes of the compressed data."""
+        raise AbstractError()
+
+    @staticmethod
+    def decompress_stream(compressed_pieces, decompressed_size, bsa_name,
+                          buffer_size):
+        """Decompresses the record data given as an iterable of pieces,
+        yielding the decompressed data in pieces of at most buffer_size
+        bytes. Raises a BSAError like decompress_rec does."""
+        raise AbstractError()
+
 # Note that I mirrored BSArch here by simply leaving zlib and lz4 at their
 # defaults for compression
 class _Bsa_zlib(_BsaCompressionType):
@@ -98,6 +166,42 @@ def decompress_rec(compressed_data, decompressed_size, bsa_name):
                 bsa_name, u'zlib', decompressed_size, len(decompressed_data))
         return decompressed_data
 
+    @staticmethod
+    def decompress_head(read_data, compressed_size, head_size, bsa_name,
+                        _input_size=1024):
+        # Headers compress well, so a small chunk of input is almost always
+        # enough - only fall back to the whole record if it's not
+        try:
+            head = zlib.decompressobj().decompress(
+                read_data(min(compressed_size, _input_size)), head_size)
+            if len(head) < head_size and compressed_size > _input_size:
+                head = zlib.decompress(read_data(compressed_size))[:head_size]
+        except zlib.error as e:
+            raise BSADecompressionError(bsa_name, u'zlib', e)
+        return head
+
+    @staticmethod
+    def decompress_stream(compressed_pieces, decompressed_size, bsa_name,
+                          buffer_size):
+        decompressor = zlib.decompressobj()
+        total_size = 0
+        try:
+            for piece in compressed_pieces:
+                while piece:
+                    decompressed_data = decompressor.decompress(piece,
+                                                                buffer_size)
+                    piece = decompressor.unconsumed_tail
+                    total_size += len(decompressed_data)
+                    yield decompressed_data
+            decompressed_data = decompressor.flush()
+        except zlib.error as e:
+            raise BSADecompressionError(bsa_name, u'zlib', e)
+        total_size += len(decompressed_data)
+        yield decompressed_data
+        if total_size != decompressed_size:
+            raise BSADecompressionSizeError(
+                bsa_name, u'zlib', decompressed_size, total_size)
+
 class _Bsa_lz4(_BsaCompressionType):
     """Implements BSA record compression and decompression using lz4. Used
     only for SSE."""
@@ -119,6 +223,15 @@ def decompress_rec(compressed_data, decompressed_size, bsa_name):
                 bsa_name, u'LZ4', decompressed_size, len(decompressed_data))
         return decompressed_data
 
+    @staticmethod
+    def decompress_head(read_data, compressed_size, head_size, bsa_name):
+        # LZ4 frames can't be decoded partially, decompress the whole record
+        try:
+            return lz4.frame.decompress(
+                read_data(compressed_size))[:head_size]
+        except RuntimeError as e: # No custom lz4 exception for frames...
+            raise BSADecompressionError(bsa_name, u'LZ4', e)
+
 # Headers ---------------------------------------------------------------------
 class _Header(object):
     __slots__ = (u'file_id', u'version')
@@ -133,6 +246,10 @@ def load_header(self, ins, bsa_name):
             raise BSAError(bsa_name, u'Magic wrong: got %r, expected %r' % (
                 self.file_id, self.__class__.bsa_magic))
 
+    def dump_header(self, out):
+        for fmt, attr in zip(_Header.formats, _Header.__slots__):
+            out.write(struct_pack(fmt[0], self.__getattribute__(attr)))
+
 class BsaHeader(_Header):
     __slots__ = ( # in the order encountered in the header
          u'folder_records_offset', u'archive_flags', u'folder_count',
@@ -167,6 +284,11 @@ def load_header(self, ins, bsa_name):
         if not self.archive_flags.include_file_names:
             raise BSAFlagError(bsa_name, u"'Has Names For Files'", 2)
 
+    def dump_header(self, out):
+        super(BsaHeader, self).dump_header(out)
+        for fmt, attr in zip(BsaHeader.formats, BsaHeader.__slots__):
+            out.write(struct_pack(fmt[0], int(self.__getattribute__(attr))))
+
     def is_compressed(self): return self.archive_flags.compressed_archive
     def embed_filenames(self): return self.archive_flags.embed_file_names
 
@@ -188,6 +310,11 @@ def load_header(self, ins, bsa_name):
                                      u'%s' % (
                 self.ba2_files_type, u' or '.join(self.file_types)))
 
+    def dump_header(self, out):
+        super(Ba2Header, self).dump_header(out)
+        for fmt, attr in zip(Ba2Header.formats, Ba2Header.__slots__):
+            out.write(struct_pack(fmt[0], self.__getattribute__(attr)))
+
 class MorrowindBsaHeader(_Header):
     __slots__ = (u'file_id', u'hash_offset', u'file_count')
     formats = [(f, struct.calcsize(f)) for f in (u'4s', u'I', u'I')]
@@ -222,10 +349,23 @@ def load_record_from_buffer(self, memview, start):
         self.record_hash, = struct.unpack_from(fmt, memview, start)
         return start + fmt_siz
 
+    def dump_record(self, out):
+        out.write(struct_pack(_HashedRecord.formats[0][0], self.record_hash))
+
     @classmethod
     def total_record_size(cls):
         return _HashedRecord.formats[0][1]
 
+    @classmethod
+    def new_record(cls, record_hash, **kwargs):
+        """Create a record to be dumped - attributes not passed in default
+        to 0."""
+        rec = cls()
+        rec.record_hash = record_hash
+        for attr in cls.__slots__:
+            rec.__setattr__(attr, kwargs.pop(attr, 0))
+        return rec
+
     def __eq__(self, other):
         if isinstance(other, self.__class__):
             return self.record_hash == other.record_hash
@@ -263,6 +403,11 @@ def load_record_from_buffer(self, memview, start):
             start += fmt[1]
         return start
 
+    def dump_record(self, out):
+        super(_BsaHashedRecord, self).dump_record(out)
+        for fmt, attr in zip(self.__class__.formats, self.__class__.__slots__):
+            out.write(struct_pack(fmt[0], self.__getattribute__(attr)))
+
     @classmethod
     def total_record_size(cls):
         return super(_BsaHashedRecord, cls).total_record_size() + sum(
@@ -280,7 +425,8 @@ class BSAFileRecord(_BsaHashedRecord):
     __slots__ = (u'file_size_flags', u'raw_file_data_offset')
     formats = [(f, struct.calcsize(f)) for f in (u'I', u'I')]
 
-    def compression_toggle(self): return self.file_size_flags & 0x40000000
+    def compression_toggle(self):
+        return bool(self.file_size_flags & 0x40000000)
 
     def raw_data_size(self):
         if self.compression_toggle():
@@ -416,10 +562,75 @@ def _makedirs_exists_ok(target_dir):
         if e.errno != errno.EEXIST:
             raise
 
+class _ArchiveReader(object):
+    """Random access reads from an archive that are safe to issue from several
+    threads. The archive is memory mapped - if that fails (e.g. not enough
+    address space for a huge archive) each thread gets its own file handle."""
+
+    def __init__(self, archive_path):
+        self._archive_path = archive_path
+        self.size = os.path.getsize(archive_path)
+        self._local = threading.local()
+        self._handles = []
+        try:
+            with open(archive_path, u'rb') as ins:
+                self._mmap = mmap.mmap(ins.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+        except (EnvironmentError, OverflowError, ValueError) as e:
+            deprint(u'Failed to map %s, using file reads: %r' % (
+                archive_path, e))
+            self._mmap = None
+
+    def read(self, offset, size):
+        if self._mmap is not None:
+            return self._mmap[offset:offset + size]
+        ins = getattr(self._local, u'ins', None)
+        if ins is None:
+            ins = self._local.ins = open(self._archive_path, u'rb')
+            self._handles.append(ins)
+        ins.seek(offset)
+        return ins.read(size)
+
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._mmap is not None: self._mmap.close()
+        for ins in self._handles: ins.close()
+
+# Sounds are stored uncompressed, the engine can't play compressed ones
+_uncompressed_exts = frozenset((u'.wav', u'.xwm', u'.fuz', u'.ogg', u'.mp3'))
+
+def _write_payloads(out, read_payload, assets, progress, bsa_name, workers):
+    """Write the payloads of assets to out, in order. read_payload is called
+    on each of the (asset_path, src_path) tuples in assets on a pool of worker
+    threads and must return the data to write and a record describing them.
+    Only a bounded window of payloads is kept in memory. Returns a list of
+    (offset, size, record) tuples for the payloads written."""
+    workers = workers or max_workers()
+    pool = ThreadPool(workers)
+    pending = collections.deque()
+    written = []
+    def _write_next():
+        data, payload_record = pending.popleft().get()
+        written.append((out.tell(), len(data), payload_record))
+        out.write(data)
+        if progress:
+            progress(len(written), u'Packing %s...\n%s' % (
+                bsa_name, assets[len(written) - 1][0]))
+    try:
+        for asset in assets:
+            pending.append(pool.apply_async(read_payload, (asset,)))
+            if len(pending) >= 2 * workers: _write_next()
+        while pending: _write_next()
+    finally: # on errors (or cancel) drop the jobs not yet started
+        pool.terminate()
+        pool.join()
+    return written
+
 class ABsa(AFile):
     """:type bsa_folders: collections.OrderedDict[unicode, BSAFolder]"""
     header_type = BsaHeader
     _assets = frozenset()
+    _hash_index = None
     _compression_type = _Bsa_zlib # type: _BsaCompressionType
 
     def __init__(self, fullpath, load_cache=False, names_only=True):
@@ -478,50 +689,219 @@ def extract_assets(self, asset_paths, dest_folder, progress=None):
         folder_to_assets = self._map_assets_to_folders(folder_files_dict)
         # unload the bsa
         self.bsa_folders.clear()
-        # get the data from the file
-        global_compression = self.bsa_header.is_compressed()
-        i = 0
+        # decompress and write the files on a pool of worker threads
+        read_record = partial(self._read_record,
+                              self.bsa_header.is_compressed(),
+                              self.bsa_header.embed_filenames())
+        self._extract_records(
+            [(record.raw_file_data_offset, folder, filename, record) for
+             folder, file_records in folder_to_assets.iteritems() for
+             filename, record in file_records], read_record, dest_folder,
+            progress)
+
+    @staticmethod
+    def _data_span(embed_filenames, reader, record):
+        """Returns the offset and size of the data of the specified file
+        record, skipping the embedded filename if any."""
+        data_offset = record.raw_file_data_offset
+        data_size = record.raw_data_size()
+        if embed_filenames: # use len(filename) ?
+            filename_len = ord(reader.read(data_offset, 1))
+            data_offset += filename_len + 1 # discard filename
+            data_size -= filename_len + 1
+        return data_offset, data_size
+
+    def _read_record(self, global_compression, embed_filenames, reader,
+                     record):
+        """Returns the (decompressed) data of the specified file record or
+        None if it should be skipped."""
+        data_offset, data_size = self._data_span(embed_filenames, reader,
+                                                 record)
+        if global_compression ^ record.compression_toggle():
+            # This is a compressed record, so decompress it
+            uncompressed_size, = struct_unpack(u'I',
+                                               reader.read(data_offset, 4))
+            try:
+                return self._compression_type.decompress_rec(
+                    reader.read(data_offset + 4, data_size - 4),
+                    uncompressed_size, self.bsa_name)
+            except BSAError:
+                # Ignore errors for Fallout - Misc.bsa - Bethesda probably
+                # used an old buggy zlib version when packing it (taken from
+                # BSArch sources)
+                if self.bsa_name == u'Fallout - Misc.bsa':
+                    return None
+                raise
+        # This is an uncompressed record, just read it
+        return reader.read(data_offset, data_size)
+
+    def _extract_records(self, to_extract, read_record, dest_folder,
+                         progress, stream_record=None):
+        """Extracts files on a pool of worker threads, which read them from
+        the memory mapped archive, decompress them and write them out.
+
+        :param to_extract: A list of (offset, folder, filename, record) tuples
+            - files are extracted in offset order, so that reads from the
+            archive are mostly sequential.
+        :param read_record: Called as read_record(reader, record) from the
+            workers, returns the data to write or None to skip the file.
+        :param stream_record: If given, it is called instead of read_record
+            as stream_record(reader, record, out) and writes the data to the
+            open file out piece by piece, for records too big to keep in
+            memory whole."""
+        to_extract.sort(key=itemgetter(0))
+        # create the target dirs up front, from this thread
+        target_dirs = {}
+        for folder in set(imap(itemgetter(1), to_extract)):
+            # BSA paths always have backslashes, so we need to convert them
+            # to the platform's path separators before we extract
+            target_dirs[folder] = os.path.join(dest_folder,
+                                               *folder.split(path_sep))
+            _makedirs_exists_ok(target_dirs[folder])
+        def _extract(reader, extract_job):
+            _offset, folder, filename, record = extract_job
+            if stream_record is not None:
+                out_path = os.path.join(target_dirs[folder], filename)
+                with open(out_path, u'wb') as out:
+                    try:
+                        stream_record(reader, record, out)
+                    except:
+                        out.close() # don't leave partial files behind
+                        os.remove(out_path)
+                        raise
+                return folder, None
+            raw_data = read_record(reader, record)
+            if raw_data is not None:
+                with open(os.path.join(target_dirs[folder], filename),
+                          u'wb') as out:
+                    out.write(raw_data)
+            return folder, None
+        for _result in self._pool_records(to_extract, _extract, progress,
+                                          u'Extracting %s...\n%s'): pass
+
+    def _pool_records(self, jobs, run_job, progress, progress_msg):
+        """Run run_job(reader, job) for each of jobs on a pool of worker
+        threads, reader reading from the memory mapped archive. run_job
+        returns a (label, result) tuple - the label is formatted along with
+        our name into progress_msg to update the progress and the results are
+        yielded as they come in. A handful of jobs is run in this thread,
+        spinning up (and tearing down) the pool would take longer."""
         if progress:
-            progress.setFull(len(folder_to_assets))
-        with open(u'%s' % self.abs_path, u'rb') as bsa_file:
-            for folder, file_records in folder_to_assets.iteritems():
-                if progress:
-                    progress(i, u'Extracting %s...\n%s' % (
-                        self.bsa_name, folder))
-                    i += 1
-                # BSA paths always have backslashes, so we need to convert them
-                # to the platform's path separators before we extract
-                target_dir = os.path.join(dest_folder, *folder.split(u'\\'))
-                _makedirs_exists_ok(target_dir)
-                for filename, record in file_records:
-                    data_size = record.raw_data_size()
-                    bsa_file.seek(record.raw_file_data_offset)
-                    if self.bsa_header.embed_filenames(): # use len(filename) ?
-                        filename_len = unpack_byte(bsa_file)
-                        bsa_file.seek(filename_len, 1) # discard filename
-                        data_size -= filename_len + 1
-                    if global_compression ^ record.compression_toggle():
-                        # This is a compressed record, so decompress it
-                        uncompressed_size = unpack_int(bsa_file)
-                        data_size -= 4
-                        try:
-                            raw_data = self._compression_type.decompress_rec(
-                                bsa_file.read(data_size), uncompressed_size,
-                                self.bsa_name)
-                        except BSAError:
-                            # Ignore errors for Fallout - Misc.bsa - Bethesda
-                            # probably used an old buggy zlib version when
-                            # packing it (taken from BSArch sources)
-                            if self.bsa_name == u'Fallout - Misc.bsa':
-                                continue
-                            else:
-                                raise
-                    else:
-                        # This is an uncompressed record, just read it
-                        raw_data = bsa_file.read(data_size)
-                    with open(os.path.join(target_dir, filename),
-                              u'wb') as out:
-                        out.write(raw_data)
+            progress.setFull(max(len(jobs), 1))
+        with _ArchiveReader(u'%s' % self.abs_path) as reader:
+            if len(jobs) < _min_pooled_jobs:
+                for i, job in enumerate(jobs):
+                    label, result = run_job(reader, job)
+                    if progress:
+                        progress(i, progress_msg % (self.bsa_name, label))
+                    yield result
+                return
+            pool = ThreadPool(max_workers())
+            try:
+                for i, (label, result) in enumerate(pool.imap_unordered(
+                        partial(run_job, reader), jobs)):
+                    if progress:
+                        progress(i, progress_msg % (self.bsa_name, label))
+                    yield result
+            finally: # on errors (or cancel) drop the jobs not yet started
+                pool.terminate()
+                pool.join()
+
+    def verify(self, progress=None):
+        """Fully reads and decompresses every record of this archive on a
+        pool of worker threads, without writing anything, and checks the
+        record sizes and that the names match their hashes.
+
+        :param progress: The progress callback to use. None if unwanted.
+        :return: A list of the problems found, empty if there are none."""
+        problems = []
+        try:
+            to_verify = self._verify_names(problems)
+        except struct.error as e:
+            raise BSAError(self.bsa_name, u'Error while unpacking: %r' % e)
+        def _verify(reader, verify_job):
+            _offset, asset_path, record = verify_job
+            try:
+                problem = self._verify_record(reader, record)
+            except (BSAError, struct.error) as e:
+                problem = u'%s' % e
+            return asset_path, problem and u'%s: %s' % (asset_path, problem)
+        problems.extend(sorted(filter(None, self._pool_records(
+            to_verify, _verify, progress, u'Verifying %s...\n%s'))))
+        return problems
+
+    def read_dds_headers(self, progress=None):
+        """Reads just the headers of every DDS file in this archive on a pool
+        of worker threads - at most dds_files.MAX_HEADERS_SIZE bytes of
+        (decompressed) data per file and nothing at all for DX10 BA2s, whose
+        records already hold the texture metadata.
+
+        :param progress: The progress callback to use. None if unwanted.
+        :return: A list of (asset path, DDSFile or error message) tuples,
+            sorted by asset path."""
+        try:
+            to_read = self._dds_records()
+        except struct.error as e:
+            raise BSAError(self.bsa_name, u'Error while unpacking: %r' % e)
+        def _read(reader, read_job):
+            _offset, asset_path, record = read_job
+            dds_file = DDSFile(u'')
+            try:
+                self._load_dds_headers(reader, record, dds_file)
+            except (BSAError, DDSError, struct.error) as e:
+                return asset_path, (asset_path, u'%s' % e)
+            return asset_path, (asset_path, dds_file)
+        return sorted(self._pool_records(
+            sorted(to_read, key=itemgetter(0)), _read, progress,
+            u'Reading %s...\n%s'), key=itemgetter(0))
+
+    def _dds_records(self):
+        """Loads the archive and returns a list of (offset, asset path,
+        record) tuples for its DDS files."""
+        self._load_bsa()
+        dds_records = []
+        for folder_path, bsa_folder in self.bsa_folders.iteritems():
+            for filename, record in bsa_folder.folder_assets.iteritems():
+                if not filename.lower().endswith(u'.dds'): continue
+                asset_path = path_sep.join((folder_path, filename)) if \
+                    folder_path else filename
+                dds_records.append((self._data_offset(record), asset_path,
+                                    record))
+        self.bsa_folders.clear()
+        return dds_records
+
+    @staticmethod
+    def _data_offset(record):
+        """Returns the offset of the data of the specified record."""
+        return record.raw_file_data_offset
+
+    def _load_dds_headers(self, reader, record, dds_file):
+        """Loads the headers of the specified DDS file record into
+        dds_file."""
+        dds_file.load_from_stream(BytesIO(self._read_head(
+            reader, record, MAX_HEADERS_SIZE)), headers_only=True)
+
+    def _read_head(self, reader, record, head_size):
+        """Returns the first head_size bytes of the (decompressed) data of
+        the specified file record, or all of it if it's smaller."""
+        data_offset, data_size = self._data_span(
+            self.bsa_header.embed_filenames(), reader, record)
+        if self.bsa_header.is_compressed() ^ record.compression_toggle():
+            return self._compression_type.decompress_head(
+                partial(reader.read, data_offset + 4), data_size - 4,
+                head_size, self.bsa_name)
+        return reader.read(data_offset, min(data_size, head_size))
+
+    def _verify_names(self, problems):
+        """Loads the archive and checks its names against their hashes,
+        appending any mismatches to problems. Returns a list of (offset,
+        asset path, record) tuples for the records to verify."""
+        raise AbstractError()
+
+    def _verify_record(self, reader, record):
+        """Reads and decompresses the specified record. Returns a problem
+        description or None, may raise BSAError."""
+        raise AbstractError()
 
     def _map_assets_to_folders(self, folder_files_dict):
         folder_to_assets = collections.OrderedDict()
@@ -555,6 +935,52 @@ def assets(self):
             del self._filenames[:]
         return self._assets
 
+    # Writing
+    @classmethod
+    def create(cls, bsa_path, asset_sources, compress=True, progress=None,
+               workers=None):
+        """Creates an archive of this type at the specified path, packing
+        the specified loose files into it - an existing archive is replaced.
+        The files are read and compressed on a pool of worker threads and
+        streamed to the archive, which is never held in memory as a whole.
+
+        :param bsa_path: The path of the archive to create.
+        :param asset_sources: A dict mapping the paths of the assets in the
+            archive (relative to Data) to the paths of the files to pack.
+        :param compress: Whether to compress the files. Sounds are never
+            compressed.
+        :param progress: The progress callback to use. None if unwanted.
+        :param workers: The maximum number of worker threads to use.
+        :return: An instance of this class for the new archive."""
+        bsa_path = GPath(bsa_path)
+        bsa_name = bsa_path.stail
+        assets = {}
+        for asset_path, src_path in asset_sources.iteritems():
+            asset_path = asset_path.replace(u'/', path_sep).strip(
+                path_sep).lower()
+            if asset_path in assets:
+                raise BSAError(bsa_name, u'Duplicate asset %s' % asset_path)
+            assets[asset_path] = u'%s' % src_path
+        if progress:
+            progress.setFull(max(len(assets), 1))
+        temp_path = bsa_path + u'.tmp'
+        try:
+            with open(temp_path.s, u'wb') as out:
+                cls._write_archive(out, assets, compress, progress, workers,
+                                   bsa_name)
+        except:
+            temp_path.remove()
+            raise
+        temp_path.moveTo(bsa_path)
+        return cls(bsa_path)
+
+    @classmethod
+    def _write_archive(cls, out, assets, compress, progress, workers,
+                       bsa_name):
+        """Writes an archive of this type to out - assets is a dict mapping
+        normalized asset paths to the paths of the files to pack."""
+        raise AbstractError()
+
 class BSA(ABsa):
     """Bsa file. Notes:
     - We require that include_directory_names and include_file_names are True.
@@ -641,6 +1067,295 @@ def _discard_file_records(self, bsa_file, folder_path, folder_record,
                       folder_record.files_count, 1)
         folders[folder_path] = folder_record
 
+    # Verification
+    def _verify_names(self, problems):
+        self._load_bsa()
+        if self.total_names_length != \
+                self.bsa_header.total_folder_name_length:
+            problems.append(u'Header reports wrong folder names length %d - '
+                            u'actual: %d' % (
+                self.bsa_header.total_folder_name_length,
+                self.total_names_length))
+        to_verify = []
+        for folder_path, bsa_folder in self.bsa_folders.iteritems():
+            folder_lower = folder_path.lower()
+            if folder_lower and bsa_folder.folder_record.record_hash != \
+                    _bsa_hash(folder_lower):
+                problems.append(u'%s: folder name does not match its hash' %
+                                folder_path)
+            for filename, record in bsa_folder.folder_assets.iteritems():
+                asset_path = path_sep.join((folder_path, filename))
+                root, ext = os.path.splitext(filename.lower())
+                if root and record.record_hash != _bsa_hash(root, ext):
+                    problems.append(u'%s: file name does not match its hash'
+                                    % asset_path)
+                to_verify.append((record.raw_file_data_offset, asset_path,
+                                  record))
+        self.bsa_folders.clear()
+        return to_verify
+
+    def _verify_record(self, reader, record):
+        if record.raw_file_data_offset + record.raw_data_size() > \
+                reader.size:
+            return u'data past the end of the archive'
+        if self._read_record(self.bsa_header.is_compressed(),
+                             self.bsa_header.embed_filenames(), reader,
+                             record) is None:
+            return u'corrupt compressed data (skipped when extracting)'
+
+    # Hash lookups
+    def has_assets(self, asset_paths):
+        """If the asset names are not loaded yet look the paths up by their
+        name hashes - much cheaper than decoding the names of a big bsa to
+        check a handful of paths."""
+        if self._assets is not self.__class__._assets:
+            return super(BSA, self).has_assets(asset_paths)
+        try:
+            if self._hash_index is None: self._load_hash_index()
+            with open(u'%s' % self.abs_path, u'rb') as bsa_file:
+                return {a.cs for a in asset_paths if
+                        self._hashed_lookup(bsa_file, a.s)}
+        except struct.error as e:
+            raise BSAError(self.bsa_name, u'Error while unpacking: %r' % e)
+
+    def extract_assets(self, asset_paths, dest_folder, progress=None):
+        """If only a few assets are wanted, look their file records up by
+        their name hashes instead of loading all the records of the bsa."""
+        asset_paths = set(imap(unicode.lower, asset_paths))
+        try:
+            if self._hash_index is None: self._load_hash_index()
+            if len(asset_paths) * 4 > self.bsa_header.file_count:
+                return super(BSA, self).extract_assets(asset_paths,
+                                                       dest_folder, progress)
+            to_extract = []
+            with open(u'%s' % self.abs_path, u'rb') as bsa_file:
+                for asset_path in asset_paths:
+                    found = self._hashed_lookup(bsa_file, asset_path)
+                    if found:
+                        folder, filename, record = found
+                        to_extract.append((record.raw_file_data_offset,
+                                           folder, filename, record))
+        except struct.error as e:
+            raise BSAError(self.bsa_name, u'Error while unpacking: %r' % e)
+        read_record = partial(self._read_record,
+                              self.bsa_header.is_compressed(),
+                              self.bsa_header.embed_filenames())
+        self._extract_records(to_extract, read_record, dest_folder, progress)
+
+    def _load_hash_index(self):
+        """Read the folder records, sorted by hash in the bsa, plus what we
+        need to locate the file records and names of each folder."""
+        folder_rec_type = self.__class__.folder_record_type
+        with open(u'%s' % self.abs_path, u'rb') as bsa_file:
+            my_header = self.bsa_header
+            my_header.load_header(bsa_file, self.bsa_name)
+            folder_count = my_header.folder_count
+            records_block = memoryview(bsa_file.read(
+                folder_count * folder_rec_type.total_record_size()))
+            folder_records, start = [], 0
+            for __ in xrange(folder_count):
+                rec = folder_rec_type()
+                start = rec.load_record_from_buffer(records_block, start)
+                folder_records.append(rec)
+            # folders' first file index, to find their names in the names
+            # block, which starts right after the last folder's file records
+            first_file, names_offset = [], 0
+            file_index = 0
+            for rec in folder_records:
+                first_file.append(file_index)
+                file_index += rec.files_count
+            if folder_records:
+                last = max(folder_records,
+                           key=lambda r: r.file_records_offset)
+                last_offset = last.file_records_offset - \
+                              my_header.total_file_name_length
+                bsa_file.seek(last_offset)
+                names_offset = last_offset + 1 + unpack_byte(bsa_file) + \
+                    last.files_count * self.file_record_type.total_record_size()
+        self._hash_index = ([r.record_hash for r in folder_records],
+                            folder_records, first_file, names_offset)
+        self._hash_folders = {} # folder index -> (name, hashes, records)
+        self._hash_name_offsets = [0] # offsets of the names scanned so far
+
+    def _folder_files(self, bsa_file, folder_record):
+        """Return the decoded folder name, the file hashes and the undecoded
+        file records block of the specified folder."""
+        bsa_file.seek(folder_record.file_records_offset -
+                      self.bsa_header.total_file_name_length)
+        name_size = unpack_byte(bsa_file)
+        folder_name = _decode_path(unpack_string(bsa_file, name_size - 1),
+                                   self.bsa_name)
+        bsa_file.seek(1, 1) # discard null terminator
+        rec_size = self.file_record_type.total_record_size()
+        records_block = bsa_file.read(folder_record.files_count * rec_size)
+        hash_fmt = _HashedRecord.formats[0][0]
+        return folder_name, [struct.unpack_from(hash_fmt, records_block,
+            i * rec_size)[0] for i in xrange(folder_record.files_count)], \
+               records_block
+
+    def _hashed_lookup(self, bsa_file, asset_path):
+        """Look up the specified asset - names are only decoded to confirm
+        hash matches. Return None if this bsa does not contain it, else its
+        folder name, file name and file record - only the file records of
+        the folders we look into are ever parsed."""
+        folder, _sep, file_name = asset_path.replace(u'/', path_sep).lower(
+            ).strip(path_sep).rpartition(path_sep)
+        if not file_name: return None
+        folder_hashes, folder_records, first_file, names_offset = \
+            self._hash_index
+        file_hash = _bsa_hash(*os.path.splitext(file_name))
+        # files in the archive root live in a folder named u'' or u'.'
+        if folder:
+            candidates = ((_bsa_hash(folder), (folder,)),)
+        else:
+            candidates = ((0, _root_folder_names),
+                          (_bsa_hash(u'.'), _root_folder_names))
+        for folder_hash, folder_names in candidates:
+            i = bisect_left(folder_hashes, folder_hash)
+            while i < len(folder_hashes) and folder_hashes[i] == folder_hash:
+                if i not in self._hash_folders:
+                    self._hash_folders[i] = self._folder_files(
+                        bsa_file, folder_records[i])
+                folder_name, file_hashes, records_block = \
+                    self._hash_folders[i]
+                if folder_name.lower() in folder_names:
+                    j = bisect_left(file_hashes, file_hash)
+                    while j < len(file_hashes) and file_hashes[j] == file_hash:
+                        name = self._file_name(bsa_file, names_offset,
+                                               first_file[i] + j)
+                        if name.lower() == file_name:
+                            record = self.file_record_type()
+                            record.load_record_from_buffer(
+                                memoryview(records_block),
+                                j * record.total_record_size())
+                            return folder_name, name, record
+                        j += 1
+                i += 1
+        return None
+
+    def _file_name(self, bsa_file, names_offset, file_index):
+        """Decode the name of the file_index-th file of the bsa. The names
+        block has no index, so the offsets of the names are collected while
+        scanning it, only as far as the requested name - later lookups seek
+        straight to theirs."""
+        name_offsets = self._hash_name_offsets # relative to names_offset
+        names_length = self.bsa_header.total_file_name_length
+        if file_index + 1 >= len(name_offsets): # scan for more null bytes
+            bsa_file.seek(names_offset + name_offsets[-1])
+            start = name_offsets[-1]
+            while file_index + 1 >= len(name_offsets) and start < names_length:
+                chunk = bsa_file.read(min(0x10000, names_length - start))
+                if not chunk: break
+                end = chunk.find(b'\x00')
+                while end != -1:
+                    name_offsets.append(start + end + 1)
+                    end = chunk.find(b'\x00', end + 1)
+                start += len(chunk)
+            if file_index + 1 >= len(name_offsets):
+                raise BSAError(self.bsa_name, u'File name %d missing from the '
+                                              u'names block' % file_index)
+        name_start = name_offsets[file_index]
+        bsa_file.seek(names_offset + name_start)
+        return _decode_path(bsa_file.read(
+            name_offsets[file_index + 1] - name_start - 1), self.bsa_name)
+
+    # Writing
+    _create_version = 104
+    # Maps top level folders to file_flags bits - anything else is misc
+    _folder_file_flags = {u'meshes': 0x1, u'textures': 0x2, u'menus': 0x4,
+                          u'sound': 0x8, u'shaders': 0x20, u'trees': 0x40,
+                          u'fonts': 0x80}
+
+    @classmethod
+    def _write_archive(cls, out, assets, compress, progress, workers,
+                       bsa_name):
+        folders = collections.defaultdict(list)
+        for asset_path, src_path in assets.iteritems():
+            folder, _sep, file_name = asset_path.rpartition(path_sep)
+            if not folder:
+                raise BSAError(bsa_name, u'%s is not in a folder' % asset_path)
+            folders[folder].append(
+                (_bsa_hash(*os.path.splitext(file_name)), file_name, src_path))
+        # the game binary searches folders and files by hash, so sort them
+        folder_list = sorted((_bsa_hash(folder), folder, sorted(files)) for
+                             folder, files in folders.iteritems())
+        def _check_hashes(hashes, folder):
+            if len(set(hashes)) != len(hashes):
+                raise BSAError(bsa_name, u'Hash collision in %s' % folder)
+        _check_hashes([h for h, _f, _files in folder_list], u'folder names')
+        file_flags = 0
+        folder_names, file_names = [], []
+        for _h, folder, files in folder_list:
+            _check_hashes([h for h, _n, _s in files], folder)
+            if folder.startswith(u'sound\\voice'):
+                file_flags |= 0x10
+            else:
+                file_flags |= cls._folder_file_flags.get(
+                    folder.split(path_sep, 1)[0], 0x100)
+            folder_names.append(_encode_path(folder, bsa_name))
+            if len(folder_names[-1]) > 254:
+                raise BSAError(bsa_name, u'Folder name too long: %s' % folder)
+            file_names.extend(_encode_path(n, bsa_name) for _h, n, _s in files)
+        my_header = cls.header_type() # type: BsaHeader
+        my_header.file_id = my_header.bsa_magic
+        my_header.version = cls._create_version
+        my_header.folder_records_offset = my_header.header_size
+        # include_directory_names, include_file_names, compressed_archive
+        my_header.archive_flags = 0x3 | (0x4 if compress else 0)
+        my_header.folder_count = len(folder_list)
+        my_header.file_count = len(assets)
+        my_header.total_folder_name_length = sum(
+            len(n) + 1 for n in folder_names)
+        my_header.total_file_name_length = sum(len(n) + 1 for n in file_names)
+        my_header.file_flags = file_flags
+        file_record_size = cls.file_record_type.total_record_size()
+        file_records_offset = my_header.header_size + len(
+            folder_list) * cls.folder_record_type.total_record_size()
+        data_offset = file_records_offset + sum(
+            len(n) + 2 for n in folder_names) + len(
+            assets) * file_record_size + my_header.total_file_name_length
+        # write the payloads first, we need their offsets and sizes
+        def _read_payload(asset):
+            asset_path, src_path = asset
+            with open(src_path, u'rb') as ins:
+                data = ins.read()
+            if compress and os.path.splitext(asset_path)[1] not in \
+                    _uncompressed_exts:
+                return struct_pack(u'I', len(data)) + \
+                       cls._compression_type.compress_rec(data, bsa_name), True
+            return data, False
+        out.seek(data_offset)
+        written = _write_payloads(out, _read_payload, [
+            (path_sep.join((folder, n)), src) for _h, folder, files in
+            folder_list for _fh, n, src in files], progress, bsa_name, workers)
+        if written and written[-1][0] > 0xFFFFFFFF:
+            raise BSAError(bsa_name, u'Archive too big - offsets must fit in '
+                                     u'32 bits')
+        # now the header and the records
+        out.seek(0)
+        my_header.dump_header(out)
+        # folder records point past the file names block - cf. the UESP
+        records_offset = file_records_offset + \
+                         my_header.total_file_name_length
+        for (folder_hash, _f, files), name in zip(folder_list, folder_names):
+            cls.folder_record_type.new_record(folder_hash,
+                files_count=len(files),
+                file_records_offset=records_offset).dump_record(out)
+            records_offset += len(name) + 2 + len(files) * file_record_size
+        payloads = iter(written)
+        for (_h, _f, files), name in zip(folder_list, folder_names):
+            out.write(struct_pack(u'B', len(name) + 1) + name + b'\x00')
+            for file_hash, _n, _s in files:
+                offset, size, is_compressed = next(payloads)
+                if size & 0xC0000000:
+                    raise BSAError(bsa_name, u'%s is too big' % _n)
+                if is_compressed != compress:
+                    size |= 0x40000000 # toggle the archive's compression
+                cls.file_record_type.new_record(file_hash,
+                    file_size_flags=size,
+                    raw_file_data_offset=offset).dump_record(out)
+        out.write(b''.join(n + b'\x00' for n in file_names))
+
 class BA2(ABsa):
     header_type = Ba2Header
 
@@ -655,73 +1370,133 @@ def extract_assets(self, asset_paths, dest_folder, progress=None):
         folder_to_assets = self._map_assets_to_folders(folder_files_dict)
         # unload the bsa
         self.bsa_folders.clear()
-        # get the data from the file
-        i = 0
-        if progress:
-            progress.setFull(len(folder_to_assets))
-        with open(u'%s' % self.abs_path, u'rb') as bsa_file:
-            def _read_rec_or_chunk(record):
-                """Helper method, handles reading both compressed and
-                uncompressed records (or texture chunks)."""
-                bsa_file.seek(record.offset)
-                if record.packed_size:
-                    # This is a compressed record, so decompress it
-                    return self._compression_type.decompress_rec(
-                        bsa_file.read(record.packed_size),
-                        record.unpacked_size, self.bsa_name)
+        # decompress and write the files on a pool of worker threads -
+        # textures are streamed out chunk by chunk, they can be huge
+        if is_dx10:
+            get_offset = lambda r: r.tex_chunks[0].offset if r.tex_chunks \
+                else 0
+            stream_record = self._stream_texture
+        else:
+            get_offset = lambda r: r.offset
+            stream_record = None
+        self._extract_records(
+            [(get_offset(record), folder, filename, record) for
+             folder, file_records in folder_to_assets.iteritems() for
+             filename, record in file_records], self._read_rec_or_chunk,
+            dest_folder, progress, stream_record=stream_record)
+
+    def _read_rec_or_chunk(self, reader, record):
+        """Handles reading both compressed and uncompressed records (or
+        texture chunks)."""
+        if record.packed_size:
+            # This is a compressed record, so decompress it
+            return self._compression_type.decompress_rec(
+                reader.read(record.offset, record.packed_size),
+                record.unpacked_size, self.bsa_name)
+        else:
+            # This is an uncompressed record, just read it
+            return reader.read(record.offset, record.unpacked_size)
+
+    @staticmethod
+    def _data_offset(record):
+        return getattr(record, u'offset', 0) # DX10 records have no data
+
+    def _load_dds_headers(self, reader, record, dds_file):
+        if self.bsa_header.ba2_files_type == b'DX10':
+            self._build_dds_header(dds_file, record)
+        else:
+            super(BA2, self)._load_dds_headers(reader, record, dds_file)
+
+    def _read_head(self, reader, record, head_size):
+        if record.packed_size:
+            return self._compression_type.decompress_head(
+                partial(reader.read, record.offset), record.packed_size,
+                head_size, self.bsa_name)
+        return reader.read(record.offset, min(record.unpacked_size,
+                                              head_size))
+
+    def _verify_names(self, problems):
+        self._load_bsa()
+        is_dx10 = self.bsa_header.ba2_files_type == b'DX10'
+        to_verify = []
+        for folder_path, ba2_folder in self.bsa_folders.iteritems():
+            dir_hash = _ba2_hash(_encode_path(folder_path.lower(),
+                                              self.bsa_name))
+            for filename, record in ba2_folder.folder_assets.iteritems():
+                asset_path = path_sep.join((folder_path, filename)) if \
+                    folder_path else filename
+                root = os.path.splitext(filename.lower())[0]
+                if record.dir_hash != dir_hash or record.record_hash != \
+                        _ba2_hash(_encode_path(root, self.bsa_name)):
+                    problems.append(u'%s: name does not match its hashes' %
+                                    asset_path)
+                if is_dx10:
+                    offset = record.tex_chunks[0].offset if \
+                        record.tex_chunks else 0
                 else:
-                    # This is an uncompressed record, just read it
-                    return bsa_file.read(record.unpacked_size)
-            def _build_dds_header(dds_file, record):
-                """Helper method, sets up a functional DDS header for the
-                specified DDS file based on the specified record."""
-                dds_file.dds_header.dw_height = record.height
-                dds_file.dds_header.dw_width = record.width
-                dds_file.dds_header.dw_mip_map_count = record.num_mips
-                dds_file.dds_header.dw_depth = 1
-                # 3 == DDS_DIMENSION_TEXTURE2D - PY3: enum!
-                dds_file.dds_dxt10.resource_dimension = 3
-                dds_file.dds_dxt10.array_size = 1
-                if record.cube_maps == 2049:
-                    dds_file.dds_header.dw_caps.DDSCAPS_COMPLEX = True
-                    # All but DDSCAPS2_VOLUME or'd together
-                    # Archive.exe sticks these into dwCaps, which is 100%
-                    # wrong, but that's DDS for you...
-                    dds_file.dds_header.dw_caps2 = 0xFE00
-                    # 0x4 == DDS_RESOURCE_MISC_TEXTURECUBE
-                    dds_file.dds_dxt10.misc_flag = 0x4
-                # This needs to be last, it uses the header's width and height
-                record.dxgi_format.setup_file(
-                    dds_file, use_legacy_formats=True)
-            for folder, file_records in folder_to_assets.iteritems():
-                if progress:
-                    progress(i, u'Extracting %s...\n%s' % (
-                        self.bsa_name, folder))
-                    i += 1
-                # BSA paths always have backslashes, so we need to convert them
-                # to the platform's path separators before we extract
-                target_dir = os.path.join(dest_folder, *folder.split(u'\\'))
-                _makedirs_exists_ok(target_dir)
-                for filename, record in file_records:
-                    if is_dx10:
-                        # We're dealing with a DX10 BA2, need to combine all
-                        # the texture chunks in the record first
-                        dds_data = b''
-                        for tex_chunk in record.tex_chunks:
-                            dds_data += _read_rec_or_chunk(tex_chunk)
-                        # Add a DDS header based on the data in the record,
-                        # then dump the resulting DDS file - cf. BSArch
-                        dds_file = DDSFile(u'')
-                        _build_dds_header(dds_file, record)
-                        dds_file.dds_contents = dds_data
-                        raw_data = dds_file.dump_file()
-                    else:
-                        # Otherwise, we're dealing with a GNRL BA2, just
-                        # read/decompress/write the record directly
-                        raw_data = _read_rec_or_chunk(record)
-                    with open(os.path.join(target_dir, filename),
-                              u'wb') as out:
-                        out.write(raw_data)
+                    offset = record.offset
+                to_verify.append((offset, asset_path, record))
+        self.bsa_folders.clear()
+        return to_verify
+
+    def _verify_record(self, reader, record):
+        if self.bsa_header.ba2_files_type == b'DX10':
+            chunks = record.tex_chunks
+        else:
+            chunks = [record]
+        for chunk in chunks:
+            if chunk.offset + (chunk.packed_size or chunk.unpacked_size) > \
+                    reader.size:
+                return u'data past the end of the archive'
+            self._read_rec_or_chunk(reader, chunk)
+
+    def _stream_rec_or_chunk(self, reader, record, out):
+        """Like _read_rec_or_chunk, but writes the data to out in pieces of
+        at most extraction_buffer_size bytes."""
+        buffer_size = extraction_buffer_size
+        data_size = record.packed_size or record.unpacked_size
+        pieces = (reader.read(record.offset + x,
+                              min(buffer_size, data_size - x)) for x in
+                  xrange(0, data_size, buffer_size))
+        if record.packed_size:
+            # This is a compressed record, so decompress it
+            pieces = self._compression_type.decompress_stream(
+                pieces, record.unpacked_size, self.bsa_name, buffer_size)
+        for piece in pieces:
+            out.write(piece)
+
+    def _stream_texture(self, reader, record, out):
+        """We're dealing with a DX10 BA2 - write a DDS header based on the
+        data in the record (cf. BSArch), then append the texture chunks one
+        by one."""
+        dds_file = DDSFile(u'')
+        self._build_dds_header(dds_file, record)
+        out.write(dds_file.dump_file()) # no contents - just the headers
+        for tex_chunk in record.tex_chunks:
+            self._stream_rec_or_chunk(reader, tex_chunk, out)
+
+    @staticmethod
+    def _build_dds_header(dds_file, record):
+        """Sets up a functional DDS header for the specified DDS file based on
+        the specified record."""
+        dds_file.dds_header.dw_height = record.height
+        dds_file.dds_header.dw_width = record.width
+        dds_file.dds_header.dw_mip_map_count = record.num_mips
+        dds_file.dds_header.dw_depth = 1
+        # 3 == DDS_DIMENSION_TEXTURE2D - PY3: enum!
+        dds_file.dds_dxt10.resource_dimension = 3
+        dds_file.dds_dxt10.array_size = 1
+        if record.cube_maps == 2049:
+            dds_file.dds_header.dw_caps.DDSCAPS_COMPLEX = True
+            # All but DDSCAPS2_VOLUME or'd together
+            # Archive.exe sticks these into dwCaps, which is 100%
+            # wrong, but that's DDS for you...
+            dds_file.dds_header.dw_caps2 = 0xFE00
+            dds_file.dds_header._set_flags() # wrap dw_caps2 in its Flags
+            # 0x4 == DDS_RESOURCE_MISC_TEXTURECUBE
+            dds_file.dds_dxt10.misc_flag = 0x4
+        # This needs to be last, it uses the header's width and height
+        record.dxgi_format.setup_file(dds_file, use_legacy_formats=True)
 
     def _load_bsa(self):
         with open(u'%s' % self.abs_path, u'rb') as bsa_file:
@@ -778,6 +1553,48 @@ def _load_bsa_light(self):
             file_names_block = file_names_block[name_size + 2:]
         self._filenames = _filenames
 
+    # Writing - only general (GNRL) BA2s are supported, texture (DX10) ones
+    # would need the textures split in chunks per mipmap
+    @classmethod
+    def _write_archive(cls, out, assets, compress, progress, workers,
+                       bsa_name):
+        assets = sorted(assets.iteritems())
+        encoded_names = [_encode_path(a, bsa_name) for a, _s in assets]
+        my_header = cls.header_type() # type: Ba2Header
+        my_header.file_id = my_header.bsa_magic
+        my_header.version = 1
+        my_header.ba2_files_type = b'GNRL'
+        my_header.ba2_num_files = len(assets)
+        data_offset = my_header.header_size + len(
+            assets) * Ba2FileRecordGeneral.total_record_size()
+        def _read_payload(asset):
+            asset_path, src_path = asset
+            with open(src_path, u'rb') as ins:
+                data = ins.read()
+            if compress and os.path.splitext(asset_path)[1] not in \
+                    _uncompressed_exts:
+                packed = cls._compression_type.compress_rec(data, bsa_name)
+                if len(packed) < len(data):
+                    return packed, (len(data), len(packed))
+            return data, (len(data), 0) # packed_size 0 means uncompressed
+        out.seek(data_offset)
+        written = _write_payloads(out, _read_payload, assets, progress,
+                                  bsa_name, workers)
+        my_header.ba2_name_table_offset = out.tell()
+        out.write(b''.join(struct_pack(u'H', len(n)) + n for n in
+                           encoded_names))
+        out.seek(0)
+        my_header.dump_header(out)
+        for encoded_name, (offset, _size, (unpacked_size, packed_size)) in \
+                zip(encoded_names, written):
+            folder, _sep, file_name = encoded_name.rpartition(b'\\')
+            root, ext = os.path.splitext(file_name)
+            Ba2FileRecordGeneral.new_record(_ba2_hash(root),
+                file_extension=ext[1:5], dir_hash=_ba2_hash(folder),
+                unknown1=0x00100100, offset=offset, packed_size=packed_size,
+                unpacked_size=unpacked_size,
+                unused1=0xBAADF00D).dump_record(out)
+
 class MorrowindBsa(ABsa):
     header_type = MorrowindBsaHeader
 
@@ -818,38 +1635,44 @@ def extract_assets(self, asset_paths, dest_folder, progress=None):
         # Keep only the file records that correspond to asset_paths
         target_records = [x for x in self.file_records
                           if x.file_name in asset_paths]
-        i = 0
-        if progress:
-            progress.setFull(len(target_records))
-        with open(u'%s' % self.abs_path, u'rb') as bsa_file:
-            for file_record in target_records:
-                rec_name = file_record.file_name
-                if progress:
-                    # No folder records, simulate them to avoid updating the
-                    # progress bar too frequently
-                    progress(i, u'Extracting %s...\n%s' % (
-                        self.bsa_name, os.path.dirname(rec_name)))
-                    i += 1
-                # There is no compression for Morrowind BSAs, but all offsets
-                # are relative to the final_offset we read earlier
-                bsa_file.seek(self.final_offset + file_record.relative_offset)
-                # Finally, simply read from the BSA file and write out the
-                # result, making sure to create any needed directories
-                raw_data = bsa_file.read(file_record.file_size)
-                out_path = os.path.join(dest_folder, rec_name)
-                _makedirs_exists_ok(os.path.dirname(out_path))
-                with open(out_path, u'wb') as out:
-                    out.write(raw_data)
+        to_extract = []
+        for file_record in target_records:
+            folder, _sep, filename = file_record.file_name.rpartition(path_sep)
+            to_extract.append((file_record.relative_offset, folder, filename,
+                               file_record))
+        self._extract_records(to_extract, self._read_record, dest_folder,
+                              progress)
+
+    def _verify_names(self, problems):
+        # Morrowind uses a different hash - just check the data
+        self._load_bsa()
+        return [(r.relative_offset, r.file_name, r) for r in
+                self.file_records]
+
+    def _verify_record(self, reader, file_record):
+        if self.final_offset + file_record.relative_offset + \
+                file_record.file_size > reader.size:
+            return u'data past the end of the archive'
+
+    def _dds_records(self):
+        self._load_bsa()
+        return [(r.relative_offset, r.file_name, r) for r in
+                self.file_records if r.file_name.lower().endswith(u'.dds')]
+
+    def _read_head(self, reader, file_record, head_size):
+        return reader.read(self.final_offset + file_record.relative_offset,
+                           min(file_record.file_size, head_size))
+
+    def _read_record(self, reader, file_record):
+        # There is no compression for Morrowind BSAs, but all offsets are
+        # relative to the final_offset we read earlier
+        return reader.read(self.final_offset + file_record.relative_offset,
+                           file_record.file_size)
 
 class OblivionBsa(BSA):
     header_type = OblivionBsaHeader
     file_record_type = BSAOblivionFileRecord
-    # A dictionary mapping file extensions to hash components. Used by Oblivion
-    # when hashing file names for its BSAs.
-    _bsa_ext_lookup = collections.defaultdict(int)
-    for ext, hash_part in [(u'.kf', 0x80), (u'.nif', 0x8000),
-                           (u'.dds', 0x8080), (u'.wav', 0x80000000)]:
-        _bsa_ext_lookup[ext] = hash_part
+    _create_version = 103
 
     @staticmethod
     def calculate_hash(file_name):
@@ -860,18 +1683,7 @@ def calculate_hash(file_name):
         See here for more information:
         https://en.uesp.net/wiki/Tes4Mod:Hash_Calculation"""
         #--NOTE: fileName is NOT a Path object!
-        root, ext = os.path.splitext(file_name.lower())
-        chars = map(ord, root)
-        hash_part_1 = chars[-1] | ((len(chars) > 2 and chars[-2]) or 0) << 8 \
-                      | len(chars) << 16 | chars[0] << 24
-        hash_part_1 |= OblivionBsa._bsa_ext_lookup[ext]
-        uint_mask, hash_part_2, hash_part_3 = 0xFFFFFFFF, 0, 0
-        for char in chars[1:-2]:
-            hash_part_2 = ((hash_part_2 * 0x1003F) + char) & uint_mask
-        for char in map(ord, ext):
-            hash_part_3 = ((hash_part_3 * 0x1003F) + char) & uint_mask
-        hash_part_2 = (hash_part_2 + hash_part_3) & uint_mask
-        return (hash_part_2 << 32) + hash_part_1
+        return _bsa_hash(*os.path.splitext(file_name.lower()))
 
     def undo_alterations(self, progress=Progress()):
         """Undoes any alterations that previously applied BSA Alteration may
@@ -905,6 +1717,7 @@ def undo_alterations(self, progress=Progress()):
 class SkyrimSeBsa(BSA):
     folder_record_type = BSASkyrimSEFolderRecord
     _compression_type = _Bsa_lz4
+    _create_version = 105
 
 # Factory
 def get_bsa_type(game_fsName):
@@ -40,14 +40,18 @@
 
 import copy
 from collections import defaultdict
-from struct import Struct
-from ..bolt import Flags, unpack_4s, unpack_int, AFile
+from functools import partial
+from io import BytesIO
+from struct import Struct, error as struct_error
+from ..bolt import Flags, unpack_4s, unpack_int, AFile, parallel_map
 from ..exception import DDSError
 
 # Constants
 _HEADER_MAGIC = b'DDS '
 _HEADER_SIZE = 124
 _PF_SIZE = 32
+# The most we have to read to get all headers - magic, header and DXT10 header
+MAX_HEADERS_SIZE = 4 + _HEADER_SIZE + 20
 
 _MAGIC_DXT1 = b'DXT1'
 _MAGIC_DXT2 = b'DXT2'
@@ -247,26 +251,36 @@ def fmt_index(self):
         """Returns the index of this DXGI format, for writing to a DDS file."""
         return self._fmt_index
 
+    @property
+    def fmt_name(self):
+        """Returns the standardized name of this DXGI format."""
+        return self._fmt_name
+
+    @property
+    def fmt_compressed(self):
+        """Returns True if this DXGI format is block-compressed."""
+        return self._fmt_compressed
+
+    def compute_pitch(self, width, height):
+        """Returns the row pitch and the slice pitch (i.e. the size in bytes)
+        of an image of the specified dimensions in this DXGI format."""
+        return _compute_pitch[self._fmt_name](self._fmt_bpp, width, height)
+
     def setup_file(self, dds_file, use_legacy_formats=False):
         """Sets up the specified DDS file to work with this DXGI format.
 
         :type dds_file: DDSFile
         :param use_legacy_formats: If set to True, use non-DXT10 legacy formats
             that are equivalent instead."""
-        target_pf = self._fmt_ddspf if use_legacy_formats else _DDSPF_DXT10
+        # Not every DXGI format has a legacy equivalent (e.g. BC7)
+        target_pf = self._fmt_ddspf if use_legacy_formats and \
+                                       self._fmt_ddspf else _DDSPF_DXT10
         dds_file.dds_header.ddspf = copy.copy(target_pf)
-        row_pitch, slice_pitch = _compute_pitch[self._fmt_name](
-            self._fmt_bpp, dds_file.dds_header.dw_width,
-            dds_file.dds_header.dw_height)
-        if self._fmt_compressed:
-            dds_file.dds_header.dw_flags.DDSD_PITCH = False
-            dds_file.dds_header.dw_flags.DDSD_LINEARSIZE = True
-            dds_file.dds_header.dw_pitch_or_linear_size = slice_pitch
-        else:
-            dds_file.dds_header.dw_flags.DDSD_PITCH = True
-            dds_file.dds_header.dw_flags.DDSD_LINEARSIZE = False
-            dds_file.dds_header.dw_pitch_or_linear_size = row_pitch
-        if self._fmt_ddspf.needs_dxt10:
+        dds_file.dds_header.set_pitch(self._fmt_compressed,
+                                      *self.compute_pitch(
+                                          dds_file.dds_header.dw_width,
+                                          dds_file.dds_header.dw_height))
+        if target_pf.needs_dxt10:
             dds_file.dds_dxt10.dxgi_format = copy.copy(self)
 
     def __repr__(self):
@@ -435,11 +449,11 @@ def _compute_shift_dyn(_bpp, width, height):
 _compute_nv11 = _compute_complex(4, lambda height: height, 3, 2)
 _compute_p208 = _compute_complex(2, lambda height: height)
 
-def _compute_v208(width, height):
+def _compute_v208(_bpp, width, height):
     """V208-specific row/slice pitch computation function."""
     return width, width * (height + (((height + 1) >> 1) * 2))
 
-def _compute_v408(width, height):
+def _compute_v408(_bpp, width, height):
     """V408-specific row/slice pitch computation function."""
     return width, width * (height + ((height >> 1) * 4))
 
@@ -491,6 +505,25 @@ def _compute_default(bpp, width, height):
     u'DXGI_FORMAT_V408': _compute_v408,
 })
 
+# Maps the pixel formats of legacy (non-DXT10) DDS files to the DXGI format
+# with the same memory layout - cf. GetDXGIFormat in DirectXTexDDS.cpp
+def _pf_key(ddspf):
+    """Returns a hashable key identifying the specified pixel format."""
+    if ddspf.pf_flags.DDPF_FOURCC:
+        return ddspf.pf_four_cc
+    return (int(ddspf.pf_flags), ddspf.pf_rgb_bit_count, ddspf.pf_r_bit_mask,
+            ddspf.pf_g_bit_mask, ddspf.pf_b_bit_mask, ddspf.pf_a_bit_mask)
+_legacy_to_dxgi = {_pf_key(f._fmt_ddspf): f for f in sorted(
+    _DXGIFormat.index_to_fmt.itervalues(), key=lambda f: -f.fmt_index)
+                   if f._fmt_ddspf is not None}
+# DXT2/DXT4 are the premultiplied alpha versions of DXT3/DXT5 and ATI1/ATI2
+# are older names for BC4/BC5
+for _alias, _target in ((_MAGIC_DXT2, _MAGIC_DXT3), (_MAGIC_DXT4, _MAGIC_DXT5),
+                        (b'ATI1', _MAGIC_BC4_UNORM),
+                        (b'ATI2', _MAGIC_BC5_UNORM)):
+    _legacy_to_dxgi[_alias] = _legacy_to_dxgi[_target]
+del _alias, _target
+
 # https://docs.microsoft.com/en-us/windows/win32/direct3ddds/dds-header
 class _DDSHeader(object):
     """A DDS header, contains a pixel format."""
@@ -530,6 +563,14 @@ def _set_flags(self):
         self.dw_caps.DDSCAPS_MIPMAP = self.dw_mip_map_count > 1
         ##: Expand to set all appropriate flags
 
+    def set_pitch(self, compressed, row_pitch, slice_pitch):
+        """Stores the linear size of the top-level image for compressed
+        formats, or its row pitch for uncompressed ones."""
+        self.dw_flags.DDSD_PITCH = not compressed
+        self.dw_flags.DDSD_LINEARSIZE = compressed
+        self.dw_pitch_or_linear_size = slice_pitch if compressed else \
+            row_pitch
+
     def load_header(self, ins):
         """Loads this header from the specified stream."""
         self.dds_magic = unpack_4s(ins)
@@ -573,7 +614,7 @@ class _DDSHeaderDXT10(object):
     """A DDS DXT10 header, contains a pixel format."""
     __slots__ = (u'dxgi_format', u'resource_dimension', u'misc_flag',
                  u'array_size', u'misc_flags2')
-    _dump_dxt10 = Struct(u'=5I')
+    _dump_dxt10 = Struct(u'=5I').pack
 
     def __init__(self):
         """Initializes every field in the header to its default value."""
@@ -605,14 +646,50 @@ def load_file(self):
         with self.abs_path.open(u'rb') as ins:
             self.load_from_stream(ins)
 
-    def load_from_stream(self, ins):
-        """Load the entire DDS file from the specified stream."""
-        self.dds_header.load_header(ins)
-        # Check if a DXT10 header is going to be present
-        if self.dds_header.ddspf.needs_dxt10:
-            self.dds_dxt10.load_header(ins)
+    def load_headers_only(self):
+        """Load just the DDS and DXT10 headers from the file that this
+        DDSFile instance was created with, reading at most MAX_HEADERS_SIZE
+        bytes."""
+        with self.abs_path.open(u'rb') as ins:
+            self.load_from_stream(BytesIO(ins.read(MAX_HEADERS_SIZE)),
+                                  headers_only=True)
+
+    def load_from_stream(self, ins, headers_only=False):
+        """Load the entire DDS file from the specified stream, or just its
+        headers if headers_only is True."""
+        try:
+            self.dds_header.load_header(ins)
+            # Check if a DXT10 header is going to be present
+            if self.dds_header.ddspf.needs_dxt10:
+                self.dds_dxt10.load_header(ins)
+        except struct_error:
+            raise DDSError(u'Truncated DDS headers')
         # Read and store the rest of the stream
-        self.dds_contents = ins.read()
+        if not headers_only:
+            self.dds_contents = ins.read()
+
+    @property
+    def format_name(self):
+        """Returns a short name for this file's format - the FourCC for
+        legacy compressed formats, else the DXGI format name or, failing
+        that, the number of bits per pixel."""
+        ddspf = self.dds_header.ddspf
+        if ddspf.needs_dxt10:
+            dxgi_fmt = self.dds_dxt10.dxgi_format
+        elif ddspf.pf_flags.DDPF_FOURCC:
+            return ddspf.pf_four_cc.decode(u'ascii', u'replace')
+        else:
+            dxgi_fmt = _legacy_to_dxgi.get(_pf_key(ddspf))
+            if dxgi_fmt is None:
+                return u'%u bpp' % ddspf.pf_rgb_bit_count
+        return dxgi_fmt.fmt_name.replace(u'DXGI_FORMAT_', u'', 1)
+
+    def image_size(self):
+        """Returns the size in bytes of all the images (mip levels, cubemap
+        faces and array elements) in this DDS file, as computed from its
+        headers - an estimate of the VRAM it takes up. Works with just the
+        headers loaded."""
+        return sum(self.mip_sizes()) * self._num_surfaces()
 
     def dump_file(self):
         """Dumps this DDS file to a bytestring and returns the result."""
@@ -622,11 +699,98 @@ def dump_file(self):
             out_data += self.dds_dxt10.dump_header()
         return out_data + self.dds_contents
 
+    def _get_pitch_func(self):
+        """Returns a function computing the row and slice pitch of an image
+        of the given width and height in this file's format, plus whether that
+        format is block-compressed."""
+        ddspf = self.dds_header.ddspf
+        if ddspf.needs_dxt10:
+            dxgi_fmt = self.dds_dxt10.dxgi_format
+        else:
+            dxgi_fmt = _legacy_to_dxgi.get(_pf_key(ddspf))
+        if dxgi_fmt is not None and dxgi_fmt.fmt_index:
+            return dxgi_fmt.compute_pitch, dxgi_fmt.fmt_compressed
+        if ddspf.needs_dxt10 or ddspf.pf_flags.DDPF_FOURCC or \
+                not ddspf.pf_rgb_bit_count:
+            raise DDSError(u'Unsupported pixel format %s' % (
+                self.dds_dxt10.dxgi_format if ddspf.needs_dxt10 else
+                ddspf.pf_four_cc or u'%08X' % int(ddspf.pf_flags)))
+        # An uncompressed legacy format without a DXGI equivalent, e.g. R8G8B8
+        return partial(_compute_default, ddspf.pf_rgb_bit_count), False
+
+    def _num_surfaces(self):
+        """Returns the number of mip chains stored in this file - one per
+        cubemap face and array element."""
+        caps2 = int(self.dds_header.dw_caps2) # may not be wrapped in Flags
+        if self.dds_header.ddspf.needs_dxt10:
+            # 4 == DDS_DIMENSION_TEXTURE3D - PY3: enum!
+            if self.dds_dxt10.resource_dimension == 4:
+                raise DDSError(u'Volume textures are not supported')
+            num_surfaces = max(self.dds_dxt10.array_size, 1)
+            # 0x4 == DDS_RESOURCE_MISC_TEXTURECUBE
+            return num_surfaces * 6 if self.dds_dxt10.misc_flag & 0x4 else \
+                num_surfaces
+        if caps2 & 0x200000: # DDSCAPS2_VOLUME
+            raise DDSError(u'Volume textures are not supported')
+        if caps2 & 0x200: # DDSCAPS2_CUBEMAP - count the faces present
+            return bin(caps2 & 0xFC00).count(u'1')
+        return 1
+
+    def mip_sizes(self):
+        """Returns a list of the sizes in bytes of the mip levels of a single
+        surface (cubemap face or array element) of this DDS file, starting
+        with the largest one."""
+        compute_pitch, _compressed = self._get_pitch_func()
+        width = self.dds_header.dw_width
+        height = self.dds_header.dw_height
+        return [compute_pitch(max(1, width >> x), max(1, height >> x))[1]
+                for x in xrange(max(1, self.dds_header.dw_mip_map_count))]
+
+    def stripped_size(self, num_mips):
+        """Returns the number of bytes strip_top_mips(num_mips) would save,
+        without modifying this DDS file. Works with just the headers
+        loaded."""
+        mip_sizes = self.mip_sizes()
+        num_mips = min(num_mips, len(mip_sizes) - 1)
+        return sum(mip_sizes[:num_mips]) * self._num_surfaces() if \
+            num_mips > 0 else 0
+
+    def strip_top_mips(self, num_mips):
+        """Drops the num_mips largest mip levels of this DDS file by slicing
+        them off its contents and adjusting the header accordingly - no
+        re-encoding is performed. The smallest mip level is always kept, so
+        textures without mipmaps are left untouched. Returns the number of mip
+        levels that were dropped.
+
+        :param num_mips: The number of mip levels to drop."""
+        compute_pitch, compressed = self._get_pitch_func()
+        num_surfaces = self._num_surfaces()
+        mip_sizes = self.mip_sizes()
+        num_mips = min(num_mips, len(mip_sizes) - 1)
+        if num_mips <= 0: return 0
+        chain_size = sum(mip_sizes)
+        if len(self.dds_contents) < chain_size * num_surfaces:
+            raise DDSError(u'Expected at least %u bytes of image data, but '
+                           u'got %u' % (chain_size * num_surfaces,
+                                        len(self.dds_contents)))
+        dropped_size = sum(mip_sizes[:num_mips])
+        self.dds_contents = b''.join(
+            self.dds_contents[x * chain_size + dropped_size:
+                              (x + 1) * chain_size]
+            for x in xrange(num_surfaces))
+        header = self.dds_header
+        header.dw_width = max(1, header.dw_width >> num_mips)
+        header.dw_height = max(1, header.dw_height >> num_mips)
+        header.dw_mip_map_count -= num_mips
+        header.set_pitch(compressed, *compute_pitch(header.dw_width,
+                                                    header.dw_height))
+        return num_mips
+
     def write_file(self, out_path=None):
         """Writes this DDS file to the specified path. If out_path is None,
         this file's own path will be used."""
         out_path = out_path or self.abs_path
-        with out_path.open(u'w') as out:
+        with out_path.open(u'wb') as out:
             out.write(self.dump_file())
 
     def write_file_safe(self, out_path=None):
@@ -643,6 +807,43 @@ def _reset_cache(self, stat_tuple, load_cache):
         self.dds_dxt10 = _DDSHeaderDXT10()
         self.dds_contents = b''
 
+def strip_top_mips(dds_paths, num_mips, dry_run=False, progress=None):
+    """Drops the num_mips largest mip levels of each of the specified DDS
+    files, processing the files in parallel. Returns a list of (path, bytes
+    saved, error message) tuples, in the order of dds_paths - the error
+    message is None unless the file could not be processed.
+
+    :param dds_paths: The absolute paths of the DDS files to process.
+    :param num_mips: The number of mip levels to drop.
+    :param dry_run: If True, only compute the savings, leaving the files
+        untouched."""
+    def _strip(dds_path):
+        dds_file = DDSFile(dds_path)
+        try:
+            dds_file.load_headers_only()
+            saved_bytes = dds_file.stripped_size(num_mips)
+            if saved_bytes and not dry_run:
+                dds_file.load_file()
+                dds_file.strip_top_mips(num_mips)
+                dds_file.write_file_safe()
+            return dds_path, saved_bytes, None
+        except (DDSError, IOError, OSError) as e:
+            return dds_path, 0, u'%s' % e
+    return parallel_map(_strip, dds_paths, progress)
+
+def read_dds_headers(dds_paths, progress=None):
+    """Reads just the headers of each of the specified DDS files, on a pool of
+    worker threads. Returns a list of (path, DDSFile or error message) tuples,
+    in the order of dds_paths."""
+    def _read_headers(dds_path):
+        dds_file = DDSFile(dds_path)
+        try:
+            dds_file.load_headers_only()
+            return dds_path, dds_file
+        except (DDSError, IOError, OSError) as e:
+            return dds_path, u'%s' % e
+    return parallel_map(_read_headers, dds_paths, progress)
+
 def mk_dxgi_fmt(fmt_index):
     """Returns a matching DXGI format instance for the specified DXGI index."""
     try:
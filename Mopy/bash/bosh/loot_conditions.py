@@ -28,7 +28,9 @@
 https://loot-api.readthedocs.io/en/latest/metadata/conditions.html."""
 
 import operator
+import os
 import re
+import stat
 
 from .. import bass, bush
 from ..bolt import GPath, Path
@@ -74,21 +76,37 @@ class ConditionFunc(_ACondition):
         - many
         - many_active
         - product_version
-        - version"""
-    __slots__ = (u'func_name', u'func_args')
+        - version
+
+    The result of the last call is kept together with the inputs the
+    function read (file stats, directory stats, the active plugins), and
+    reused for as long as those inputs do not change."""
+    __slots__ = (u'func_name', u'func_args', u'_last_eval')
 
     def __init__(self, func_name, func_args):
         # type: (unicode, list) -> None
         self.func_name = func_name
         self.func_args = func_args
+        self._last_eval = None
 
     def evaluate(self):
+        global _recorded_inputs
+        if self._last_eval is not None:
+            last_inputs, last_result = self._last_eval
+            if all(_signature(sig_func, sig_arg) == sig
+                   for sig_func, sig_arg, sig in last_inputs):
+                return last_result
         # Call the appropriate function, wrapping the error to make a nicer
         # error message if no appropriate function was found
+        outer_inputs, _recorded_inputs = _recorded_inputs, []
         try:
-            return _function_mapping[self.func_name](*self.func_args)
+            result = _function_mapping[self.func_name](*self.func_args)
+            self._last_eval = (_recorded_inputs, result)
         except KeyError:
             raise ParserError(u"Unknown function '%s'" % self.func_name)
+        finally:
+            _recorded_inputs = outer_inputs
+        return result
 
     def __repr__(self):
         return u'%s(%s)' % (
@@ -135,8 +153,9 @@ def _fn_active(path_or_regex):
         # Regex means we have to look at each active plugin - plugins can
         # obviously only be in Data, no need to process the path here
         file_regex = re.compile(path_or_regex)
-        return any(file_regex.match(x.s) for x in cached_active_tuple())
+        return any(file_regex.match(x.s) for x in _active_plugins())
     else:
+        _active_plugins() # record the dependency
         return cached_is_active(GPath(path_or_regex))
 
 def _fn_checksum(file_path, expected_crc):
@@ -147,7 +166,7 @@ def _fn_checksum(file_path, expected_crc):
     :param file_path: The path of the file to check.
     :param expected_crc: The expected CRC32 value."""
     try:
-        return _process_path(file_path).crc == expected_crc
+        return _file_crc(_process_path(file_path)) == expected_crc
     except IOError:
         return False # Doesn't exist or is a directory
 
@@ -166,9 +185,9 @@ def _fn_file(path_or_regex):
         # Note that we don't have to error check here due to the +1 offset
         file_regex = re.compile(path_or_regex[final_sep + 1:])
         parent_dir = _process_path(path_or_regex[:final_sep + 1])
-        return any(file_regex.match(x.s) for x in parent_dir.list())
+        return any(file_regex.match(x.s) for x in _list_dir(parent_dir))
     else:
-        return _process_path(path_or_regex).exists()
+        return _path_stat(_process_path(path_or_regex)) is not None
 
 def _fn_is_master(file_path):
     # type: (unicode) -> bool
@@ -179,7 +198,8 @@ def _fn_is_master(file_path):
     plugin_path = GPath(file_path)
     from . import modInfos
     # Need to check if it's on disk first, otherwise modInfos[x] errors
-    return plugin_path in modInfos and in_master_block(modInfos[plugin_path])
+    return _plugin_stat(plugin_path) is not None and in_master_block(
+        modInfos[plugin_path])
 
 def _fn_many(path_regex):
     # type: (unicode) -> bool
@@ -192,7 +212,7 @@ def _fn_many(path_regex):
     file_regex = re.compile(path_regex[final_sep + 1:])
     parent_dir = _process_path(path_regex[:final_sep + 1])
     # Check if we have more than one matching file
-    return len([x for x in parent_dir.list() if file_regex.match(x.s)]) > 1
+    return len([x for x in _list_dir(parent_dir) if file_regex.match(x.s)]) > 1
 
 def _fn_many_active(path_regex):
     # type: (unicode) -> bool
@@ -202,7 +222,7 @@ def _fn_many_active(path_regex):
     :param path_regex: The regex to check."""
     file_regex = re.compile(path_regex)
     # Check if we have more than one matching active plugin
-    return len([x for x in cached_active_tuple() if file_regex.match(x.s)]) > 1
+    return len([x for x in _active_plugins() if file_regex.match(x.s)]) > 1
 
 def _fn_product_version(file_path, expected_ver, comparison):
     # type: (unicode, unicode, Comparison) -> bool
@@ -226,7 +246,7 @@ def _fn_product_version(file_path, expected_ver, comparison):
     :param comparison: The comparison operator to use."""
     file_path = _process_path(file_path)
     actual_ver = [0]
-    if file_path.isfile():
+    if _is_file(file_path):
         if file_path.cext in (u'.exe', u'.dll'):
             # Read version from executable fields
             actual_ver = list(get_file_version(file_path.s))
@@ -255,10 +275,11 @@ def _fn_version(file_path, expected_ver, comparison):
     :param comparison: The comparison operator to use."""
     file_path = _process_path(file_path)
     actual_ver = [0]
-    if file_path.isfile():
+    if _is_file(file_path):
         if file_path.cext in bush.game.espm_extensions:
             # Read version from the description
             from . import modInfos
+            _plugin_stat(GPath(file_path.tail)) # record the dependency
             ver_match = _VERSION_REGEX.search(
                 modInfos[GPath(file_path.tail)].header.description)
             if ver_match:
@@ -285,6 +306,121 @@ def _fn_version(file_path, expected_ver, comparison):
     u'version':         _fn_version,
 }
 
+# Evaluation cache
+# The inputs read by the function that is currently being evaluated, as a list
+# of (signature function, argument, signature) tuples - see ConditionFunc
+_recorded_inputs = None
+# Maps (signature function, argument) to the signature, while an
+# EvaluationPass is running - None otherwise
+_pass_signatures = None
+# Map paths to (stat signature, CRC / directory listing) tuples, so that
+# unchanged files are only read once, whichever condition needs them
+_crc_cache = {}
+_listing_cache = {}
+
+class EvaluationPass(object):
+    """Context manager for evaluating the conditions of many plugins, e.g.
+    when reloading the bash tags of all mods. Each file, directory and the
+    active plugins are only checked once while the pass runs, however many
+    conditions depend on them."""
+    __slots__ = (u'_outer_signatures',)
+
+    def __enter__(self):
+        global _pass_signatures
+        self._outer_signatures = _pass_signatures
+        if _pass_signatures is None:
+            _pass_signatures = {}
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        global _pass_signatures
+        _pass_signatures = self._outer_signatures
+
+def _signature(sig_func, sig_arg):
+    """Returns the current signature of an input, as computed by sig_func,
+    reusing the one computed earlier in this pass if any."""
+    if _pass_signatures is None:
+        return sig_func(sig_arg)
+    try:
+        return _pass_signatures[(sig_func, sig_arg)]
+    except KeyError:
+        sig = _pass_signatures[(sig_func, sig_arg)] = sig_func(sig_arg)
+        return sig
+
+def _record_input(sig_func, sig_arg):
+    """Returns the current signature of an input and records it as an input
+    of the function being evaluated."""
+    sig = _signature(sig_func, sig_arg)
+    if _recorded_inputs is not None:
+        _recorded_inputs.append((sig_func, sig_arg, sig))
+    return sig
+
+def _stat_signature(file_path):
+    # type: (Path) -> tuple | None
+    try:
+        st = os.stat(file_path.s)
+    except OSError:
+        return None # Doesn't exist
+    return st.st_size, st.st_mtime, stat.S_ISDIR(st.st_mode)
+
+def _active_signature(_none):
+    return cached_active_tuple()
+
+def _plugin_signature(plugin_name):
+    # type: (Path) -> tuple | None
+    from . import modInfos
+    if plugin_name not in modInfos: return None
+    # Flags may be changed in place, keeping size and mtime (setType)
+    mod_info = modInfos[plugin_name]
+    return (mod_info._file_size, mod_info._file_mod_time,
+            int(mod_info.header.flags1))
+
+def _path_stat(file_path):
+    # type: (Path) -> tuple | None
+    """Returns the size, mtime and whether or not the path is a directory, or
+    None if the path does not exist."""
+    return _record_input(_stat_signature, file_path)
+
+def _is_file(file_path):
+    # type: (Path) -> bool
+    path_stat = _path_stat(file_path)
+    return path_stat is not None and not path_stat[2]
+
+def _plugin_stat(plugin_name):
+    # type: (Path) -> tuple | None
+    """Returns the signature of the specified plugin as seen by modInfos, or
+    None if modInfos does not have such a plugin."""
+    return _record_input(_plugin_signature, plugin_name)
+
+def _active_plugins():
+    # type: () -> tuple[Path]
+    return _record_input(_active_signature, None)
+
+def _file_crc(file_path):
+    # type: (Path) -> int
+    """Returns the CRC of the specified file, only reading it if it changed
+    since its CRC was last calculated. Raises an IOError if it does not exist
+    or is a directory."""
+    path_stat = _path_stat(file_path)
+    if path_stat is None or path_stat[2]:
+        raise IOError(u'%s is not a file' % file_path)
+    cached_stat, file_crc = _crc_cache.get(file_path, (None, None))
+    if cached_stat != path_stat:
+        file_crc = file_path.crc
+        _crc_cache[file_path] = (path_stat, file_crc)
+    return file_crc
+
+def _list_dir(dir_path):
+    # type: (Path) -> list[Path]
+    """Returns the contents of the specified directory, only listing it again
+    if it changed since it was last listed."""
+    path_stat = _path_stat(dir_path)
+    cached_stat, dir_listing = _listing_cache.get(dir_path, (None, None))
+    if dir_listing is None or cached_stat != path_stat:
+        dir_listing = dir_path.list()
+        _listing_cache[dir_path] = (path_stat, dir_listing)
+    return dir_listing
+
 # Misc
 def _is_regex(string_to_check):
     # type: (unicode) -> bool
@@ -30,13 +30,16 @@
 https://loot-api.readthedocs.io/en/latest/metadata/data_structures/index.html
 https://loot-api.readthedocs.io/en/latest/metadata/conditions.html."""
 
+import cPickle as pickle  # PY3
 import re
 import yaml
 from collections import deque
+from itertools import chain
+from zlib import crc32
 
 from .loot_conditions import _ACondition, Comparison, ConditionAnd, \
     ConditionFunc, ConditionNot, ConditionOr
-from ..bolt import decode, deprint, LowerDict, Path
+from ..bolt import decode, deprint, Path, PickleDict
 from ..exception import LexerError, ParserError
 
 # Try to use the C version (way faster), if that isn't possible fall back to
@@ -57,11 +60,29 @@
 
 class LOOTParser(object):
     """The main frontend for interacting with LOOT's masterlists. Provides
-    methods to parse masterlists and to retrieve information from them."""
-    __slots__ = (u'_cached_masterlist',)
+    methods to parse masterlists and to retrieve information from them.
+    The parsed lists are kept as compact pickled entries, which are only
+    turned into _PluginEntry instances when a plugin is looked up."""
+    __slots__ = (u'_cached_masterlist', u'_raw_entries')
 
     def __init__(self):
         self._cached_masterlist = {}
+        self._raw_entries = {}
+
+    def _get_entry(self, plugin_name):
+        """Returns the _PluginEntry for the specified plugin, creating it from
+        its compact entry on first access. Raises a KeyError if the plugin has
+        no entry in the lists.
+
+        :type plugin_name: Path
+        :rtype: _PluginEntry"""
+        entry_key = plugin_name.s.lower()
+        try:
+            return self._cached_masterlist[entry_key]
+        except KeyError:
+            plugin_entry = self._cached_masterlist[entry_key] = \
+                _PluginEntry(pickle.loads(self._raw_entries[entry_key]))
+            return plugin_entry
 
     def get_plugin_tags(self, plugin_name, catch_errors=True):
         """Retrieves added and removed tags for the specified plugin. If the
@@ -78,7 +99,7 @@ def get_plugin_tags(self, plugin_name, catch_errors=True):
             removed tags.
         :rtype: tuple[set[unicode], set[unicode]]"""
         try:
-            plugin_entry = self._cached_masterlist[plugin_name.s]
+            plugin_entry = self._get_entry(plugin_name)
             # We may have to evaluate conditions now
             return (_ConditionalTag.resolve_tags(plugin_entry.tags_added),
                     _ConditionalTag.resolve_tags(plugin_entry.tags_removed))
@@ -92,10 +113,32 @@ def get_plugin_tags(self, plugin_name, catch_errors=True):
             deprint(u'Error when evaluating LOOT condition', traceback=True)
         return set(), set()
 
+    def get_tags_key(self, plugin_name):
+        """Returns a value that changes whenever the tags the lists give the
+        specified plugin may have changed: the CRC of the plugin's entry in
+        the lists, plus the evaluated tags if any of them are conditional.
+        None is returned if the plugin has no entry.
+
+        :param plugin_name: The name of the plugin whose tags key should be
+            computed.
+        :type plugin_name: Path"""
+        try:
+            raw_entry = self._raw_entries[plugin_name.s.lower()]
+        except KeyError:
+            return None
+        plugin_entry = self._get_entry(plugin_name)
+        if any(isinstance(t, _ConditionalTag) for t in chain(
+                plugin_entry.tags_added, plugin_entry.tags_removed)):
+            added, removed = self.get_plugin_tags(plugin_name)
+            return crc32(raw_entry), frozenset(added), frozenset(removed)
+        return crc32(raw_entry)
+
     def load_lists(self, masterlist_path, userlist_path=None,
-                   catch_errors=True):
+                   catch_errors=True, cache_path=None):
         """Parses and stores the specified LOOT masterlist, and optionally
-        merges any additions from the specified userlist in.
+        merges any additions from the specified userlist in. If a cache path
+        is given, the merged lists are stored there and reused instead of
+        parsing the YAML again, as long as neither list changed.
 
         :param masterlist_path: The path to the LOOT masterlist that should be
             parsed.
@@ -104,12 +147,24 @@ def load_lists(self, masterlist_path, userlist_path=None,
             should be parsed and merged with the masterlist.
         :type userlist_path: Path
         :param catch_errors: If False, no errors will be caught - you will have
-            to handle them manually. Intended for unit tests."""
+            to handle them manually. Intended for unit tests.
+        :param cache_path: Optional, the path to the file that the parsed
+            lists should be cached in.
+        :type cache_path: Path"""
         try:
-            masterlist = _parse_list(masterlist_path)
-            if userlist_path:
-                _merge_lists(masterlist, _parse_list(userlist_path))
-            self._cached_masterlist = masterlist
+            lists_key = [(l.s, l.size, l.mtime, l.crc) for l in
+                         (masterlist_path, userlist_path) if l]
+            raw_entries = cache_path and _load_cache(cache_path, lists_key)
+            if raw_entries is None:
+                masterlist = _parse_list(masterlist_path)
+                if userlist_path:
+                    _merge_lists(masterlist, _parse_list(userlist_path))
+                raw_entries = {p: pickle.dumps(e, -1) for p, e
+                               in masterlist.iteritems()}
+                if cache_path:
+                    _save_cache(cache_path, lists_key, raw_entries)
+            self._raw_entries = raw_entries
+            self._cached_masterlist = {}
         except yaml.YAMLError:
             if not catch_errors:
                 raise
@@ -126,7 +181,7 @@ def is_plugin_dirty(self, plugin_name, mod_infos, catch_errors=True):
         :param catch_errors: If False, no errors will be caught - you will have
             to handle them manually. Intended for unit tests."""
         try:
-            plugin_entry = self._cached_masterlist[plugin_name.s]
+            plugin_entry = self._get_entry(plugin_name)
             return (plugin_entry and mod_infos[plugin_name].cached_mod_crc()
                     in plugin_entry.dirty_crcs)
         except KeyError:
@@ -140,58 +195,68 @@ class _PluginEntry(object):
     masterlist and/or userlist."""
     __slots__ = (u'dirty_crcs', u'tags_added', u'tags_removed')
 
-    def __init__(self, yaml_entry):
-        """Parses the specified dictionary, as created by PyYAML's parse of the
-        LOOT masterlist. Expects a dict with syntax like this:
-
-            {
-                # note that 'util' is required by libloot, but ignored here
-                'dirty': [{'crc': 0xDEADBEEF, 'util': 'foo'}, ...],
-                # any combination of these two styles of tags:
-                #  - unconditional
-                'tag': ['C.Water', '-Deactivate', ...],
-                #  - conditional
-                'tag': [{'name': 'Delev', 'condition': 'file("foo.esp")'}, ...]
-            }
-
-        Any of the initial keys may be missing, in which case an empty list is
-        assumed as the default.
-
-        :type yaml_entry: dict"""
-        self.dirty_crcs = {c['crc'] for c in yaml_entry.get('dirty', ())}
-        self.tags_added = set()
-        self.tags_removed = set()
-        # Need to handle a starting '-', which means removed
-        for tag in yaml_entry.get('tag', ()):
-            try:
-                removes = tag[0] == '-'
-                target_tag = decode(tag[1:] if removes else tag)
-            except KeyError:
-                # This is a dict, means we'll have to handle conditions later
-                tag_name = tag['name']
-                removes = tag_name[0] == '-'
-                target_tag = _ConditionalTag(
-                    decode(tag_name[1:] if removes else tag_name),
-                    decode(tag['condition']))
-            target_set = self.tags_removed if removes else self.tags_added
-            target_set.add(target_tag)
-
-    def merge_with(self, other_entry):
-        """Merges the information stored in this plugin entry with the
-        information stored in other_entry. Since another list can never remove
-        things from the original list (a limitation imposed by LOOT's GUI and
-        libloot itself), we only need to make a union of each set.
-
-        :param other_entry: The plugin entry to merge into this one.
-        :type other_entry: _PluginEntry"""
-        self.dirty_crcs |= other_entry.dirty_crcs
-        self.tags_added |= other_entry.tags_added
-        self.tags_removed |= other_entry.tags_removed
+    def __init__(self, compact_entry):
+        """Creates a new _PluginEntry from the specified compact entry, as
+        created by _compact_entry.
+
+        :type compact_entry: tuple"""
+        dirty_crcs, tags_added, tags_removed = compact_entry
+        self.dirty_crcs = set(dirty_crcs)
+        self.tags_added = _PluginEntry._make_tags(tags_added)
+        self.tags_removed = _PluginEntry._make_tags(tags_removed)
+
+    @staticmethod
+    def _make_tags(compact_tags):
+        """Turns the (tag name, condition string) tuples stored in compact
+        entries for conditional tags into _ConditionalTag instances."""
+        return {_ConditionalTag(*t) if isinstance(t, tuple) else t
+                for t in compact_tags}
 
     def __repr__(self):
         return u'<added: %r, removed: %r, dirty: %r>' % (
             self.tags_added, self.tags_removed, self.dirty_crcs)
 
+def _compact_entry(yaml_entry):
+    """Parses the specified dictionary, as created by PyYAML's parse of the
+    LOOT masterlist, into a compact entry that can be cheaply pickled. Expects
+    a dict with syntax like this:
+
+        {
+            # note that 'util' is required by libloot, but ignored here
+            'dirty': [{'crc': 0xDEADBEEF, 'util': 'foo'}, ...],
+            # any combination of these two styles of tags:
+            #  - unconditional
+            'tag': ['C.Water', '-Deactivate', ...],
+            #  - conditional
+            'tag': [{'name': 'Delev', 'condition': 'file("foo.esp")'}, ...]
+        }
+
+    Any of the initial keys may be missing, in which case an empty list is
+    assumed as the default.
+
+    :type yaml_entry: dict
+    :return: A tuple of three frozensets - the dirty CRCs, the added tags and
+        the removed tags. Conditional tags are stored as (tag name, condition
+        string) tuples.
+    :rtype: tuple[frozenset]"""
+    dirty_crcs = frozenset(c['crc'] for c in yaml_entry.get('dirty', ()))
+    tags_added = set()
+    tags_removed = set()
+    # Need to handle a starting '-', which means removed
+    for tag in yaml_entry.get('tag', ()):
+        try:
+            removes = tag[0] == '-'
+            target_tag = decode(tag[1:] if removes else tag)
+        except KeyError:
+            # This is a dict, means we'll have to handle conditions later
+            tag_name = tag['name']
+            removes = tag_name[0] == '-'
+            target_tag = (decode(tag_name[1:] if removes else tag_name),
+                          decode(tag['condition']))
+        target_set = tags_removed if removes else tags_added
+        target_set.add(target_tag)
+    return dirty_crcs, frozenset(tags_added), frozenset(tags_removed)
+
 class _ConditionalTag(object):
     """Represents a tag that may or may not be applied to a mod right now,
     depending on whether or not its condition evaluates to True.
@@ -559,30 +624,33 @@ def _pop_token(tokens, expected_tag=None):
 
 # Implementation - Misc
 def _merge_lists(first_list, second_list):
-    """Merges additions from the second masterlist into the first one. See
-    _PluginEntry.merge_with for more information on the procedure. Entirely new
-    entries are simply copied over instead of merged.
+    """Merges additions from the second masterlist into the first one. Since
+    another list can never remove things from the original list (a limitation
+    imposed by LOOT's GUI and libloot itself), we only need to make a union of
+    each set of the compact entries. Entirely new entries are simply copied
+    over instead of merged.
 
     :param first_list: The list to merge information into.
-    :type first_list: LowerDict[unicode, _PluginEntry]
+    :type first_list: dict[unicode, tuple]
     :param second_list: The list to merge information from.
-    :type second_list: LowerDict[unicode, _PluginEntry]"""
+    :type second_list: dict[unicode, tuple]"""
     for plugin_name, second_entry in second_list.iteritems():
         try:
-            first_list[plugin_name].merge_with(second_entry)
+            first_list[plugin_name] = tuple(
+                f | s for f, s in zip(first_list[plugin_name], second_entry))
         except KeyError:
             # This plugin had no entry in the first list, just copy it cover
             first_list[plugin_name] = second_entry
 
 def _parse_list(list_path):
-    """Parses the specified masterlist or userlist and returns a LowerDict
-    mapping plugins to _PluginEntry instances. To parse the YAML, PyYAML is
-    used - the C version if possible.
+    """Parses the specified masterlist or userlist and returns a dict mapping
+    lowercase plugin names to compact entries (see _compact_entry). To parse
+    the YAML, PyYAML is used - the C version if possible.
 
     :param list_path: The path to the list that should be parsed.
     :type list_path: Path
-    :return: A LowerDict representing the list's contents.
-    :rtype: LowerDict[unicode, _PluginEntry]"""
+    :return: A dict representing the list's contents.
+    :rtype: dict[unicode, tuple]"""
     with list_path.open('rb') as ins:
         # HACK! https://github.com/yaml/pyyaml/issues/373
         if u'fallout4' in list_path.cs:
@@ -591,6 +659,32 @@ def _parse_list(list_path):
             list_contents = yaml.load(yaml_data, Loader=SafeLoader)
         else:
             list_contents = yaml.load(ins, Loader=SafeLoader)
-    ##: Are the decode calls here (and in _PluginEntry.__init__) needed?
-    return LowerDict({decode(p['name']): _PluginEntry(p) for p
-                      in list_contents.get('plugins', ())})
+    ##: Are the decode calls here (and in _compact_entry) needed?
+    return {decode(p['name']).lower(): _compact_entry(p) for p
+            in list_contents.get('plugins', ())}
+
+def _load_cache(cache_path, lists_key):
+    """Returns the pickled compact entries cached in the specified file, or
+    None if the cache is missing or was made from different lists.
+
+    :type cache_path: Path
+    :param lists_key: The paths, sizes, mtimes and CRCs of the lists.
+    :rtype: dict[unicode, bytes] | None"""
+    lists_cache = PickleDict(cache_path)
+    lists_cache.load()
+    if lists_cache.data.get(u'lists_key') != lists_key:
+        return None
+    return lists_cache.data.get(u'raw_entries')
+
+def _save_cache(cache_path, lists_key, raw_entries):
+    """Stores the pickled compact entries of the specified lists in the
+    specified cache file.
+
+    :type cache_path: Path"""
+    lists_cache = PickleDict(cache_path)
+    lists_cache.data.update({u'lists_key': lists_key,
+                             u'raw_entries': raw_entries})
+    try:
+        lists_cache.save()
+    except (OSError, IOError):
+        deprint(u'Failed to save LOOT lists cache', traceback=True)
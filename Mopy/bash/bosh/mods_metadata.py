@@ -53,8 +53,8 @@ def __init__(self):
         self.lootUserTime = None
         self.tagList = bass.dirs['defaultPatches'].join(u'taglist.yaml')
         self.tagListModTime = None
-        #--Bash Tags
-        self.tagCache = {}
+        # the parsed lists, so we don't have to parse the YAML on each boot
+        self._lists_cache = bass.dirs['modsBash'].join(u'LOOT.dat')
         #--Refresh
         self.refreshBashTags()
 
@@ -65,15 +65,15 @@ def refreshBashTags(self):
         if path.exists():
             if (path.mtime != self.lootMasterTime or
                 (userpath.exists() and userpath.mtime != self.lootUserTime)):
-                self.tagCache = {}
                 self.lootMasterTime = path.mtime
                 parsing = u'', u'%s' % path
                 if userpath.exists():
                     parsing = u's', u'%s, %s' % (path, userpath)
                     self.lootUserTime = userpath.mtime
-                    lootDb.load_lists(path, userpath)
+                    lootDb.load_lists(path, userpath,
+                                      cache_path=self._lists_cache)
                 else:
-                    lootDb.load_lists(path)
+                    lootDb.load_lists(path, cache_path=self._lists_cache)
             return # no changes or we parsed successfully
         #--No masterlist or an error occurred while reading it, use the taglist
         if not self.tagList.exists():
@@ -82,19 +82,20 @@ def refreshBashTags(self):
                 u'Bash is installed correctly.')
         if self.tagList.mtime == self.tagListModTime: return
         self.tagListModTime = self.tagList.mtime
-        self.tagCache = {}
-        lootDb.load_lists(self.tagList)
+        lootDb.load_lists(self.tagList, cache_path=self._lists_cache)
 
-    # TODO(inf) self.tagCache needs invalidation when a mod's CRC changes!
-    def getTagsInfoCache(self, modName):
-        """Gets bash tag info from the cache, or from loot_parser if it is not
-        cached."""
-        if modName not in self.tagCache:
-            tags = lootDb.get_plugin_tags(modName)
-            self.tagCache[modName] = tags
-            return tags
-        else:
-            return self.tagCache[modName]
+    @staticmethod
+    def getTagsInfoCache(modName):
+        """Gets bash tag info from loot_parser. The results of the conditions
+        are cached by loot_conditions for as long as the files they check do
+        not change, so this is cheap to call repeatedly."""
+        return lootDb.get_plugin_tags(modName)
+
+    @staticmethod
+    def get_tags_key(modName):
+        """Gets a value that changes whenever the LOOT tags of the specified
+        mod may have changed - see LOOTParser.get_tags_key."""
+        return lootDb.get_tags_key(modName)
 
     @staticmethod
     def getDirtyMessage(modName, mod_infos):
@@ -133,6 +134,35 @@ def get_tags_from_dir(self, plugin_name):
                         added.add(tag_entry)
         return added, removed
 
+    @staticmethod
+    def tag_files_stats():
+        """Returns a dict mapping the lowercased names of the tag files in
+        Data/BashTags to their (size, mtime) - lets us check the tag files of
+        all plugins with a single directory listing."""
+        tag_files_dir = bass.dirs['tag_files']
+        stats = {}
+        for tag_file in tag_files_dir.list():
+            if tag_file.cext != u'.txt': continue
+            try:
+                stats[tag_file.s.lower()] = tag_files_dir.join(
+                    tag_file).size_mtime()
+            except OSError:
+                pass # deleted in the meantime or a broken link
+        return stats
+
+    @staticmethod
+    def tag_file_stat(plugin_name, tag_files_stats=None):
+        """Returns the (size, mtime) of the Data/BashTags file of the
+        specified plugin, or None if it has none.
+
+        :param tag_files_stats: Optional, the result of tag_files_stats, to
+            avoid touching the disk."""
+        tag_file_name = plugin_name.body + u'.txt'
+        if tag_files_stats is not None:
+            return tag_files_stats.get(tag_file_name.s.lower())
+        tag_file = bass.dirs['tag_files'].join(tag_file_name)
+        return tag_file.size_mtime() if tag_file.isfile() else None
+
     def save_tags_to_dir(self, plugin_name, plugin_tags, plugin_old_tags):
         """Compares plugin_tags to plugin_old_tags and saves the diff to
         Data/BashTags/PLUGIN_NAME.txt.
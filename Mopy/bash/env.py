@@ -50,6 +50,14 @@
     import win32api
 except ImportError:
     win32api = None
+try:
+    import win32file
+except ImportError:
+    win32file = None
+try:
+    import fcntl
+except ImportError: # windows
+    fcntl = None
 
 def get_registry_path(subkey, entry, detection_file):
     """Check registry for a path to a program."""
@@ -666,6 +674,115 @@ def shellCopy(filesFrom, filesTo, parent=None, askOverwrite=False,
                           confirm=askOverwrite, renameOnCollision=autoRename,
                           silent=False, parent=parent)
 
+# Linked installs --------------------------------------------------------------
+_FICLONE = 0x40049409 # linux/fs.h: _IOW(0x94, 9, int)
+
+def _reflink(src, dst):
+    """Clone src to dst sharing the data extents (copy on write). Only
+    supported on Linux on btrfs/xfs and friends - raises OSError or IOError
+    if the filesystem does not support it."""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, u'Reflinks not supported', src)
+    with open(src, u'rb') as ins:
+        with open(dst, u'wb') as out:
+            try:
+                fcntl.ioctl(out.fileno(), _FICLONE, ins.fileno())
+            except IOError:
+                out.close()
+                _os.remove(dst)
+                raise
+    _shutil.copystat(src, dst)
+
+def _hardlink(src, dst):
+    """Create a hard link at dst pointing to src's data. Raises OSError or
+    IOError if not supported (different volume, FAT, no API)."""
+    if hasattr(_os, u'link'):
+        _os.link(src, dst)
+    elif win32file is not None:
+        try:
+            win32file.CreateHardLink(dst, src)
+        except win32file.error as e:
+            raise OSError(e.args[0], e.args[2], dst)
+    else:
+        raise OSError(errno.EOPNOTSUPP, u'Hard links not supported', src)
+
+def _link_count(path):
+    """Return the number of hard links to the file at path, or None if it
+    can't be determined. Python 2 always reports st_nlink as 0 on Windows,
+    so we ask the file handle there."""
+    nlink = _os.lstat(path.s).st_nlink
+    if nlink or win32file is None: return nlink or None
+    try:
+        handle = win32file.CreateFile(path.s, 0, win32file.FILE_SHARE_READ |
+            win32file.FILE_SHARE_WRITE | win32file.FILE_SHARE_DELETE, None,
+            win32file.OPEN_EXISTING, 0, None)
+        try: # index 7 is nNumberOfLinks
+            return win32file.GetFileInformationByHandle(handle)[7]
+        finally:
+            handle.Close()
+    except win32file.error:
+        return None
+
+def break_hardlinks(paths):
+    """Remove those of the given files that share their data with other
+    files, so that overwriting them will not modify the files they are linked
+    to (for instance the sources of a linked project install). Files whose
+    link count can't be determined are removed too.
+
+    :param paths: iterable of Path"""
+    for path in paths:
+        try:
+            nlink = _link_count(path)
+            if nlink is None or nlink > 1: path.remove()
+        except OSError as e:
+            if e.errno != errno.ENOENT: raise
+
+def shellLink(filesFrom, filesTo, parent=None, hardlink_filter=None):
+    """Install filesFrom to filesTo by cloning (reflinking) them if the
+    filesystem supports it, else by hard linking them if hardlink_filter
+    allows it, falling back to shellCopy for files that could not be linked.
+    Existing destination files are removed first.
+
+    :param hardlink_filter: a callable accepting the source Path and
+        returning True if it's safe to hard link it - defaults to never
+        hard linking
+    :return: the set of destination Paths that were linked, those files
+        preserve the source modification time"""
+    linked, fallback_from, fallback_to = set(), [], []
+    # Once a method fails (unsupported filesystem, different volumes) don't
+    # try it again for the rest of the files
+    can_reflink = fcntl is not None
+    can_hardlink = hardlink_filter is not None
+    for fileFrom, fileTo in zip(filesFrom, filesTo):
+        if can_reflink or (can_hardlink and hardlink_filter(fileFrom)):
+            try:
+                fileTo.remove()
+                fileTo.head.makedirs()
+            except OSError:
+                deprint(u'Failed to remove %s' % fileTo, traceback=True)
+            else:
+                if can_reflink:
+                    try:
+                        _reflink(fileFrom.s, fileTo.s)
+                        linked.add(fileTo)
+                        continue
+                    except (OSError, IOError):
+                        can_reflink = False
+                if can_hardlink and hardlink_filter(fileFrom):
+                    try:
+                        _hardlink(fileFrom.s, fileTo.s)
+                        linked.add(fileTo)
+                        continue
+                    except (OSError, IOError):
+                        deprint(u'Failed to hard link %s to %s' % (
+                            fileFrom, fileTo), traceback=True)
+                        can_hardlink = False
+        fallback_from.append(fileFrom)
+        fallback_to.append(fileTo)
+    if fallback_from:
+        shellCopy(fallback_from, fallback_to, parent=parent)
+    return linked
+
 def shellMakeDirs(dirs, parent=None):
     if not dirs: return
     dirs = [dirs] if not isinstance(dirs, (list, tuple, set)) else dirs
@@ -543,6 +543,8 @@ class Esp(object):
     def plugin_header_class(self):
         return brec.MreRecord.type_class[self.Esp.plugin_header_sig]
 
+    # set by _dynamic_import_modules, for init_patchers
+    _patchers_package = None
     # Set in game/*/patcher.py used in Mopy/bash/basher/gui_patchers.py
     gameSpecificPatchers = {}
     gameSpecificListPatchers = {}
@@ -586,7 +588,8 @@ def _dynamic_import_modules(cls, package_name):
         game. We need to pass the package name in for importlib to work.
         Currently populates the GameInfo namespace with the members defined in
         the relevant constants.py and imports default_tweaks.py and
-        vanilla_files.py."""
+        vanilla_files.py - the game specific patchers are imported later, by
+        init_patchers."""
         constants = importlib.import_module('.constants', package=package_name)
         for k in dir(constants):
             if k.startswith('_'): continue
@@ -599,8 +602,17 @@ def _dynamic_import_modules(cls, package_name):
         vf_module = importlib.import_module('.vanilla_files',
                                             package=package_name)
         cls.vanilla_files = vf_module.vanilla_files
+        cls._patchers_package = package_name
+
+    @classmethod
+    def init_patchers(cls):
+        """Import the game specific patchers and populate the GameInfo
+        namespace with them. Not done in init, as they are only needed to
+        configure or build a Bashed Patch."""
+        if cls._patchers_package is None: return # already imported
         patchers_module = importlib.import_module('.patcher',
-                                                  package=package_name)
+                                                  package=cls._patchers_package)
+        cls._patchers_package = None
         cls.gameSpecificPatchers = patchers_module.gameSpecificPatchers
         cls.gameSpecificListPatchers = patchers_module.gameSpecificListPatchers
         cls.game_specific_import_patchers = \
@@ -97,21 +97,32 @@ class LoadOrder(object):
     __empty = ()
     __none = frozenset()
 
-    def __init__(self, loadOrder=__empty, active=__none):
+    def __init__(self, loadOrder=__empty, active=__none, _previous=None):
         """:type loadOrder: list | set | tuple
-        :type active: list | set | tuple"""
-        if set(active) - set(loadOrder):
-            raise exception.BoltError(
-                u'Active mods with no load order: ' + u', '.join(
-                    [x.s for x in (set(active) - set(loadOrder))]))
+        :type active: list | set | tuple
+        :param _previous: the index dicts of this load order are reused if
+            its load order or active plugins are the same as the new ones
+        :type _previous: LoadOrder"""
         self._loadOrder = tuple(loadOrder)
         self._active = frozenset(active)
-        self.__mod_loIndex = dict((a, i) for i, a in enumerate(loadOrder))
-        # below would raise key error if active have no loadOrder
+        if _previous is not None and _previous._loadOrder == self._loadOrder:
+            self.__mod_loIndex = _previous.__mod_loIndex # never mutated
+        else:
+            self.__mod_loIndex = dict(
+                (a, i) for i, a in enumerate(self._loadOrder))
+        no_lo = [x for x in self._active if x not in self.__mod_loIndex]
+        if no_lo:
+            raise exception.BoltError(
+                u'Active mods with no load order: ' + u', '.join(
+                    [x.s for x in no_lo]))
         self._activeOrdered = tuple(
-            sorted(active, key=self.__mod_loIndex.__getitem__))
-        self.__mod_actIndex = dict(
-            (a, i) for i, a in enumerate(self._activeOrdered))
+            sorted(self._active, key=self.__mod_loIndex.__getitem__))
+        if _previous is not None and \
+                _previous._activeOrdered == self._activeOrdered:
+            self.__mod_actIndex = _previous.__mod_actIndex
+        else:
+            self.__mod_actIndex = dict(
+                (a, i) for i, a in enumerate(self._activeOrdered))
 
     @property
     def loadOrder(self): return self._loadOrder # test if empty
@@ -264,7 +275,7 @@ def _update_cache(lord=None, acti_sorted=None, __index_move=0):
         lord, acti_sorted = _game_handle.get_load_order(lord, acti_sorted,
                                                         fix_lo)
         fix_lo.lo_deprint()
-        cached_lord = LoadOrder(lord, acti_sorted)
+        cached_lord = LoadOrder(lord, acti_sorted, _previous=cached_lord)
     except Exception:
         bolt.deprint(u'Error updating load_order cache')
         cached_lord = __empty
@@ -425,6 +425,18 @@ def read_mod_headers(mod_info):
 
         :rtype: defaultdict[str, list[RecordHeader]]"""
         ret_headers = defaultdict(list)
+        for header in ModHeaderReader.iter_mod_headers(mod_info):
+            ret_headers[header.recType].append(header)
+        return ret_headers
+
+    @staticmethod
+    def iter_mod_headers(mod_info):
+        """Yields the headers of every record in the specified mod, in the
+        order they appear in the file, skipping GRUPs. Unlike
+        read_mod_headers, this allows the caller to stop reading as soon as
+        it found what it was looking for.
+
+        :rtype: collections.Iterable[RecordHeader]"""
         with ModReader(mod_info.name, mod_info.abs_path.open(u'rb')) as ins:
             try:
                 ins_at_end = ins.atEnd
@@ -433,12 +445,10 @@ def read_mod_headers(mod_info):
                 while not ins_at_end():
                     header = ins_unpack_rec_header()
                     # Skip GRUPs themselves, only process their records
-                    header_rec_type = header.recType
-                    if header_rec_type != b'GRUP':
-                        ret_headers[header_rec_type].append(header)
+                    if header.recType != b'GRUP':
+                        yield header
                         ins_seek(header.size, 1)
             except OSError as e:
                 raise ModError(ins.inName, u'Error scanning %s, file read '
                                            u"pos: %i\nCaused by: '%r'" % (
                     mod_info.name.s, ins.tell(), e))
-        return ret_headers